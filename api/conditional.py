@@ -0,0 +1,157 @@
+from hashlib import md5
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, F, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+# auto_now timestamps the validators are built from, in order of preference
+MODIFIED_FIELDS = ('updated_date', 'updated_at')
+
+
+def modified_field(model):
+    """Name of the model's modified timestamp, or None when it has none."""
+    for name in MODIFIED_FIELDS:
+        try:
+            model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        return name
+    return None
+
+
+def _expanded_lookups(serializer_class, request):
+    if serializer_class is None or not hasattr(serializer_class, 'expanded_lookups'):
+        return []
+    return serializer_class.expanded_lookups(request)
+
+
+def related_stamp_lookups(model, lookups):
+    """
+    ``path__<modified>`` of every model along ``lookups`` (driver__user ->
+    driver__updated_at, driver__user__updated_at) that has a modified timestamp.
+    """
+    stamps = []
+    for lookup in lookups:
+        path, current = [], model
+        for part in lookup.split('__'):
+            path.append(part)
+            current = current._meta.get_field(part).related_model
+            field = modified_field(current)
+            stamp = '__'.join(path + [field]) if field else None
+            if stamp and stamp not in stamps:
+                stamps.append(stamp)
+    return stamps
+
+
+def _etag(request, *parts):
+    params = sorted((key, values) for key, values in request.query_params.lists())
+    renderer = getattr(request, 'accepted_renderer', None)
+    key = repr((parts, params, renderer.format if renderer else None))
+    return 'W/"%s"' % md5(key.encode()).hexdigest()
+
+
+def collection_validators(request, queryset, serializer_class=None, related=()):
+    """
+    (etag, last_modified) for a collection, from one aggregate query over
+    ``queryset``, which should be the window the response renders (a
+    paginated view passes the page's sliced queryset): COUNT and
+    MAX(<modified>) of its rows and MAX(<modified>) of the related rows
+    joined to them along ``related`` (lookups, by default the ones the
+    serializer nests). Deletes show up in the count; changes of a nested
+    row show up in its timestamp.
+    """
+    model = queryset.model
+    related = list(related) or _expanded_lookups(serializer_class, request)
+    if queryset.query.is_sliced:
+        # sahifa oynasi: LIMIT li subquery, agregat faqat shu qatorlar ustida
+        queryset = model._base_manager.filter(pk__in=queryset.values('pk'))
+
+    aggregates = {'count': Count('pk', distinct=True)}
+    field = modified_field(model)
+    if field:
+        aggregates['modified'] = Max(field)
+    stamp_lookups = related_stamp_lookups(model, related)
+    for index, lookup in enumerate(stamp_lookups):
+        aggregates[f'related_{index}'] = Max(lookup)
+    stats = queryset.order_by().aggregate(**aggregates)
+
+    stamps = [stats.get('modified')] + [stats[f'related_{index}'] for index in range(len(stamp_lookups))]
+    etag = _etag(request, model._meta.label, stats['count'], [stamp and stamp.isoformat() for stamp in stamps])
+    return etag, max((stamp for stamp in stamps if stamp), default=None)
+
+
+def _instance_stamps(instance, parts):
+    if not parts:
+        return
+    field = instance._meta.get_field(parts[0])
+    value = getattr(instance, parts[0])
+    for obj in (value.all() if field.many_to_many else [value]):
+        if obj is None:
+            continue
+        name = modified_field(type(obj))
+        if name:
+            yield getattr(obj, name)
+        yield from _instance_stamps(obj, parts[1:])
+
+
+def object_validators(request, instance, serializer_class=None):
+    """
+    (etag, last_modified) for a single object, from its own timestamp and the
+    timestamps of the related rows that were already loaded to nest them.
+    """
+    field = modified_field(type(instance))
+    stamps = [getattr(instance, 'conditional_modified', None) or (getattr(instance, field) if field else None)]
+    for lookup in _expanded_lookups(serializer_class, request):
+        stamps.extend(_instance_stamps(instance, lookup.split('__')))
+
+    etag = _etag(request, instance._meta.label, instance.pk, [stamp and stamp.isoformat() for stamp in stamps])
+    return etag, max((stamp for stamp in stamps if stamp), default=None)
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified for GET.
+
+    List views call ``not_modified()`` with the queryset they render (the
+    page window when paginated) before serializing and return its response
+    when there is one; generic detail views get it through
+    ``retrieve()``. Collections only honour If-None-Match, because a deleted
+    row does not move Last-Modified.
+    """
+    conditional_validators = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        field = modified_field(queryset.model)
+        # read through an annotation so it is there even when only() left the column out
+        return queryset.annotate(conditional_modified=F(field)) if field else queryset
+
+    def not_modified(self, request, queryset, serializer_class=None, related=()):
+        self.conditional_validators = collection_validators(request, queryset, serializer_class, related)
+        return get_conditional_response(request, etag=self.conditional_validators[0])
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        self.conditional_validators = object_validators(request, instance, self.get_serializer_class())
+        etag, last_modified = self.conditional_validators
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None)
+        if response is not None:
+            return response
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.conditional_validators and request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+            etag, last_modified = self.conditional_validators
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+            # revalidate every time instead of letting the browser guess a freshness lifetime
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Authorization',))
+        return response
@@ -1,7 +1,11 @@
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
 from rest_framework import serializers
 from api.dto.auth import CustomUserSerializer
 from api.dto.auth import CustomUserSerializer
 from apps.load.models.driver import Pay, DriverPay, DriverExpense
+from apps.load.models.payroll_run import PayrollRun
 from apps.load.models.truck import Unit
 from apps.load.models.team import Team
 
@@ -18,7 +22,119 @@ from apps.load.models import (
     Stops, Employee, OtherPay, Commodities)
 
 
-class UnitSerializer(serializers.ModelSerializer):
+def _split_param(value):
+    if value is None:
+        return None
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Sparse fieldsets for GET requests.
+
+    ``?fields=id,load_id,load_status`` limits the columns that are rendered (and
+    loaded, see setup_eager_loading) and ``?expand=driver,stop`` picks which
+    relations are nested; everything else stays a plain id. Without either
+    parameter the representation is the same as it always was.
+    """
+    # relation -> (serializer class name, related lookups that nested serializer needs loaded)
+    expandable_fields = {}
+    expand_aliases = {}
+    # relations nested when the client does not ask for anything; None means all of them
+    default_expand = None
+    # columns never rendered, left out of the query as well
+    deferred_fields = ()
+
+    @classmethod
+    def resolve_sparse(cls, request):
+        """Returns (fields, expand): the field names to render (None for all) and the relations to nest."""
+        fields = expand = None
+        if request is not None and request.method in ('GET', 'HEAD'):
+            fields = _split_param(request.query_params.get('fields'))
+            expand = _split_param(request.query_params.get('expand'))
+        if expand is not None:
+            expand = {cls.expand_aliases.get(name, name) for name in expand} & set(cls.expandable_fields)
+        elif fields is not None:
+            expand = set()
+        else:
+            expand = set(cls.expandable_fields if cls.default_expand is None else cls.default_expand)
+        if fields is not None:
+            fields = fields | expand | {'id'}
+        return fields, expand
+
+    @classmethod
+    def expanded_lookups(cls, request=None):
+        """Related lookups the nested representations read, for the relations being expanded."""
+        _, expand = cls.resolve_sparse(request)
+        return [lookup for name in sorted(expand) for lookup in cls.expandable_fields[name][1]]
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, request=None):
+        """
+        Plans the queryset for what will actually be rendered: only() the
+        requested columns, join/prefetch the nested relations, and prefetch the
+        ids of many-to-many fields that stay flat. A page costs a fixed number
+        of queries.
+        """
+        fields, expand = cls.resolve_sparse(request)
+        opts = queryset.model._meta
+        select_related, prefetch_related = [], []
+
+        for name in expand:
+            lookups = cls.expandable_fields[name][1]
+            if opts.get_field(name).many_to_many:
+                prefetch_related.extend(lookups)
+            else:
+                select_related.extend(lookups)
+
+        for field in opts.many_to_many:
+            if field.name not in expand and (fields is None or field.name in fields):
+                prefetch_related.append(
+                    Prefetch(field.name, queryset=field.related_model.objects.only('pk')))
+
+        if fields is not None:
+            queryset = queryset.only(*[f.name for f in opts.concrete_fields if f.name in fields or f.primary_key])
+        elif cls.deferred_fields:
+            queryset = queryset.defer(*cls.deferred_fields)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sparse_fields, self._expand = self.resolve_sparse(self.context.get('request'))
+        if self._sparse_fields is not None:
+            for name in list(self.fields):
+                if name not in self._sparse_fields:
+                    self.fields.pop(name)
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        for name in self._expand:
+            serializer_class = globals()[self.expandable_fields[name][0]]
+            value = getattr(instance, name)
+            if instance._meta.get_field(name).many_to_many:
+                # .all() reads the prefetch cache; evaluating it once replaces an exists() + all() pair
+                items = value.all()
+                representation[name] = serializer_class(items, many=True).data if items else None
+            else:
+                representation[name] = serializer_class(value).data if value else None
+        return representation
+
+
+class UnitSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'truck': ('TruckSerializer', ['truck']),
+        'driver': ('DriverSerializer', ['driver__user__company']),
+        'trailer': ('TrailerSerializer', ['trailer']),
+        'employee': ('EmployeeSerializer', ['employee__user__company']),
+        'team_id': ('TeamSerializer', ['team_id']),
+    }
+    expand_aliases = {'team': 'team_id'}
+    default_expand = ()
+
     class Meta:
         model = Unit
         fields = "__all__"
@@ -48,6 +164,36 @@ class DriverPaySerializer(serializers.ModelSerializer):
         return representation
 
 
+class DriverPayPdfSerializer(serializers.ModelSerializer):
+    """Settlement PDF holati (fonda yaratiladi) va fayllar"""
+    class Meta:
+        model = DriverPay
+        fields = ('id', 'pdf_status', 'pdf_error', 'pdf_rendered_at', 'file', 'cd_file', 'updated_at')
+        read_only_fields = fields
+
+
+class PayrollRunSerializer(serializers.ModelSerializer):
+    # bo'sh bo'lsa barcha aktiv driverlar
+    drivers = serializers.ListField(child=serializers.IntegerField(), write_only=True, required=False)
+
+    class Meta:
+        model = PayrollRun
+        fields = "__all__"
+        read_only_fields = (
+            'driver_ids', 'status', 'total_count', 'processed_count', 'success_count', 'skipped_count',
+            'error_count', 'results', 'error_log', 'created_by', 'created_at', 'started_at', 'finished_at',
+            'updated_at')
+
+    def validate(self, attrs):
+        if attrs['pay_from'] > attrs['pay_to']:
+            raise serializers.ValidationError({'pay_to': "pay_to must not be before pay_from."})
+        return attrs
+
+    def create(self, validated_data):
+        validated_data['driver_ids'] = validated_data.pop('drivers', None) or None
+        return super().create(validated_data)
+
+
 class PaySerializer(serializers.ModelSerializer):
     class Meta:
         model = Pay
@@ -68,7 +214,7 @@ class CustomerBrokerLoadSerializer(serializers.ModelSerializer):
 #         model = Driver
 #         fields = ['id', 'first_name', 'last_name']
 
-class LoadSerializer(serializers.ModelSerializer):
+class LoadSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     # ForeignKey maydonlarni faqat ID sifatida qabul qilish uchun
     # created_by = serializers.PrimaryKeyRelatedField(queryset=Dispatcher.objects.all(), required=False, allow_null=True)
     customer_broker = serializers.PrimaryKeyRelatedField(queryset=CustomerBroker.objects.all(), required=False, allow_null=True)
@@ -78,33 +224,43 @@ class LoadSerializer(serializers.ModelSerializer):
     tags = serializers.PrimaryKeyRelatedField(queryset=LoadTags.objects.all(), required=False, allow_null=True)
     stop = serializers.PrimaryKeyRelatedField(many=True, queryset=Stops.objects.all(), required=False, allow_null=True)
     created_by = serializers.PrimaryKeyRelatedField(read_only=True)
+    expandable_fields = {
+        'created_by': ('CustomUserSerializer', ['created_by__company']),
+        'customer_broker': ('CustomerBrokerSerializer', ['customer_broker']),
+        'driver': ('DriverSerializer', ['driver__user__company']),
+        'dispatcher': ('DispatcherSerializer', ['dispatcher__user__company']),
+        'truck': ('TruckSerializer', ['truck']),
+        'tags': ('LoadTagsSerializer', ['tags']),
+        'stop': ('StopsSerializer', ['stop']),
+    }
+    expand_aliases = {'stops': 'stop'}
+    deferred_fields = ('search_document', 'search_vector')
+
     class Meta:
         model = Load
-        fields = "__all__"
+        exclude = ('search_document', 'search_vector')
         read_only_fields = ['created_by', 'created_date', 'updated_date']
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        representation['created_by'] = CustomUserSerializer(instance.created_by).data if instance.created_by else None
-        representation['customer_broker'] = CustomerBrokerSerializer(instance.customer_broker).data if instance.customer_broker else None
-        representation['driver'] = DriverSerializer(instance.driver).data if instance.driver else None
-        representation['dispatcher'] = DispatcherSerializer(instance.dispatcher).data if instance.dispatcher else None
-        representation['truck'] = TruckSerializer(instance.truck).data if instance.truck else None
-        representation['tags'] = LoadTagsSerializer(instance.tags).data if instance.tags else None
-        representation['stop'] = StopsSerializer(instance.stop.all(), many=True).data if instance.stop.exists() else None
-        return representation
-
-class DriverSerializer(serializers.ModelSerializer):
+class DriverSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), required=False, allow_null=True)
+    expandable_fields = {
+        'user': ('CustomUserSerializer', ['user__company']),
+        'assigned_truck': ('TruckSerializer', ['assigned_truck']),
+        'assigned_trailer': ('TrailerSerializer', ['assigned_trailer']),
+        'assigned_dispatcher': ('DispatcherSerializer', ['assigned_dispatcher__user__company']),
+    }
+    default_expand = ('user',)
+
     class Meta:
         model = Driver
         fields = "__all__"
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        representation['user'] = CustomUserSerializer(instance.user).data if instance.user else None
-        return representation
-class TrailerSerializer(serializers.ModelSerializer):
+class TrailerSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'tags': ('TrailerTagsSerializer', ['tags']),
+    }
+    default_expand = ()
+
     class Meta:
         model = Trailer
         fields = "__all__"
@@ -119,7 +275,12 @@ class DriverTagsSerializer(serializers.ModelSerializer):
         model = DriverTags
         fields = "__all__"
 
-class TruckSerializer(serializers.ModelSerializer):
+class TruckSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'tags': ('TruckTagsSerializer', ['tags']),
+    }
+    default_expand = ()
+
     class Meta:
         model = Truck
         fields = "__all__"
@@ -129,33 +290,31 @@ class TruckTagsSerializer(serializers.ModelSerializer):
         model = TruckTags
         fields = "__all__"
 
-class DispatcherSerializer(serializers.ModelSerializer):
+class DispatcherSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), required=False, allow_null=True)
+    expandable_fields = {
+        'user': ('CustomUserSerializer', ['user__company']),
+    }
+
     class Meta:
         model = Dispatcher
         fields = "__all__"
-    
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        representation['user'] = CustomUserSerializer(instance.user).data if instance.user else None
-        return representation
 
 class DispatcherTagsSerializer(serializers.ModelSerializer):
     class Meta:
         model = DispatcherTags
         fields = "__all__"
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class EmployeeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), required=False, allow_null=True)
+    expandable_fields = {
+        'user': ('CustomUserSerializer', ['user__company']),
+    }
+
     class Meta:
         model = Employee
         fields = "__all__"
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        representation['user'] = CustomUserSerializer(instance.user).data if instance.user else None
-        return representation
-
 class EmployeeTagsSerializer(serializers.ModelSerializer):
     class Meta:
         model = EmployeeTags
@@ -187,4 +346,174 @@ class CommoditiesSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-        
+# --- Bulk create / update (POST /api/load/bulk/) ---
+
+class StopsBulkSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = Stops
+        exclude = ('load', 'updated_at')
+
+class CommoditiesBulkSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = Commodities
+        exclude = ('load', 'updated_at')
+
+class OtherPayBulkSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = OtherPay
+        exclude = ('load', 'updated_at')
+
+
+# nested key -> model; each has a ``load`` foreign key
+BULK_NESTED = {
+    'stops': Stops,
+    'commodities': Commodities,
+    'other_pays': OtherPay,
+}
+
+
+class LoadBulkListSerializer(serializers.ListSerializer):
+    """
+    Validates every foreign key with one IN query per relation (instead of a
+    PrimaryKeyRelatedField lookup per field per load) and writes the loads and
+    their nested rows with bulk_create / bulk_update in one transaction.
+    """
+    does_not_exist = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        errors = [{} for _ in items]
+
+        for field in Load._meta.concrete_fields:
+            if not field.many_to_one or field.name not in self.child.fields:
+                continue
+            self._check_exists(items, errors, field.name, field.related_model)
+        self._check_exists(items, errors, 'id', Load)
+
+        for key, model in BULK_NESTED.items():
+            self._check_nested(items, errors, key, model)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    def _check_exists(self, items, errors, name, model):
+        ids = {item[name] for item in items if item.get(name) is not None}
+        existing = set(model.objects.filter(pk__in=ids).values_list('pk', flat=True)) if ids else set()
+        for index, item in enumerate(items):
+            if item.get(name) is not None and item[name] not in existing:
+                errors[index][name] = [self.does_not_exist.format(pk_value=item[name])]
+
+    def _check_nested(self, items, errors, key, model):
+        """Nested rows with an id must already belong to the load they are sent with."""
+        ids = {row['id'] for item in items for row in item.get(key, ()) if 'id' in row}
+        if not ids:
+            return
+        owners = set(model.objects.filter(pk__in=ids).values_list('pk', 'load_id'))
+        if model is Stops:
+            # stops can also be attached through the Load.stop many-to-many only
+            owners |= set(Load.stop.through.objects.filter(stops_id__in=ids).values_list('stops_id', 'load_id'))
+        for index, item in enumerate(items):
+            for row in item.get(key, ()):
+                if 'id' in row and (item.get('id') is None or (row['id'], item['id']) not in owners):
+                    errors[index].setdefault(key, []).append(
+                        {'id': [self.does_not_exist.format(pk_value=row['id'])]})
+
+    def create(self, validated_data):
+        now = timezone.now()
+        request = self.context.get('request')
+        user = request.user if request else None
+        nested = [{key: item.pop(key, None) for key in BULK_NESTED} for item in validated_data]
+
+        with transaction.atomic():
+            existing = Load.objects.select_for_update().in_bulk(
+                [item['id'] for item in validated_data if item.get('id')])
+            previous_drivers = [load.driver_id for load in existing.values()]
+            loads, created, updated = [], [], []
+            update_fields = {'updated_date'}
+            for item in validated_data:
+                pk = item.pop('id', None)
+                if pk:
+                    load = existing[pk]
+                    update_fields.update(item)
+                    load.updated_date = now
+                    updated.append(load)
+                else:
+                    load = Load(created_by=user)
+                    created.append(load)
+                for name, value in item.items():
+                    setattr(load, Load._meta.get_field(name).attname, value)
+                loads.append(load)
+
+            Load.objects.bulk_create(created)
+            if updated:
+                Load.objects.bulk_update(updated, sorted(update_fields))
+
+            stops = []
+            for key, model in BULK_NESTED.items():
+                rows = self._save_nested(model, [(load, children[key]) for load, children in zip(loads, nested)], now)
+                if model is Stops:
+                    stops = rows
+            Load.stop.through.objects.bulk_create(
+                [Load.stop.through(load_id=stop.load_id, stops_id=stop.pk) for stop in stops],
+                ignore_conflicts=True)
+
+            # Signals do not fire for bulk writes: events, miles and Telegram go out once, after commit
+            from apps.load.signals import notify_loads_saved
+            from apps.load.payroll import invalidate_payroll_preview
+            notify_loads_saved([load.pk for load in created], [load.pk for load in updated])
+            invalidate_payroll_preview(previous_drivers + [load.driver_id for load in loads])
+        return loads
+
+    @staticmethod
+    def _save_nested(model, pairs, now):
+        """Creates / updates the nested rows of each load; returns all of them."""
+        rows = [(load, attrs) for load, children in pairs for attrs in (children or ())]
+        existing = model.objects.in_bulk([attrs['id'] for _, attrs in rows if 'id' in attrs])
+        created, updated, update_fields = [], [], {'updated_at'}
+        saved = []
+        for load, attrs in rows:
+            pk = attrs.pop('id', None)
+            if pk:
+                row = existing[pk]
+                for name, value in attrs.items():
+                    setattr(row, name, value)
+                row.load_id = row.load_id or load.pk
+                row.updated_at = now
+                update_fields.update(attrs, {'load'})
+                updated.append(row)
+            else:
+                row = model(load=load, **attrs)
+                created.append(row)
+            saved.append(row)
+        model.objects.bulk_create(created)
+        if updated:
+            model.objects.bulk_update(updated, sorted(update_fields))
+        return saved
+
+
+class LoadBulkSerializer(serializers.ModelSerializer):
+    """One load of a bulk request; with ``id`` it updates the fields that are sent."""
+    id = serializers.IntegerField(required=False)
+    # plain ids here, checked in bulk by LoadBulkListSerializer
+    customer_broker = serializers.IntegerField(required=False, allow_null=True)
+    driver = serializers.IntegerField(required=False, allow_null=True)
+    dispatcher = serializers.IntegerField(required=False, allow_null=True)
+    truck = serializers.IntegerField(required=False, allow_null=True)
+    tags = serializers.IntegerField(required=False, allow_null=True)
+    unit_id = serializers.IntegerField(required=False, allow_null=True)
+    team_id = serializers.IntegerField(required=False, allow_null=True)
+    stops = StopsBulkSerializer(many=True, required=False)
+    commodities = CommoditiesBulkSerializer(many=True, required=False)
+    other_pays = OtherPayBulkSerializer(many=True, required=False)
+
+    class Meta:
+        model = Load
+        exclude = ('stop', 'created_by', 'created_date', 'updated_date', 'search_document', 'search_vector')
+        list_serializer_class = LoadBulkListSerializer
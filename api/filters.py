@@ -0,0 +1,98 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+# query param -> Load field, for the plain equality filters (comma separated values are OR'ed)
+LOAD_CHOICE_FILTERS = {
+    'load_status': 'load_status',
+    'invoice_status': 'invoice_status',
+    'invoice_number': 'invoice_number',
+    'weekly_number': 'weekly_number',
+}
+LOAD_RELATION_FILTERS = {
+    'driver': 'driver_id',
+    'dispatcher': 'dispatcher_id',
+    'team_id': 'team_id_id',
+    'unit_id': 'unit_id_id',
+}
+# query param prefix -> Load field, filtered with <prefix>_from / <prefix>_to
+LOAD_DATE_FILTERS = {
+    'created': 'created_date',
+    'updated': 'updated_date',
+    'pickup': 'pickup_date',
+    'delivery': 'delivery_date',
+    # from the stops: first PICKUP / last DELIVERY appointment
+    'first_pickup': 'first_pickup_at',
+    'last_delivery': 'last_delivery_at',
+}
+
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def parse_ids(param, value):
+    try:
+        return [int(item) for item in _split(value)]
+    except ValueError:
+        raise ValidationError({param: 'Expected an id or a comma separated list of ids.'})
+
+
+def _parse_bound(param, value, upper):
+    """
+    Accepts an ISO datetime or a plain YYYY-MM-DD date. A date as an upper bound
+    covers the whole day, and is turned into an exclusive bound on the next
+    midnight so the column is compared as-is and the index stays usable.
+    """
+    # parse_date() birinchi: parse_datetime() oddiy sanani ham yarim tun deb qabul qiladi
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        try:
+            moment = parse_datetime(value)
+        except ValueError:
+            moment = None
+        if moment is None:
+            raise ValidationError({param: 'Invalid date format. Use YYYY-MM-DD or an ISO datetime.'})
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment, False
+    if upper:
+        day += timedelta(days=1)
+    return timezone.make_aware(datetime.combine(day, time.min)), upper
+
+
+def filter_loads(queryset, params):
+    """Applies the dispatch board filters from the query string to a Load queryset."""
+    lookups = {}
+
+    for param, field in LOAD_CHOICE_FILTERS.items():
+        if params.get(param):
+            lookups[f'{field}__in'] = _split(params[param])
+
+    for param, field in LOAD_RELATION_FILTERS.items():
+        if params.get(param):
+            lookups[f'{field}__in'] = parse_ids(param, params[param])
+
+    for prefix, field in LOAD_DATE_FILTERS.items():
+        lower = params.get(f'{prefix}_from')
+        upper = params.get(f'{prefix}_to')
+        if lower:
+            lookups[f'{field}__gte'], _ = _parse_bound(f'{prefix}_from', lower, upper=False)
+        if upper:
+            bound, exclusive = _parse_bound(f'{prefix}_to', upper, upper=True)
+            lookups[f'{field}__lt' if exclusive else f'{field}__lte'] = bound
+
+    # ?period_from= / ?period_to=: loads whose first pickup .. last delivery span overlaps the period
+    if params.get('period_from'):
+        lookups['last_delivery_at__gte'], _ = _parse_bound('period_from', params['period_from'], upper=False)
+    if params.get('period_to'):
+        bound, exclusive = _parse_bound('period_to', params['period_to'], upper=True)
+        lookups['first_pickup_at__lt' if exclusive else 'first_pickup_at__lte'] = bound
+
+    return queryset.filter(**lookups)
@@ -0,0 +1,185 @@
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor_tokens(tokens):
+    querystring = parse.urlencode(tokens, doseq=True)
+    return b64encode(querystring.encode('ascii')).decode('ascii')
+
+
+def decode_cursor_tokens(encoded):
+    """Raises ValueError for anything that is not a cursor we issued."""
+    querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+    return {key: values[0] for key, values in parse.parse_qs(querystring, keep_blank_values=True).items()}
+
+
+def seek_after(queryset, fields, position, limit):
+    """
+    Up to ``limit`` rows after ``position`` in ascending ``fields`` order
+    (a (timestamp, id) pair), and whether there are more.
+    """
+    time_field, id_field = fields
+    queryset = queryset.annotate(keyset_time=F(time_field), keyset_id=F(id_field)).order_by(time_field, id_field)
+    if position is not None:
+        queryset = queryset.filter(
+            Q(**{f'{time_field}__gt': position[0]}) |
+            Q(**{time_field: position[0], f'{id_field}__gt': position[1]})
+        )
+    rows = list(queryset[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over ``(updated_date, id)``, newest first.
+
+    The cursor stores the position of the last row that was returned, so every
+    page is a range scan on the ``(updated_date, id)`` index and costs the same
+    no matter how deep the client pages. There is deliberately no ``count``.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('updated_date', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def page_window(self, queryset, request):
+        """
+        The sliced queryset of the requested page, one row more than the page
+        to tell whether there are more; also usable as a subquery (conditional
+        GET validators).
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        self.reverse, self.position = reverse, position = self.decode_cursor(request)
+        time_field, id_field = self.ordering
+        # Selected explicitly so the cursor is readable even when the columns were left out with only()
+        queryset = queryset.annotate(keyset_time=F(time_field), keyset_id=F(id_field))
+
+        if reverse:
+            # Paging backwards: walk the index the other way and flip the page afterwards.
+            queryset = queryset.order_by(time_field, id_field)
+            if position is not None:
+                queryset = queryset.filter(
+                    Q(**{f'{time_field}__gt': position[0]}) |
+                    Q(**{time_field: position[0], f'{id_field}__gt': position[1]})
+                )
+        else:
+            queryset = queryset.order_by(f'-{time_field}', f'-{id_field}')
+            if position is not None:
+                queryset = queryset.filter(
+                    Q(**{f'{time_field}__lt': position[0]}) |
+                    Q(**{time_field: position[0], f'{id_field}__lt': position[1]})
+                )
+        return queryset[:self.page_size + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_window(self.page_window(queryset, request))
+
+    def paginate_window(self, window):
+        """The page of a page_window() queryset."""
+        reverse, position = self.reverse, self.position
+        results = list(window)
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            has_next, has_previous = position is not None, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        self.next_position = self._position(results[-1]) if has_next and results else None
+        self.previous_position = self._position(results[0]) if has_previous and results else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(False, self.next_position)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(True, self.previous_position)
+
+    def _position(self, obj):
+        return obj.keyset_time, obj.keyset_id
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+        try:
+            tokens = decode_cursor_tokens(encoded)
+            reverse = bool(int(tokens.get('r', '0')))
+            timestamp = parse_datetime(tokens['t'])
+            pk = int(tokens['i'])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if timestamp is None:
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, (timestamp, pk)
+
+    def encode_cursor(self, reverse, position):
+        tokens = {'t': position[0].isoformat(), 'i': position[1]}
+        if reverse:
+            tokens['r'] = '1'
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, encode_cursor_tokens(tokens))
@@ -1,5 +1,6 @@
 from django.urls import path
 from api.views.chat import ChatList, ChatDetail
+from api.views.stream import load_stream
 # from api.views import amazon
 from api.views.auth import (
     RegisterUserView, ListUsersView, 
@@ -11,7 +12,7 @@ from api.views.auth import (
     PermissionDetailView)
 
 from api.views.load import (
-    TruckTagsDetailView, LoadListView, 
+    TruckTagsDetailView, LoadListView, LoadBoardView, LoadChangesView, LoadBulkView, LoadSearchView,
     LoadDetailView, DriverListView, 
     DriverDetailView, DriverTagsListView, 
     DriverTagsDetailView, TruckListView, 
@@ -27,7 +28,7 @@ from api.views.load import (
     CommoditiesListView, CommoditiesDetailView, OtherPayListView, 
     OtherPayDetailView, StopsListView, StopsDetailView, LoadTagsListView, 
     LoadTagsDetailView, PayListView, PayDetailView, DriverPayListView,
-    DriverPayDetailView, DriverPayCreateView, DriverExpenseListView, 
+    DriverPayDetailView, DriverPayPdfView, DriverPayCreateView, DriverPayPreviewView, PayrollRunListView, PayrollRunDetailView, DriverExpenseListView, 
     DriverExpenseDetailView, UnitListView, UnitDetailView, TeamListView,
     TeamDetailView)
 
@@ -58,6 +59,11 @@ urlpatterns = [
 
     path('load/', LoadListView.as_view(), name='load-list'),
     path('load/<int:pk>/', LoadDetailView.as_view(), name='load-detail'),
+    path('load/board/', LoadBoardView.as_view(), name='load-board'),
+    path('load/changes/', LoadChangesView.as_view(), name='load-changes'),
+    path('load/bulk/', LoadBulkView.as_view(), name='load-bulk'),
+    path('load/search/', LoadSearchView.as_view(), name='load-search'),
+    path('load/stream/', load_stream, name='load-stream'),
     path('load/tags/', LoadTagsListView.as_view(), name='load-tags-list'),
     path('load/tags/<int:pk>/', LoadTagsDetailView.as_view(), name='load-tags-detail'),
 
@@ -75,7 +81,11 @@ urlpatterns = [
     path('driver/pay/<int:pk>/', PayDetailView.as_view(), name='pay-detail'),
     path('driver/pay/driver/', DriverPayListView.as_view(), name='driver-pay-list'),
     path('driver/pay/driver/<int:pk>/', DriverPayDetailView.as_view(), name='driver-pay-detail'),
+    path('driver/pay/driver/<int:pk>/pdf/', DriverPayPdfView.as_view(), name='driver-pay-pdf'),
     path('driver/pay/create/', DriverPayCreateView.as_view(), name='driver-pay-create'),
+    path('driver/pay/preview/', DriverPayPreviewView.as_view(), name='driver-pay-preview'),
+    path('driver/pay/run/', PayrollRunListView.as_view(), name='payroll-run-list'),
+    path('driver/pay/run/<int:pk>/', PayrollRunDetailView.as_view(), name='payroll-run-detail'),
     path('driver/expense/', DriverExpenseListView.as_view(), name='driver-expense-list'),
     path('driver/expense/<int:pk>/', DriverExpenseDetailView.as_view(), name='driver-expense-detail'),
 
@@ -2,10 +2,15 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework import permissions
-from datetime import datetime
-from django.db.models import Sum, Q, Min, Max
+from datetime import datetime, timedelta
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import Sum, Q, F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
 from decimal import Decimal
-from rest_framework.pagination import PageNumberPagination
 from django.core.files.base import ContentFile
 
 
@@ -13,12 +18,12 @@ from apps.load.models.driver import Pay, DriverPay, DriverExpense
 from apps.load.models.truck import Unit
 from apps.load.models.team import Team
 from api.dto.load import TeamSerializer
-from apps.auth.models import Company
+from apps.auth.models import Company, User
 from apps.load.models import (
     Load, LoadTags, Driver, DriverTags, Trailer, 
     TrailerTags, TruckTags, Truck, Dispatcher,
     DispatcherTags, EmployeeTags, CustomerBroker, 
-    Stops, Employee, OtherPay, Commodities)
+    Stops, Employee, OtherPay, Commodities, LoadTombstone)
 
 from api.dto.load import (
     LoadSerializer, DriverSerializer, 
@@ -29,35 +34,27 @@ from api.dto.load import (
     EmployeeTagsSerializer, CustomerBrokerSerializer, 
     LoadTagsSerializer, StopsSerializer, OtherPaySerializer, 
     CommoditiesSerializer, PaySerializer, DriverPaySerializer, 
-    DriverExpenseSerializer,  UnitSerializer)
-
-
-class CustomPagination(PageNumberPagination):
-    page_size = 25
-    def get_paginated_response(self, data):
-        # Create a standard paginated response
-        response = Response({
-            'count': self.page.paginator.count,
-            'next': self.get_next_link(),
-            'previous': self.get_previous_link(),
-            'results': data
-        })
-        
-        # Replace the hostname in the pagination links
-        if response.data['next']:
-            response.data['next'] = response.data['next'].replace('https://0.0.0.0:8000', 'https://api1.biznes-armiya.uz')
-        if response.data['previous']:
-            response.data['previous'] = response.data['previous'].replace('https://0.0.0.0:8000', 'https://api1.biznes-armiya.uz')
-            
-        return response
-
+    DriverExpenseSerializer,  UnitSerializer, LoadBulkSerializer, PayrollRunSerializer, DriverPayPdfSerializer)
+from api.conditional import ConditionalGetMixin
+from api.filters import filter_loads
+from api.pagination import KeysetPagination, decode_cursor_tokens, encode_cursor_tokens, seek_after
+from apps.load.payroll import create_driver_pay, latest_pay, preview_settlement, settlement_response
+from apps.load.settlement_pdf import queue_settlement_pdf
+from apps.load.models.payroll_run import PayrollRun
 
 
+class SparseQuerysetMixin:
+    """Plans the detail queryset for the ?fields= / ?expand= the request asks for."""
+    def get_queryset(self):
+        return self.get_serializer_class().setup_eager_loading(super().get_queryset(), self.request)
 
-class TeamListView(APIView):
+class TeamListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         teams = Team.objects.all()
+        not_modified = self.not_modified(request, teams, TeamSerializer)
+        if not_modified:
+            return not_modified
         serializer = TeamSerializer(teams, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -68,16 +65,19 @@ class TeamListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class TeamDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TeamDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = Team.objects.all()
     serializer_class = TeamSerializer
 
-class UnitListView(APIView):
+class UnitListView(ConditionalGetMixin, APIView):
     # permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
-        units = Unit.objects.all()
-        serializer = UnitSerializer(units, many=True)
+        units = UnitSerializer.setup_eager_loading(Unit.objects.all(), request)
+        not_modified = self.not_modified(request, units, UnitSerializer)
+        if not_modified:
+            return not_modified
+        serializer = UnitSerializer(units, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -87,16 +87,19 @@ class UnitListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class UnitDetailView(generics.RetrieveUpdateDestroyAPIView):
+class UnitDetailView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     # permission_classes = [permissions.IsAuthenticated]
     queryset = Unit.objects.all()
     serializer_class = UnitSerializer
 
 
-class DriverExpenseListView(APIView):
+class DriverExpenseListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         driver_expenses = DriverExpense.objects.all()
+        not_modified = self.not_modified(request, driver_expenses, DriverExpenseSerializer)
+        if not_modified:
+            return not_modified
         serializer = DriverExpenseSerializer(driver_expenses, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -107,15 +110,18 @@ class DriverExpenseListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class DriverExpenseDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DriverExpenseDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = DriverExpense.objects.all()
     serializer_class = DriverExpenseSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class DriverPayListView(APIView):
+class DriverPayListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         driver_pays = DriverPay.objects.all()
+        not_modified = self.not_modified(request, driver_pays, DriverPaySerializer)
+        if not_modified:
+            return not_modified
         serializer = DriverPaySerializer(driver_pays, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -126,16 +132,37 @@ class DriverPayListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class DriverPayDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DriverPayDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = DriverPay.objects.all()
     serializer_class = DriverPaySerializer
 
 
-class PayListView(APIView):
+class DriverPayPdfView(ConditionalGetMixin, generics.RetrieveAPIView):
+    """
+    Settlement PDF holati: GET bilan kuzatiladi (ETag, 304), POST qayta
+    yaratishga navbatga qo'yadi. PDF lar apps/load/settlement_pdf.py da fonda yaratiladi.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    queryset = DriverPay.objects.all()
+    serializer_class = DriverPayPdfSerializer
+
+    def post(self, request, pk):
+        driver_pay = self.get_object()
+        if driver_pay.pdf_status in ('PENDING', 'RENDERING'):
+            return Response({"error": "The PDF is already being rendered."}, status=status.HTTP_409_CONFLICT)
+        queue_settlement_pdf([driver_pay.pk])
+        driver_pay.refresh_from_db()
+        return Response(self.get_serializer(driver_pay).data, status=status.HTTP_202_ACCEPTED)
+
+
+class PayListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         pays = Pay.objects.all()
+        not_modified = self.not_modified(request, pays, PaySerializer)
+        if not_modified:
+            return not_modified
         serializer = PaySerializer(pays, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -146,19 +173,26 @@ class PayListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class PayDetailView(generics.RetrieveUpdateDestroyAPIView):
+class PayDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = Pay.objects.all()
     serializer_class = PaySerializer
     
 
-class LoadListView(APIView):
+class LoadListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get(self, request):
-        loads = Load.objects.all()
-        serializer = LoadSerializer(loads, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        loads = LoadSerializer.setup_eager_loading(filter_loads(Load.objects.all(), request.query_params), request)
+        paginator = self.pagination_class()
+        window = paginator.page_window(loads, request)
+        not_modified = self.not_modified(request, window, LoadSerializer)
+        if not_modified:
+            return not_modified
+        page = paginator.paginate_window(window)
+        serializer = LoadSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         serializer = LoadSerializer(data=request.data, context={'request': request})  # request ni context sifatida uzatamiz
@@ -168,33 +202,260 @@ class LoadListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class LoadDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LoadBoardView(ConditionalGetMixin, APIView):
+    """
+    Compact read model for the dispatch board: one array per column, with
+    drivers, units and teams dictionary-encoded (the columns hold ids, the
+    lookup tables hold the display values). Built from values_list(), so it
+    never goes through LoadSerializer.
+
+    At most ``?limit=`` (default and cap max_rows) loads, newest first. When
+    more match, ``truncated`` is true and ``next`` (also a Link rel="next"
+    header) is the URL of the rest, seeking from the last row's
+    (updated_date, id).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    columns = ('id', 'load_id', 'status', 'driver', 'unit', 'team', 'first_pickup', 'last_delivery', 'pay', 'miles')
+    max_rows = 10000
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', self.max_rows)), self.max_rows)
+        except ValueError:
+            return Response({"error": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"error": "limit must be at least 1."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            position = self.decode_cursor(request.query_params.get('cursor'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+
+        loads = filter_loads(Load.objects.all(), request.query_params).order_by('-updated_date', '-id')
+        if position is not None:
+            loads = loads.filter(Q(updated_date__lt=position[0]) | Q(updated_date=position[0], id__lt=position[1]))
+        # limit + 1: qolgan qatorlar bormi, bilish uchun
+        window = loads[:limit + 1]
+        not_modified = self.not_modified(request, window, related=('driver__user', 'unit_id', 'team_id'))
+        if not_modified:
+            return not_modified
+
+        # updated_date faqat cursor uchun
+        rows = list(window.values_list(
+            'id', 'load_id', 'load_status', 'driver_id', 'unit_id_id', 'team_id_id',
+            'first_pickup_at', 'last_delivery_at', 'load_pay', 'mile', 'updated_date',
+        ))
+        truncated = len(rows) > limit
+        rows = rows[:limit]
+        next_url = None
+        if truncated:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', encode_cursor_tokens(
+                {'t': rows[-1][-1].isoformat(), 'i': rows[-1][0]}))
+
+        columns = [list(column) for column in zip(*(row[:-1] for row in rows))] or [[] for _ in self.columns]
+        data = dict(zip(self.columns, columns))
+
+        driver_ids = {pk for pk in data['driver'] if pk is not None}
+        unit_ids = {pk for pk in data['unit'] if pk is not None}
+        team_ids = {pk for pk in data['team'] if pk is not None}
+
+        drivers = {
+            pk: f"{first_name or ''} {last_name or ''}".strip()
+            for pk, first_name, last_name in Driver.objects.filter(id__in=driver_ids).values_list(
+                'id', 'user__first_name', 'user__last_name')
+        } if driver_ids else {}
+        units = dict(Unit.objects.filter(id__in=unit_ids).values_list('id', 'unit_number')) if unit_ids else {}
+        teams = dict(Team.objects.filter(id__in=team_ids).values_list('id', 'name')) if team_ids else {}
+
+        response = Response({
+            'count': len(data['id']),
+            'truncated': truncated,
+            'next': next_url,
+            'columns': data,
+            'drivers': drivers,
+            'units': units,
+            'teams': teams,
+        }, status=status.HTTP_200_OK)
+        if next_url:
+            response['Link'] = f'<{next_url}>; rel="next"'
+        return response
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """(updated_date, id) of the last row of the previous part, or None."""
+        if not cursor:
+            return None
+        tokens = decode_cursor_tokens(cursor)
+        timestamp = parse_datetime(tokens['t'])
+        if timestamp is None:
+            raise ValueError('Invalid timestamp')
+        return timestamp, int(tokens['i'])
+
+class LoadChangesView(APIView):
+    """
+    Delta feed for client-side replicas: the loads created or updated after
+    ``?since=<cursor>`` in (updated_date, id) order, tombstones for the ones
+    deleted since, and the cursor to pass next time. Without ``since`` it
+    starts from the beginning, which doubles as the initial sync; keep
+    calling while ``has_more`` is true.
+
+    Tombstones are kept for LoadTombstone.RETENTION (purge_load_tombstones),
+    so a cursor last caught up before that may have missed deletes: it gets
+    410 Gone and the client resyncs without ``since``.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    page_size = 500
+    max_page_size = 1000
+    # Rows only show up once they are this old, so a transaction that commits
+    # late with an earlier timestamp is not skipped by a cursor already past it.
+    settle_window = timedelta(seconds=2)
+
+    def get(self, request):
+        try:
+            position, tombstone_position, synced_at = self.decode_since(request.query_params.get('since'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise ValidationError({'since': 'Invalid cursor.'})
+        # tozalangan tombstonelar bu mijozga hali kerak bo'lishi mumkin
+        if synced_at is not None and synced_at < timezone.now() - LoadTombstone.RETENTION + self.settle_window:
+            return Response({"error": "The cursor has expired; resync without since."}, status=status.HTTP_410_GONE)
+        try:
+            page_size = min(int(request.query_params.get('page_size', self.page_size)), self.max_page_size)
+        except ValueError:
+            raise ValidationError({'page_size': 'Expected an integer.'})
+        horizon = timezone.now() - self.settle_window
+
+        loads = LoadSerializer.setup_eager_loading(Load.objects.filter(updated_date__lt=horizon), request)
+        loads, more_loads = seek_after(loads, ('updated_date', 'id'), position, page_size)
+        tombstones, more_tombstones = seek_after(
+            LoadTombstone.objects.filter(deleted_at__lt=horizon), ('deleted_at', 'id'), tombstone_position, page_size)
+
+        if loads:
+            position = (loads[-1].keyset_time, loads[-1].keyset_id)
+        if tombstones:
+            tombstone_position = (tombstones[-1].keyset_time, tombstones[-1].keyset_id)
+
+        has_more = more_loads or more_tombstones
+        # oxirigacha yetib kelgan vaqt: sahifalash davomida o'zgarmaydi
+        if not has_more or synced_at is None:
+            synced_at = horizon
+
+        serializer = LoadSerializer(loads, many=True, context={'request': request})
+        return Response({
+            'changes': serializer.data,
+            'deleted': [
+                {'id': tombstone.load_pk, 'load_id': tombstone.load_id, 'deleted_at': tombstone.deleted_at}
+                for tombstone in tombstones
+            ],
+            'cursor': self.encode_since(position, tombstone_position, synced_at),
+            'has_more': has_more,
+        }, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def decode_since(since):
+        """(load position, tombstone position, time the client was last caught up); each may be None."""
+        tokens = decode_cursor_tokens(since) if since else {}
+        positions = []
+        for time_key, id_key in (('t', 'i'), ('dt', 'di')):
+            if time_key not in tokens:
+                positions.append(None)
+                continue
+            timestamp = parse_datetime(tokens[time_key])
+            if timestamp is None:
+                raise ValueError('Invalid timestamp')
+            positions.append((timestamp, int(tokens[id_key])))
+        if 's' in tokens:
+            synced_at = parse_datetime(tokens['s'])
+            if synced_at is None:
+                raise ValueError('Invalid timestamp')
+        else:
+            # eski cursor: pozitsiyalarning eng yangisi
+            synced_at = max((position[0] for position in positions if position), default=None)
+        return positions[0], positions[1], synced_at
+
+    @staticmethod
+    def encode_since(position, tombstone_position, synced_at):
+        tokens = {'s': synced_at.isoformat()}
+        if position:
+            tokens.update(t=position[0].isoformat(), i=position[1])
+        if tombstone_position:
+            tokens.update(dt=tombstone_position[0].isoformat(), di=tombstone_position[1])
+        return encode_cursor_tokens(tokens)
+
+class LoadBulkView(APIView):
+    """
+    Creates and updates up to ``max_loads`` loads in one transaction:
+    ``{"loads": [{...load fields, "stops": [...], "commodities": [...], "other_pays": [...]}]}``.
+    Items (and nested rows) with an ``id`` are updated with the fields that
+    are sent, the rest are created. Nothing is written if any item is invalid.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_loads = 500
+
+    def post(self, request):
+        serializer = LoadBulkSerializer(
+            data=request.data.get('loads') if hasattr(request.data, 'get') else None, many=True, allow_empty=False, max_length=self.max_loads,
+            context={'request': request})
+        if not serializer.is_valid():
+            return Response({'loads': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        loads = serializer.save()
+        created = any(item.get('id') is None for item in serializer.initial_data)
+
+        saved = LoadSerializer.setup_eager_loading(Load.objects.filter(pk__in=[load.pk for load in loads]), request)
+        by_pk = {load.pk: load for load in saved}
+        data = LoadSerializer([by_pk[load.pk] for load in loads], many=True, context={'request': request}).data
+        return Response({'loads': data}, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+class LoadSearchView(APIView):
+    """
+    Ranked search over loads: ``?q=`` is matched against load_id,
+    reference_id, company/broker names, pickup/delivery locations and the
+    stops' company, city, state and reference_id (see apps/load/search.py).
+    Whole words and prefixes go through the full-text index, typos and
+    fragments of ids through the trigram index. Takes the load list filters,
+    ``?fields=``/``?expand=`` and ``?limit=``.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    default_limit = 20
+    max_limit = 100
+
+    def get(self, request):
+        term = request.query_params.get('q', '').strip().lower()
+        if not term:
+            raise ValidationError({'q': 'This parameter is required.'})
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            raise ValidationError({'limit': 'Expected an integer.'})
+
+        match = Q(search_document__trigram_word_similar=term) | Q(search_document__contains=term)
+        rank = TrigramWordSimilarity(term, 'search_document')
+        # every word as a prefix, AND'ed; only \w characters reach the raw tsquery
+        words = re.findall(r'\w+', term)
+        if words:
+            query = SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw', config='simple')
+            match |= Q(search_vector=query)
+            rank = rank + SearchRank(F('search_vector'), query)
+
+        loads = filter_loads(Load.objects.all(), request.query_params).filter(match)
+        loads = LoadSerializer.setup_eager_loading(loads.annotate(rank=rank), request).order_by('-rank', '-id')[:limit]
+        serializer = LoadSerializer(loads, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+class LoadDetailView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = Load.objects.all()
     serializer_class = LoadSerializer
 
 
 
-class DriverListView(APIView):
+class DriverListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
-    # pagination_class = CustomPagination
 
-    # def get(self, request):
-    #     drivers = Driver.objects.all()
-    #     paginator = self.pagination_class()
-    #     page = paginator.paginate_queryset(drivers, request)
-    #     serializer = DriverSerializer(page, many=True)
-    #     return paginator.get_paginated_response(serializer.data)
-    
-    # def post(self, request):
-    #     serializer = DriverSerializer(data=request.data)
-    #     if serializer.is_valid():
-    #         serializer.save()
-    #         return Response(serializer.data, status=status.HTTP_201_CREATED)
-    #     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     def get(self, request):
-        drivers = Driver.objects.all()
-        serializer = DriverSerializer(drivers, many=True)
+        drivers = DriverSerializer.setup_eager_loading(Driver.objects.all(), request)
+        not_modified = self.not_modified(request, drivers, DriverSerializer)
+        if not_modified:
+            return not_modified
+        serializer = DriverSerializer(drivers, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
     def post(self, request):
         serializer = DriverSerializer(data=request.data)
@@ -203,17 +464,20 @@ class DriverListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class DriverDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DriverDetailView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
 
     permission_classes = [permissions.IsAuthenticated]
     queryset = Driver.objects.all()
     serializer_class = DriverSerializer
 
 
-class DriverTagsListView(APIView):
+class DriverTagsListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         driver_tags = DriverTags.objects.all()
+        not_modified = self.not_modified(request, driver_tags, DriverTagsSerializer)
+        if not_modified:
+            return not_modified
         serializer = DriverTagsSerializer(driver_tags, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -224,16 +488,19 @@ class DriverTagsListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class DriverTagsDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DriverTagsDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = DriverTags.objects.all()
     serializer_class = DriverTagsSerializer
 
-class TrailerListView(APIView):
+class TrailerListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
-        trailers = Trailer.objects.all()
-        serializer = TrailerSerializer(trailers, many=True)
+        trailers = TrailerSerializer.setup_eager_loading(Trailer.objects.all(), request)
+        not_modified = self.not_modified(request, trailers, TrailerSerializer)
+        if not_modified:
+            return not_modified
+        serializer = TrailerSerializer(trailers, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     def post(self, request):
@@ -243,15 +510,18 @@ class TrailerListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class TrailerDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TrailerDetailView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = Trailer.objects.all()
     serializer_class = TrailerSerializer
 
-class TrailerTagsListView(APIView):
+class TrailerTagsListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         trailer_tags = TrailerTags.objects.all()
+        not_modified = self.not_modified(request, trailer_tags, TrailerTagsSerializer)
+        if not_modified:
+            return not_modified
         serializer = TrailerTagsSerializer(trailer_tags, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -262,16 +532,19 @@ class TrailerTagsListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class TrailerTagsDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TrailerTagsDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = TrailerTags.objects.all()
     serializer_class = TrailerTagsSerializer
 
-class TruckListView(APIView):
+class TruckListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
-        trucks = Truck.objects.all()
-        serializer = TruckSerializer(trucks, many=True)
+        trucks = TruckSerializer.setup_eager_loading(Truck.objects.all(), request)
+        not_modified = self.not_modified(request, trucks, TruckSerializer)
+        if not_modified:
+            return not_modified
+        serializer = TruckSerializer(trucks, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     def post(self, request):
@@ -281,15 +554,18 @@ class TruckListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class TruckDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TruckDetailView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = Truck.objects.all()
     serializer_class = TruckSerializer
 
-class TruckTagsListView(APIView):
+class TruckTagsListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         truck_tags = TruckTags.objects.all()
+        not_modified = self.not_modified(request, truck_tags, TruckTagsSerializer)
+        if not_modified:
+            return not_modified
         serializer = TruckTagsSerializer(truck_tags, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -300,16 +576,19 @@ class TruckTagsListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class TruckTagsDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TruckTagsDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = TruckTags.objects.all()
     serializer_class = TruckTagsSerializer
 
-class DispatcherListView(APIView):
+class DispatcherListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
-        dispatchers = Dispatcher.objects.all()
-        serializer = DispatcherSerializer(dispatchers, many=True)
+        dispatchers = DispatcherSerializer.setup_eager_loading(Dispatcher.objects.all(), request)
+        not_modified = self.not_modified(request, dispatchers, DispatcherSerializer)
+        if not_modified:
+            return not_modified
+        serializer = DispatcherSerializer(dispatchers, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     def post(self, request):
@@ -319,15 +598,18 @@ class DispatcherListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class DispatcherDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DispatcherDetailView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = Dispatcher.objects.all()
     serializer_class = DispatcherSerializer
 
-class DispatcherTagsListView(APIView):
+class DispatcherTagsListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         dispatcher_tags = DispatcherTags.objects.all()
+        not_modified = self.not_modified(request, dispatcher_tags, DispatcherTagsSerializer)
+        if not_modified:
+            return not_modified
         serializer = DispatcherTagsSerializer(dispatcher_tags, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -338,16 +620,19 @@ class DispatcherTagsListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class DispatcherTagsDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DispatcherTagsDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = DispatcherTags.objects.all()
     serializer_class = DispatcherTagsSerializer
 
-class EmployeeListView(APIView):
+class EmployeeListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
-        employees = Employee.objects.all()
-        serializer = EmployeeSerializer(employees, many=True)
+        employees = EmployeeSerializer.setup_eager_loading(Employee.objects.all(), request)
+        not_modified = self.not_modified(request, employees, EmployeeSerializer)
+        if not_modified:
+            return not_modified
+        serializer = EmployeeSerializer(employees, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     def post(self, request):
@@ -357,15 +642,18 @@ class EmployeeListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class EmployeeDetailView(generics.RetrieveUpdateDestroyAPIView):
+class EmployeeDetailView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = Employee.objects.all()
     serializer_class = EmployeeSerializer
 
-class EmployeeTagsListView(APIView):
+class EmployeeTagsListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         employee_tags = EmployeeTags.objects.all()
+        not_modified = self.not_modified(request, employee_tags, EmployeeTagsSerializer)
+        if not_modified:
+            return not_modified
         serializer = EmployeeTagsSerializer(employee_tags, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -376,15 +664,18 @@ class EmployeeTagsListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class EmployeeTagsDetailView(generics.RetrieveUpdateDestroyAPIView):
+class EmployeeTagsDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = EmployeeTags.objects.all()
     serializer_class = EmployeeTagsSerializer
     
-class CustomerBrokerListView(APIView):
+class CustomerBrokerListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         custom_brokers = CustomerBroker.objects.all()
+        not_modified = self.not_modified(request, custom_brokers, CustomerBrokerSerializer)
+        if not_modified:
+            return not_modified
         serializer = CustomerBrokerSerializer(custom_brokers, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -395,15 +686,18 @@ class CustomerBrokerListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class CustomerBrokerDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CustomerBrokerDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = CustomerBroker.objects.all()
     serializer_class = CustomerBrokerSerializer
 
-class CommoditiesListView(APIView):
+class CommoditiesListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         commodities = Commodities.objects.all()
+        not_modified = self.not_modified(request, commodities, CommoditiesSerializer)
+        if not_modified:
+            return not_modified
         serializer = CommoditiesSerializer(commodities, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -414,15 +708,18 @@ class CommoditiesListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class CommoditiesDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CommoditiesDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = Commodities.objects.all()
     serializer_class = CommoditiesSerializer
 
-class OtherPayListView(APIView):
+class OtherPayListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         other_pays = OtherPay.objects.all()
+        not_modified = self.not_modified(request, other_pays, OtherPaySerializer)
+        if not_modified:
+            return not_modified
         serializer = OtherPaySerializer(other_pays, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -433,15 +730,18 @@ class OtherPayListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class OtherPayDetailView(generics.RetrieveUpdateDestroyAPIView):
+class OtherPayDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = OtherPay.objects.all()
     serializer_class = OtherPaySerializer
 
-class StopsListView(APIView):
+class StopsListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         stops = Stops.objects.all()
+        not_modified = self.not_modified(request, stops, StopsSerializer)
+        if not_modified:
+            return not_modified
         serializer = StopsSerializer(stops, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -452,15 +752,18 @@ class StopsListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class StopsDetailView(generics.RetrieveUpdateDestroyAPIView):
+class StopsDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = Stops.objects.all()
     serializer_class = StopsSerializer
 
-class LoadTagsListView(APIView):
+class LoadTagsListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         load_tags = LoadTags.objects.all()
+        not_modified = self.not_modified(request, load_tags, LoadTagsSerializer)
+        if not_modified:
+            return not_modified
         serializer = LoadTagsSerializer(load_tags, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -471,18 +774,12 @@ class LoadTagsListView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class LoadTagsDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LoadTagsDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
     queryset = LoadTags.objects.all()
     serializer_class = LoadTagsSerializer
 
 
-
-from datetime import datetime
-
-
-
-
 class DriverPayCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
@@ -492,8 +789,8 @@ class DriverPayCreateView(APIView):
         pay_to = request.data.get('pay_to')
         driver_id = request.data.get('driver')
         notes = request.data.get('notes', '')
-        invoice_number = request.data.get('invoice_number')  # NEW: Get invoice_number from POST
-        weekly_number = request.data.get('weekly_number')    # NEW: Get weekly_number from POST
+        invoice_number = request.data.get('invoice_number')
+        weekly_number = request.data.get('weekly_number')
 
         # Sana formatini tekshirish va konvertatsiya qilish
         try:
@@ -504,390 +801,78 @@ class DriverPayCreateView(APIView):
 
         # Driver obyektini olish
         try:
-            driver = Driver.objects.get(id=driver_id)
+            driver = Driver.objects.select_related('user').get(id=driver_id)
         except Driver.DoesNotExist:
             return Response({"error": "Driver not found."}, status=status.HTTP_404_NOT_FOUND)
 
         # Driverga bog'langan Pay obyektini olish
+        pay = latest_pay(driver)
+        if pay is None:
+            return Response({"error": "No Pay found for this driver."}, status=status.HTTP_404_NOT_FOUND)
+
+        # Hisob-kitob va yozuvlar apps/load/payroll.py da
+        _, response_data = create_driver_pay(
+            driver, pay, pay_from_date, pay_to_date, notes=notes,
+            invoice_number=invoice_number, weekly_number=weekly_number)
+        return Response(response_data, status=status.HTTP_201_CREATED)
+
+
+class DriverPayPreviewView(APIView):
+    """DriverPayCreateView javobining o'zi, hech narsa yozilmaydi (DriverPay, driver.cost, invoice/weekly)"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        pay_from = request.query_params.get('pay_from')
+        pay_to = request.query_params.get('pay_to')
+        driver_id = request.query_params.get('driver')
+
         try:
-            pay = Pay.objects.filter(driver=driver).latest('id')
-        except Pay.DoesNotExist:
+            pay_from_date = datetime.strptime(pay_from or '', '%Y-%m-%d').date()
+            pay_to_date = datetime.strptime(pay_to or '', '%Y-%m-%d').date()
+        except ValueError:
+            return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            driver = Driver.objects.select_related('user').get(id=driver_id)
+        except (Driver.DoesNotExist, ValueError):
+            return Response({"error": "Driver not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        pay = latest_pay(driver)
+        if pay is None:
             return Response({"error": "No Pay found for this driver."}, status=status.HTTP_404_NOT_FOUND)
 
-        # DriverPay obyektini boshlang'ich saqlash
+        settlement = preview_settlement(driver, pay, pay_from_date, pay_to_date)
+        now = datetime.now()
         driver_pay = DriverPay(
-            driver=driver,
-            pay=pay,
-            pay_from=pay_from_date,
-            pay_to=pay_to_date,
-            amount=0.0,
-            notes=notes,
-            invoice_number=invoice_number,  # NEW: Save invoice_number
-            weekly_number=weekly_number,    # NEW: Save weekly_number
-            created_at=datetime.now(),
-            updated_at=datetime.now()
-        )
-        driver_pay.save()
-
-        # FIXED: Changed annotation names to avoid conflicts with existing model fields
-        loads_with_dates = Load.objects.filter(
-            driver=driver,
-            stop__appointmentdate__isnull=False
-        ).annotate(
-            calculated_pickup_date=Min('stop__appointmentdate', filter=Q(stop__stop_name='PICKUP')),
-            calculated_delivery_date=Max('stop__appointmentdate', filter=Q(stop__stop_name='DELIVERY'))
-        ).filter(
-            calculated_pickup_date__isnull=False,
-            calculated_delivery_date__isnull=False
-        )
-
-        # Filter loads based on overlap with pay period using new annotation names
-        filtered_loads = loads_with_dates.filter(
-            Q(calculated_pickup_date__date__gte=pay_from_date, calculated_pickup_date__date__lte=pay_to_date) |  # Pickup in period
-            Q(calculated_delivery_date__date__gte=pay_from_date, calculated_delivery_date__date__lte=pay_to_date) |  # Delivery in period
-            Q(calculated_pickup_date__date__lte=pay_from_date, calculated_delivery_date__date__gte=pay_to_date)  # Period within load span
-        ).distinct()
-
-        # Hisoblash va natijani tayyorlash
-        total_pay = 0.0
-        total_load_pays = 0.0
-        total_other_pays = 0.0
-        load_details = []
-        chargebag_deductions = []
-        total_loads_formula = []
-        total_other_pays_formula = []
-        total_chargebag_amount = 0.0  # FIXED: Track total chargebag separately
-
-        for load in filtered_loads:
-            load_payment = 0.0
-            load_formula = []
-            if load.load_pay and pay.standart:
-                load_payment = float(load.load_pay) * (float(pay.standart) / 100)
-                total_load_pays += load_payment
-                load_formula.append(f"${load.load_pay:.2f} * {pay.standart}%")
-
-            load_total_pay = float(load.total_pay) if load.total_pay else 0.0
-
-            other_pays = OtherPay.objects.filter(load=load)
-            load_chargebag_amount = 0.0
-            other_pay_details = []
-
-            for other_pay in other_pays:
-                if other_pay.amount:
-                    amount = float(other_pay.amount)
-                    
-                    if other_pay.pay_type in ['DETENTION', 'LAYOVER']:
-                        # DETENTION va LAYOVER: standart foiz bilan hisoblanadi va qo'shiladi
-                        amount_with_percentage = amount * (float(pay.standart) / 100) if pay.standart else amount
-                        load_payment += amount_with_percentage
-                        total_other_pays += amount_with_percentage
-                        total_other_pays_formula.append(f"${amount:.2f} * {pay.standart}%")
-                        other_pay_info = {
-                            "pay_type": other_pay.pay_type,
-                            "formula": f"${amount:.2f} * {pay.standart}%",
-                            "result": f"${amount_with_percentage:.2f}",
-                            "note": other_pay.note if other_pay.note else ''
-                        }
-                    elif other_pay.pay_type == 'CHARGEBACK':
-                        # CHARGEBACK: ayiriladi (deduction) - FIXED: subtract from load_payment
-                        load_chargebag_amount += amount
-                        total_chargebag_amount += amount
-                        load_payment -= amount  # FIX: Subtract from individual load payment
-                        chargebag_deductions.append({
-                            "load_id": load.load_id,
-                            "amount": f"${amount:.2f}",
-                            "note": other_pay.note if other_pay.note else '',
-                            "pay_type": other_pay.pay_type
-                        })
-                        other_pay_info = {
-                            "pay_type": other_pay.pay_type,
-                            "formula": f"-${amount:.2f}",
-                            "result": f"-${amount:.2f}",
-                            "note": other_pay.note if other_pay.note else ''
-                        }
-                    elif other_pay.pay_type in ['EQUIPMENT', 'LUMPER', 'DRIVERASSIST', 'TRAILERWASH', 'ESCORTFEE', 'BONUS', 'OTHER']:
-                        # Boshqa barcha payment typelar: to'g'ridan-to'g'ri qo'shiladi
-                        load_payment += amount
-                        total_other_pays += amount
-                        total_other_pays_formula.append(f"${amount:.2f}")
-                        other_pay_info = {
-                            "pay_type": other_pay.pay_type,
-                            "formula": f"${amount:.2f}",
-                            "result": f"${amount:.2f}",
-                            "note": other_pay.note if other_pay.note else ''
-                        }
-                    else:
-                        # Noma'lum payment typelar uchun default behavior
-                        load_payment += amount
-                        total_other_pays += amount
-                        total_other_pays_formula.append(f"${amount:.2f}")
-                        other_pay_info = {
-                            "pay_type": other_pay.pay_type,
-                            "formula": f"${amount:.2f}",
-                            "result": f"${amount:.2f}",
-                            "note": other_pay.note if other_pay.note else ''
-                        }
-
-                    other_pay_details.append(other_pay_info)
-
-            # Get actual pickup and delivery information from stops
-            pickup_stop = None
-            delivery_stop = None
-            
-            # Access stops from the load object
-            for stop in load.stop.all():
-                if stop.stop_name == 'PICKUP':
-                    pickup_stop = stop
-                elif stop.stop_name == 'DELIVERY':
-                    delivery_stop = stop
-            
-            pickup_info = "N/A"
-            delivery_info = "N/A"
-            
-            if pickup_stop and pickup_stop.appointmentdate:
-                pickup_location = f"{pickup_stop.city}, {pickup_stop.state}" if pickup_stop.city else pickup_stop.address1
-                pickup_info = f"{pickup_stop.appointmentdate.strftime('%Y-%m-%d')}, {pickup_location}"
-            
-            if delivery_stop and delivery_stop.appointmentdate:
-                delivery_location = f"{delivery_stop.city}, {delivery_stop.state}" if delivery_stop.city else delivery_stop.address1
-                delivery_info = f"{delivery_stop.appointmentdate.strftime('%Y-%m-%d')}, {delivery_location}"
-
-            load_info = {
-                "Load #": load.load_id,
-                "Pickup": pickup_info,
-                "Delivery": delivery_info,
-                "Formula": " + ".join(load_formula) if load_formula else "N/A",
-                "Result": f"${load_payment:.2f}",
-                "Notes": load.note if load.note else '',
-                "Chargebag Deduction": f"${load_chargebag_amount:.2f}" if load_chargebag_amount > 0 else None,
-                "Other Payments": other_pay_details if other_pay_details else None
-            }
-            load_details.append(load_info)
-            if load_formula:
-                total_loads_formula.append(f"({load_info['Formula']} = ${load_payment:.2f})")
-
-        escrow_weekly = driver.escrow_deposit if driver.escrow_deposit else 0
-
-        # Fix 2: Update the driver's cost field by adding the escrow amount
-        if escrow_weekly > 0:
-            driver.cost = (driver.cost or 0) + escrow_weekly
-            driver.save()
-
-        # UPDATED: Filter expenses by date range and update invoice_number, weekly_number
-        expenses = DriverExpense.objects.filter(
-            driver=driver,
-            expense_date__gte=pay_from_date,
-            expense_date__lte=pay_to_date
-        )
-
-        # NEW: Update the filtered expenses with invoice_number and weekly_number
-        if invoice_number or weekly_number:
-            update_fields = {}
-            if invoice_number:
-                update_fields['invoice_number'] = invoice_number
-            if weekly_number:
-                update_fields['weekly_number'] = weekly_number
-            
-            if update_fields:
-                expenses.update(**update_fields)
-
-        # NEW: Update the filtered loads with invoice_number and weekly_number
-        if invoice_number or weekly_number:
-            load_update_fields = {}
-            if invoice_number:
-                load_update_fields['invoice_number'] = invoice_number
-            if weekly_number:
-                load_update_fields['weekly_number'] = weekly_number
-            
-            if load_update_fields:
-                filtered_loads.update(**load_update_fields)
-
-        total_expenses = 0.0
-        total_income = 0.0
-        expense_details = []
-        income_formula = []
-        expenses_formula = []
-
-        for expense in expenses:
-            amount = float(expense.amount)
-            if expense.transaction_type == '+':
-                total_income += amount
-                income_formula.append(f"${amount:.2f}")
-            elif expense.transaction_type == '-':
-                total_expenses += amount
-                expenses_formula.append(f"${amount:.2f}")
-
-            expense_details.append({
-                "Description": expense.description,
-                "Formula": f"{'+' if expense.transaction_type == '+' else '-'}${amount:.2f}",
-                "Result": f"${amount:.2f}",
-                "Type": "Income" if expense.transaction_type == '+' else "Expense",
-                "Date": expense.expense_date.strftime('%Y-%m-%d') if expense.expense_date else 'N/A'
-            })
-
-        # FIXED: Calculate final total_pay correctly - include all load payments
-        print(f"DEBUG: total_load_pays = {total_load_pays}")
-        print(f"DEBUG: total_other_pays = {total_other_pays}")
-        print(f"DEBUG: total_chargebag_amount = {total_chargebag_amount}")
-        print(f"DEBUG: escrow_weekly = {escrow_weekly}")
-        print(f"DEBUG: total_expenses = {total_expenses}")
-        print(f"DEBUG: total_income = {total_income}")
-        
-        total_pay = total_load_pays + total_other_pays - escrow_weekly - total_expenses + total_income - total_chargebag_amount
-
-        print(f"DEBUG: calculated total_pay = {total_pay}")
-        total_pay = max(total_pay, 0)
-
-        # Prepare total_pay formula
-        total_pay_formula = []
-        if total_load_pays > 0:
-            total_pay_formula.append(f"Load Pays: ${total_load_pays:.2f}")
-        if total_other_pays > 0:
-            total_pay_formula.append(f"Other Pays: ${total_other_pays:.2f}")
-        if total_chargebag_amount > 0:
-            total_pay_formula.append(f"Chargeback: -${total_chargebag_amount:.2f}")
-        if escrow_weekly > 0:
-            total_pay_formula.append(f"Escrow: -${escrow_weekly:.2f}")
-        if total_income > 0:
-            total_pay_formula.append(f"Income: ${total_income:.2f}")
-        if total_expenses > 0:
-            total_pay_formula.append(f"Expenses: -${total_expenses:.2f}")
-
-        driver_pay.loads = load_details
-        driver_pay.amount = total_pay
-        driver_pay.save()
-
-        # Driver ma'lumotlari
-        driver_info = {
-            "first_name": driver.user.first_name if driver.user else None,
-            "last_name": driver.user.last_name if driver.user else None,
-            "contact_number": driver.user.telephone if driver.user else None,
-            "address1": driver.user.address if driver.user else None,
-            "generate_date": driver_pay.created_at.strftime('%Y-%m-%d %H:%M:%S') if driver_pay.created_at else None,
-            "report_date": driver_pay.updated_at.strftime('%Y-%m-%d %H:%M:%S') if driver_pay.updated_at else None,
-            "search_from": driver_pay.pay_from.strftime('%Y-%m-%d') if driver_pay.pay_from else None,
-            "search_to": driver_pay.pay_to.strftime('%Y-%m-%d') if driver_pay.pay_to else None,
-            "company_name": driver.user.company_name if driver.user else None,
-            "invoice_number": driver_pay.invoice_number,  # NEW: Add invoice_number to response
-            "weekly_number": driver_pay.weekly_number,    # NEW: Add weekly_number to response
-        }
-
-        # UPDATED: Get company information from Company model instead of driver.user
-        try:
-            company = Company.objects.first()  # Get first company (no filter needed)
-            company_info = {
-                "company_name": company.company_name if company else None,
-                "phone": company.phone if company else None,
-                "fax": company.fax if company else None,
-                "state": company.state if company else None,
-                "city": company.city if company else None,
-                "zip": company.zip if company else None,
-                "company_logo": company.company_logo.url if company and company.company_logo else None,
-            }
-        except Company.DoesNotExist:
-            company_info = {
-                "company_name": None,
-                "phone": None,
-                "fax": None,
-                "state": None,
-                "city": None,
-                "zip": None,
-                "company_logo": None,
-            }
-
-        # Yakuniy javob
-        response_data = {
-            "driver": driver_info,
-            "company_info": company_info,  # UPDATED: Changed from user_admin to company_info
-            "loads": load_details,
-            "total_load_pays": {
-                "Formula": " + ".join(total_loads_formula) if total_loads_formula else "N/A",
-                "Result": f"${total_load_pays:.2f}"
-            },
-            "total_other_pays": {
-                "Formula": " + ".join(total_other_pays_formula) if total_other_pays_formula else "N/A",
-                "Result": f"${total_other_pays:.2f}"
-            },
-            "escrow_deduction": {
-                "Formula": f"-${escrow_weekly:.2f}" if escrow_weekly else "N/A",
-                "Result": f"${escrow_weekly:.2f}"
-            },
-            "chargeback_deductions": chargebag_deductions,
-            "expenses": expense_details,
-            "total_expenses": {
-                "Formula": " + ".join(expenses_formula) if expenses_formula else "N/A",
-                "Result": f"${total_expenses:.2f}"
-            },
-            "total_income": {
-                "Formula": " + ".join(income_formula) if income_formula else "N/A",
-                "Result": f"${total_income:.2f}"
-            },
-            "total_pay": {
-                "Formula": " + ".join(total_pay_formula) if total_pay_formula else "N/A",
-                "Result": f"${total_pay:.2f}"
-            }
-        }
-
-        # Company Driver uchun qo'shimcha hisob-kitob
-        if driver.driver_type == 'COMPANY_DRIVER':
-            # Company Driver uchun miles va pay hisoblash
-            cd_loads_data = []
-            total_miles = 0
-            
-            for load in filtered_loads:
-                # Get loaded miles from load.mile field
-                loaded_miles = load.mile if load.mile else 0
-                total_miles += loaded_miles
-                
-                # Get pickup and delivery locations
-                pickup_location = "N/A"
-                delivery_location = "N/A"
-                
-                for stop in load.stop.all():
-                    if stop.stop_name == 'PICKUP':
-                        pickup_location = f"{stop.city}, {stop.state}" if stop.city else stop.address1
-                    elif stop.stop_name == 'DELIVERY':
-                        delivery_location = f"{stop.city}, {stop.state}" if stop.city else stop.address1
-                
-                cd_loads_data.append({
-                    'load_number': load.load_id,
-                    'load_id': load.load_id,
-                    'loaded_miles': loaded_miles,
-                    'pickup_location': pickup_location,
-                    'delivery_location': delivery_location,
-                    'trip': f"{pickup_location} - {delivery_location}"
-                })
-            
-            # Calculate company driver pay (total miles * $0.65)
-            miles_rate = 0.65
-            company_driver_pay = total_miles * miles_rate
-            
-            # Save company driver data to DriverPay model
-            driver_pay.total_miles = total_miles
-            driver_pay.miles_rate = miles_rate
-            driver_pay.company_driver_pay = company_driver_pay
-            driver_pay.company_driver_data = {
-                'loads': cd_loads_data,
-                'total_miles': total_miles,
-                'miles_rate': miles_rate,
-                'total_pay': company_driver_pay,
-                'calculation_summary': {
-                    'formula': f"{total_miles} miles × ${miles_rate} = ${company_driver_pay:.2f}",
-                    'loads_count': len(cd_loads_data)
-                }
-            }
-            driver_pay.save()
-            
-            # Add company driver data to response
-            response_data['company_driver_data'] = {
-                'total_miles': total_miles,
-                'miles_rate': f"${miles_rate}",
-                'company_driver_pay': f"${company_driver_pay:.2f}",
-                'loads_detail': cd_loads_data,
-                'calculation_summary': {
-                    'formula': f"{total_miles} miles × ${miles_rate} = ${company_driver_pay:.2f}",
-                    'loads_count': len(cd_loads_data)
-                }
-            }
-
-        return Response(response_data, status=status.HTTP_201_CREATED)
\ No newline at end of file
+            driver=driver, pay=pay, pay_from=pay_from_date, pay_to=pay_to_date, amount=settlement["amount"],
+            invoice_number=request.query_params.get('invoice_number'),
+            weekly_number=request.query_params.get('weekly_number'),
+            created_at=now, updated_at=now)
+        response_data = settlement_response(driver, driver_pay, settlement)
+        response_data["preview"] = True
+        return Response(response_data, status=status.HTTP_200_OK)
+
+class PayrollRunListView(ConditionalGetMixin, APIView):
+    """Barcha aktiv driverlar uchun DriverPay: run navbatga qo'yiladi, `run_payroll --worker` hisoblaydi (apps/load/payroll_run.py)"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        runs = PayrollRun.objects.all()
+        not_modified = self.not_modified(request, runs, PayrollRunSerializer)
+        if not_modified:
+            return not_modified
+        serializer = PayrollRunSerializer(runs, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        serializer = PayrollRunSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # PENDING: `run_payroll --worker` hisoblaydi; progress: GET driver/pay/run/<id>/
+        run = serializer.save(created_by=request.user)
+        return Response(PayrollRunSerializer(run).data, status=status.HTTP_202_ACCEPTED)
+
+
+class PayrollRunDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    queryset = PayrollRun.objects.all()
+    serializer_class = PayrollRunSerializer
@@ -0,0 +1,71 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from api.filters import parse_ids
+from apps.load.events import SCOPE_KEYS, broker
+
+
+HEARTBEAT_SECONDS = 15
+
+
+def authenticate(request):
+    """JWT from the Authorization header, or from ?token= since EventSource cannot set headers."""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None and request.GET.get('token'):
+        raw_token = request.GET['token'].encode()
+    if raw_token is None:
+        return None
+    return authentication.get_user(authentication.get_validated_token(raw_token))
+
+
+async def load_stream(request):
+    """
+    Server-sent events for load changes: one ``load`` event per created,
+    updated or deleted load, or per load whose stops changed. Narrow it with
+    ``?team=``, ``?dispatcher=`` and ``?driver=`` (comma separated ids).
+    A ``resync`` event means the client fell behind and should catch up
+    through /api/load/changes/.
+
+    Needs the ASGI application (config.asgi); the broker is in-process.
+    """
+    try:
+        user = await sync_to_async(authenticate)(request)
+    except (InvalidToken, AuthenticationFailed) as exc:
+        return JsonResponse({'detail': str(exc.default_detail)}, status=401)
+    if user is None or not user.is_active:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    try:
+        filters = {key: parse_ids(key, request.GET[key]) for key in SCOPE_KEYS if request.GET.get(key)}
+    except ValidationError as exc:
+        return JsonResponse(exc.detail, status=400)
+
+    async def events():
+        subscription = broker.subscribe(filters)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                if frame is None:
+                    yield 'event: resync\ndata: {}\n\n'
+                    return
+                yield frame
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx would otherwise buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps_auth', '0018_user_company_user_profile_photo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, blank=True, db_index=True, null=True),
+        ),
+    ]
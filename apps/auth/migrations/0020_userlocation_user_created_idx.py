@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 21:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps_auth', '0019_user_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userlocation',
+            index=models.Index(fields=['user', 'created_at'], name='userlocation_user_created_idx'),
+        ),
+    ]
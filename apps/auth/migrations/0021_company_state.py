@@ -0,0 +1,58 @@
+from django.db import migrations, models
+
+# Company modeli migratsiyalardan ajralib qolgan: ishlayotgan bazada ustunlar
+# allaqachon bor, migratsiyadan qurilgan (yangi / test) bazada esa yo'q.
+# Holat modelga moslanadi, bazada faqat yo'q ustunlar qo'shiladi, eski
+# ustunlar o'chirilmaydi, faqat NOT NULL olib tashlanadi.
+COLUMNS = ('company_name', 'phone', 'fax', 'state', 'city', 'zip', 'address')
+
+ADD_COLUMNS = "".join(
+    f'ALTER TABLE apps_auth_company ADD COLUMN IF NOT EXISTS "{column}" varchar(255) NULL;\n'
+    for column in (*COLUMNS, 'company_logo')
+)
+
+RELAX_LEGACY_COLUMNS = """
+DO $$
+DECLARE
+    legacy text;
+BEGIN
+    FOREACH legacy IN ARRAY ARRAY['name', 'created_at', 'updated_at'] LOOP
+        IF EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_schema = current_schema() AND table_name = 'apps_auth_company'
+                     AND column_name = legacy) THEN
+            EXECUTE format('ALTER TABLE apps_auth_company ALTER COLUMN %I DROP NOT NULL', legacy);
+        END IF;
+    END LOOP;
+END $$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps_auth', '0020_userlocation_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(ADD_COLUMNS + RELAX_LEGACY_COLUMNS, migrations.RunSQL.noop),
+            ],
+            state_operations=[
+                migrations.RemoveField(model_name='company', name='admin'),
+                migrations.RemoveField(model_name='company', name='created_at'),
+                migrations.RemoveField(model_name='company', name='name'),
+                migrations.RemoveField(model_name='company', name='updated_at'),
+                *(migrations.AddField(
+                    model_name='company',
+                    name=column,
+                    field=models.CharField(blank=True, max_length=255, null=True),
+                ) for column in COLUMNS),
+                migrations.AddField(
+                    model_name='company',
+                    name='company_logo',
+                    field=models.FileField(blank=True, null=True, upload_to='company-logo'),
+                ),
+            ],
+        ),
+    ]
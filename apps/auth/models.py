@@ -58,6 +58,7 @@ class User(AbstractUser):
     fax = models.CharField(max_length=255, blank=True, null=True)
     company = models.ForeignKey('Company', on_delete=models.SET_NULL, null=True, blank=True, related_name='users')    
     profile_photo = models.FileField(upload_to='media/profile', default='media/profile/profile_avatar.jpg', blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
 
 
     USERNAME_FIELD = 'email'
@@ -84,6 +85,12 @@ class UserLocation(models.Model):
     device_info = models.TextField(blank=True, null=True)  # Uzunroq matn uchun TextField
     page_status = models.CharField(max_length=10, choices=[('open', 'Open'), ('hidden', 'Hidden')], default='open')  # String uchun CharField
 
+    class Meta:
+        indexes = [
+            # Foydalanuvchining oxirgi joylashuvi: user bo'yicha, created_at kamayish tartibida
+            models.Index(fields=['user', 'created_at'], name='userlocation_user_created_idx'),
+        ]
+
     def get_google_maps_url(self):
         return f"https://www.google.com/maps?q={self.latitude},{self.longitude}"
 
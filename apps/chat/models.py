@@ -1,39 +1,35 @@
+import logging
+import time
 from django.db import models
-import requests
 from apps.load.models import Load
 from apps.auth.models import User
 from PIL import Image
 from reportlab.pdfgen import canvas
 import os
 from django.conf import settings
-
-# Telegram ID formatini tekshirish va to'g'rilash
-def process_telegram_id(telegram_id):
-    """
-    Telegram ID ni qaysi formatda ekanligini tekshirish va to'g'ri formatga o'zgartirish
-    - '@username' formatidan username qilib qaytaradi
-    - 'id:123456789' formatidan faqat raqamni qaytaradi
-    - '@username extra text' formatidan username qilib qaytaradi
-    - Boshqa holatda qiymat o'zgarmaydi
-    """
-    if not telegram_id:
-        return None
-        
-    # '@username' formatini tekshirish
-    if telegram_id.startswith('@'):
-        # '@username' formatidagi bo'lsa, qo'shimcha so'zlarni olib tashlash
-        username = telegram_id.split()[0]  # Birinchi so'zni olish (@ bilan)
-        return username
-        
-    # 'id:123456789' formatini tekshirish
-    if telegram_id.lower().startswith('id:'):
-        # Faqat ID raqamini qaytarish
-        id_parts = telegram_id.split(':')
-        if len(id_parts) > 1:
-            return id_parts[1].strip()
-    
-    # Boshqa formatlar uchun o'zgartirish kerak emas
-    return telegram_id
+from utils.telegram import TelegramError, TelegramRetry, process_telegram_id, telegram_client
+
+logger = logging.getLogger(__name__)
+
+# Chat xabari foydalanuvchi so'rovida yuboriladi: load xabarlari navbatini
+# (guruh limiti) kutmaydi, 429 / limit bo'lsa qisqa kutib qayta uriniladi
+RELAY_ATTEMPTS = 3
+RELAY_MAX_WAIT = 5  # sekund
+
+
+def relay_message(bot_token, method, data, files=None):
+    """One Bot API call for a chat message, retried after short 429 / rate-limit waits."""
+    for attempt in range(1, RELAY_ATTEMPTS + 1):
+        for _, file in (files or {}).values():
+            file.seek(0)
+        try:
+            return telegram_client().call(bot_token, method, data, files=files, chat_limit=False)
+        except TelegramRetry as e:  # TelegramThrottled ham
+            wait = e.retry_after or 1
+            if attempt == RELAY_ATTEMPTS or wait > RELAY_MAX_WAIT:
+                raise
+            logger.info("Chat relay %s: retrying in %s s (%s)", method, wait, e)
+            time.sleep(wait)
 
 class Chat(models.Model):
     load_id = models.ForeignKey(Load, related_name='LoadChat', on_delete=models.CASCADE)
@@ -53,11 +49,15 @@ class Chat(models.Model):
             
             # Agar team belgilanmagan bo'lsa yoki telegram ma'lumotlari bo'lmasa, funksiyadan chiqamiz
             if not team or not team.telegram_group_id or not self.load_id.group_message_id:
-                print("Team not assigned, Telegram configuration missing, or load has no group_message_id.")
+                logger.info("Chat %s not relayed: team not assigned, Telegram configuration missing, "
+                            "or load has no group_message_id.", self.pk)
                 return
             
             # Team modelidagi telegram ma'lumotlaridan foydalanish
-            bot_token = team.telegram_token if hasattr(team, 'telegram_token') else "7582469651:AAHBtrGUmdo2tzDPU4RSI61AFN99EQnqbJE"  # Default token
+            bot_token = team.telegram_token
+            if not bot_token:
+                logger.info("Chat %s not relayed: team has no Telegram bot token.", self.pk)
+                return
             
             # Telegram ID formatini tekshirish va to'g'rilash
             group_channel_id = process_telegram_id(team.telegram_group_id)
@@ -66,7 +66,6 @@ class Chat(models.Model):
 
             # Agar fayl bo'lmasa, faqat matnli xabar yuboramiz
             if not self.file:
-                url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
                 data = {
                     "chat_id": group_channel_id,
                     "text": message,
@@ -74,60 +73,47 @@ class Chat(models.Model):
                     "reply_to_message_id": int(self.load_id.group_message_id) + 1  # +1 qo'shiladi
                 }
 
-                response = requests.post(url, data=data)
-                response_data = response.json()
-
-                if response_data.get("ok"):
-                    print("Matnli xabar yuborildi.")
-                    self.group_message_id = response_data["result"]["message_id"]
-                    super().save(update_fields=['group_message_id'])
-                else:
-                    print(f"Xatolik (matn): {response_data.get('description')}")
-                    print("Javob ma'lumotlari:", response_data)
+                try:
+                    response_data = relay_message(bot_token, 'sendMessage', data)
+                except (TelegramError, TelegramRetry) as e:
+                    logger.error("Chat %s text was not relayed to Telegram: %s", self.pk, e)
                     return
+                self.group_message_id = response_data["result"]["message_id"]
+                super().save(update_fields=['group_message_id'])
 
             # Agar fayl bo'lsa, uni tekshirish va yuborish (xabar faqat caption'da)
             if self.file:
                 file_path = self.file.path
                 file_name = self.file.name
+                data = {
+                    "chat_id": group_channel_id,
+                    "caption": message,  # Xabar faqat caption'da
+                    "reply_to_message_id": int(self.load_id.group_message_id) + 1  # +1 qo'shiladi
+                }
 
-                # Fayl turi bo'yicha tekshirish
-                if file_name.endswith(('.jpg', '.jpeg', '.png')):  # Rasm bo'lsa
-                    # Rasmni PDF ga aylantirish
-                    pdf_path = self.convert_image_to_pdf(file_path)
-                    url = f"https://api.telegram.org/bot{bot_token}/sendDocument"
-                    data = {
-                        "chat_id": group_channel_id,
-                        "caption": message,  # Xabar faqat caption'da
-                        "reply_to_message_id": int(self.load_id.group_message_id) + 1  # +1 qo'shiladi
-                    }
-                    with open(pdf_path, 'rb') as pdf_file:
-                        files = {"document": (os.path.basename(pdf_path), pdf_file)}
-                        response = requests.post(url, data=data, files=files)
-
-                    # Vaqtinchalik PDF faylni o'chirish
-                    if os.path.exists(pdf_path):
-                        os.remove(pdf_path)
-
-                else:  # PDF yoki boshqa fayl bo'lsa
-                    url = f"https://api.telegram.org/bot{bot_token}/sendDocument"
-                    data = {
-                        "chat_id": group_channel_id,
-                        "caption": message,  # Xabar faqat caption'da
-                        "reply_to_message_id": int(self.load_id.group_message_id) + 1  # +1 qo'shiladi
-                    }
-                    with open(file_path, 'rb') as doc_file:
-                        files = {"document": (file_name, doc_file)}
-                        response = requests.post(url, data=data, files=files)
-
-                response_data = response.json()
-                if response_data.get("ok"):
-                    print("Fayl muvaffaqiyatli yuborildi.")
-                    self.group_message_id = response_data["result"]["message_id"]
-                    super().save(update_fields=['group_message_id'])
-                else:
-                    print(f"Xatolik (fayl): {response_data.get('description')}")
-                    print("Javob ma'lumotlari:", response_data)
+                try:
+                    # Fayl turi bo'yicha tekshirish
+                    if file_name.endswith(('.jpg', '.jpeg', '.png')):  # Rasm bo'lsa
+                        # Rasmni PDF ga aylantirish
+                        pdf_path = self.convert_image_to_pdf(file_path)
+                        try:
+                            with open(pdf_path, 'rb') as pdf_file:
+                                files = {"document": (os.path.basename(pdf_path), pdf_file)}
+                                response_data = relay_message(bot_token, 'sendDocument', data, files=files)
+                        finally:
+                            # Vaqtinchalik PDF faylni o'chirish
+                            if os.path.exists(pdf_path):
+                                os.remove(pdf_path)
+
+                    else:  # PDF yoki boshqa fayl bo'lsa
+                        with open(file_path, 'rb') as doc_file:
+                            files = {"document": (file_name, doc_file)}
+                            response_data = relay_message(bot_token, 'sendDocument', data, files=files)
+                except (TelegramError, TelegramRetry) as e:
+                    logger.error("Chat %s file was not relayed to Telegram: %s", self.pk, e)
+                    return
+                self.group_message_id = response_data["result"]["message_id"]
+                super().save(update_fields=['group_message_id'])
 
         else:
             super().save(*args, **kwargs)
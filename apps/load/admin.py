@@ -6,7 +6,8 @@ from apps.load.models import (
     Load, LoadTags, Driver, DriverTags, Trailer, 
     TrailerTags, TruckTags, Truck, Dispatcher,
     DispatcherTags, EmployeeTags, CustomerBroker, 
-    Stops, Employee, OtherPay, Commodities, CSVImport)
+    Stops, Employee, OtherPay, Commodities, CSVImport, LoadTombstone, PayrollRun, NotificationOutbox,
+    MileQueue)
 
 # Register models
 admin.site.register(DriverExpense)
@@ -15,6 +16,7 @@ admin.site.register(DriverPay)
 admin.site.register(Load)
 admin.site.register(Unit)
 admin.site.register(LoadTags)
+admin.site.register(LoadTombstone)
 admin.site.register(Team)
 admin.site.register(Driver)
 admin.site.register(DriverTags)
@@ -112,4 +114,30 @@ class CSVImportAdmin(admin.ModelAdmin):
     def get_readonly_fields(self, request, obj=None):
         if obj and obj.processed:  # Agar qayta ishlangan bo'lsa
             return self.readonly_fields + ['csv_file', 'start_row', 'end_row']
-        return self.readonly_fields
\ No newline at end of file
+        return self.readonly_fields
+
+
+@admin.register(PayrollRun)
+class PayrollRunAdmin(admin.ModelAdmin):
+    list_display = ['id', 'pay_from', 'pay_to', 'status', 'total_count', 'success_count', 'skipped_count',
+                    'error_count', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['status', 'total_count', 'processed_count', 'success_count', 'skipped_count', 'error_count',
+                       'results', 'error_log', 'created_by', 'created_at', 'started_at', 'finished_at']
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'load', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'kind', 'created_at']
+    search_fields = ['load__load_id']
+    raw_id_fields = ['load']
+    readonly_fields = ['attempts', 'locked_at', 'last_error', 'created_at', 'sent_at', 'updated_at']
+
+
+@admin.register(MileQueue)
+class MileQueueAdmin(admin.ModelAdmin):
+    list_display = ['id', 'load', 'attempts', 'locked_at', 'created_at']
+    search_fields = ['load__load_id']
+    raw_id_fields = ['load']
+    readonly_fields = ['attempts', 'locked_at', 'last_error', 'created_at']
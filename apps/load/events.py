@@ -0,0 +1,107 @@
+import asyncio
+import itertools
+import json
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+# Subscription filters, in the same terms as the load list filters
+SCOPE_KEYS = ('team', 'dispatcher', 'driver')
+
+
+def load_scope(team=None, dispatcher=None, driver=None):
+    return {'team': team, 'dispatcher': dispatcher, 'driver': driver}
+
+
+class Subscription:
+    """One listener's bounded queue of ready-to-send SSE frames, owned by its event loop."""
+
+    def __init__(self, loop, filters, queue_size):
+        self.loop = loop
+        self.filters = {key: set(filters.get(key) or ()) for key in SCOPE_KEYS}
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def matches(self, scopes):
+        # OR inside one filter, AND across filters; a load matches on its current or previous assignment
+        return any(
+            all(not wanted or scope.get(key) in wanted for key, wanted in self.filters.items())
+            for scope in scopes
+        )
+
+    def deliver(self, frame):
+        """Runs on the subscriber's loop. A listener that falls behind gets None and has to resync."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+def _deliver(subscriptions, frame):
+    for subscription in subscriptions:
+        subscription.deliver(frame)
+
+
+class LoadEventBroker:
+    """
+    In-process pub/sub for load change events.
+
+    publish() may be called from any thread (signal handlers run in request
+    threads); every event is encoded once and handed to the matching
+    subscribers' loops. Only subscribers in the same process see an event, so
+    a multi-process deployment needs the stream served by the processes that
+    do the writes, or an external broker behind the same interface.
+    """
+
+    def __init__(self, queue_size=256):
+        self.queue_size = queue_size
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+
+    @property
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def subscribe(self, filters, loop=None):
+        subscription = Subscription(loop or asyncio.get_running_loop(), filters, self.queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event, data, scopes):
+        """Sends ``data`` as an SSE ``event`` to every subscriber whose filters match one of ``scopes``."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        if not subscriptions:
+            return 0
+        frame = 'id: %d\nevent: %s\ndata: %s\n\n' % (
+            next(self._sequence), event, json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')))
+        # one wakeup per event loop rather than one per subscriber
+        by_loop = {}
+        for subscription in subscriptions:
+            if subscription.matches(scopes):
+                by_loop.setdefault(subscription.loop, []).append(subscription)
+        delivered = 0
+        for loop, targets in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, targets, frame)
+            except RuntimeError:
+                # the listeners' loop has already shut down
+                for subscription in targets:
+                    self.unsubscribe(subscription)
+                continue
+            delivered += len(targets)
+        return delivered
+
+broker = LoadEventBroker()
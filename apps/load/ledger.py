@@ -0,0 +1,169 @@
+"""
+Per-load pay ledger (LoadPayLine).
+
+index_pay_lines() rewrites the lines of a set of loads from the driver's
+current Pay rule (apps/load/pay_rules.py) and the OtherPay rows, with the
+same float arithmetic as payroll.calculate_settlement(). Each line carries the load's
+first PICKUP / last DELIVERY date, so a period total is a range sum over
+(driver, pickup_date, delivery_date) instead of a settlement recomputation.
+Signals in apps/load/signals.py keep the lines current.
+
+The ledger is a read model for period totals (ledger_totals()): auditing
+and re-running historic periods (rebuild_pay_ledger --verify) without
+recomputing each settlement. Settlement documents still come from
+calculate_settlement(), which also needs the per-load formulas and stops
+the ledger does not store. A Pay change only rewrites the driver's loads
+after their last settled period (refresh_driver_pay_lines()); settled
+periods keep the lines they were settled with until a full rebuild.
+"""
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
+
+from apps.load.pay_rules import RuleInput, pay_rule, stop_counts
+from apps.load.payroll import CHARGEBACK_PAY_TYPE, PERCENTAGE_PAY_TYPES
+
+
+def _models(load_model):
+    # migration ichida tarixiy modellar bilan ham ishlashi uchun
+    apps = load_model._meta.apps
+    return (apps.get_model('apps_load', 'Pay'), apps.get_model('apps_load', 'OtherPay'),
+            apps.get_model('apps_load', 'LoadPayLine'))
+
+
+def _date(value):
+    # period_loads() dagi __date bilan bir xil: joriy timezone dagi sana
+    return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+
+
+def _other_pay_amount(pay_type, amount, standart):
+    if pay_type in PERCENTAGE_PAY_TYPES:
+        return 'PERCENTAGE', amount * (float(standart) / 100) if standart else amount
+    if pay_type == CHARGEBACK_PAY_TYPE:
+        return 'CHARGEBACK', -amount
+    return 'REIMBURSEMENT', amount
+
+
+def _build_batch(load_model, load_ids):
+    Pay, OtherPay, LoadPayLine = _models(load_model)
+    loads = list(load_model.objects.filter(
+        pk__in=load_ids, driver__isnull=False, stop__appointmentdate__isnull=False
+    ).annotate(
+        pickup_at=Min('stop__appointmentdate', filter=Q(stop__stop_name='PICKUP')),
+        delivery_at=Max('stop__appointmentdate', filter=Q(stop__stop_name='DELIVERY')),
+    ).filter(
+        pickup_at__isnull=False, delivery_at__isnull=False
+    ).values_list('id', 'driver_id', 'load_pay', 'mile', 'pickup_at', 'delivery_at'))
+
+    # latest_pay(): driverning eng oxirgi Pay yozuvi
+    rules = {}
+    for pay in Pay.objects.filter(driver_id__in={load[1] for load in loads}).order_by('id'):
+        rules[pay.driver_id] = (pay.standart, pay_rule(pay))
+    stop_names = {}
+    if any(rule.needs_stops for _, rule in rules.values()):
+        through = load_model._meta.get_field('stop').remote_field.through
+        for load_id, stop_name in (through.objects.filter(load_id__in=[load[0] for load in loads])
+                                   .values_list('load_id', 'stops__stop_name')):
+            stop_names.setdefault(load_id, []).append(stop_name)
+    other_pays = {}
+    for row in (OtherPay.objects.filter(load_id__in=[load[0] for load in loads])
+                .order_by('pk').values_list('id', 'load_id', 'pay_type', 'amount')):
+        other_pays.setdefault(row[1], []).append(row)
+
+    lines = []
+    for load_id, driver_id, load_pay, mile, pickup_at, delivery_at in loads:
+        rate, rule = rules.get(driver_id, (None, pay_rule(None)))
+        base = rule(RuleInput(load_pay, mile, pickup_at, delivery_at, *stop_counts(stop_names.get(load_id, ()))))
+        common = dict(load_id=load_id, driver_id=driver_id, rate=rate,
+                      pickup_date=_date(pickup_at), delivery_date=_date(delivery_at))
+        lines.append(LoadPayLine(kind='BASE', basis=float(load_pay or 0), amount=base.amount, **common))
+        for other_pay_id, _, pay_type, amount in other_pays.get(load_id, ()):
+            if not amount:
+                continue
+            kind, result = _other_pay_amount(pay_type, float(amount), rule.percent)
+            lines.append(LoadPayLine(other_pay_id=other_pay_id, kind=kind, pay_type=pay_type,
+                                     basis=float(amount), amount=result, **common))
+    return lines
+
+
+def index_pay_lines(queryset, batch_size=500):
+    """Rewrites the ledger lines of every load in ``queryset``."""
+    LoadPayLine = _models(queryset.model)[2]
+    load_ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(load_ids), batch_size):
+        batch = load_ids[start:start + batch_size]
+        with transaction.atomic(using=queryset.db):
+            LoadPayLine.objects.filter(load_id__in=batch).delete()
+            LoadPayLine.objects.bulk_create(_build_batch(queryset.model, batch))
+
+
+def refresh_pay_lines(load_ids):
+    from apps.load.models.load import Load
+
+    load_ids = [load_id for load_id in set(load_ids) if load_id]
+    if load_ids:
+        index_pay_lines(Load.objects.filter(pk__in=load_ids))
+
+
+def refresh_driver_pay_lines(driver_id):
+    """After a Pay change: the new rate applies to the driver's loads that are not settled yet."""
+    from apps.load.models.driver import DriverPay
+    from apps.load.models.load import Load
+
+    if not driver_id:
+        return
+    loads = Load.objects.filter(driver_id=driver_id)
+    settled_to = DriverPay.objects.filter(driver_id=driver_id).aggregate(settled_to=Max('pay_to'))['settled_to']
+    if settled_to:
+        # yopilgan davrlar qayta yozilmaydi: faqat oxirgi DriverPay dan keyin tugaydigan loadlar
+        loads = loads.filter(last_delivery_at__date__gt=settled_to)
+    index_pay_lines(loads)
+
+
+def period_pay_lines(driver, pay_from, pay_to):
+    """Lines of the loads period_loads() would return, as an indexed range filter."""
+    from apps.load.models.ledger import LoadPayLine
+
+    return LoadPayLine.objects.filter(driver=driver).filter(
+        Q(pickup_date__gte=pay_from, pickup_date__lte=pay_to) |
+        Q(delivery_date__gte=pay_from, delivery_date__lte=pay_to) |
+        Q(pickup_date__lte=pay_from, delivery_date__gte=pay_to)
+    )
+
+
+def ledger_totals(driver, pay_from, pay_to):
+    """
+    The settlement totals of calculate_settlement() read from the ledger:
+    one aggregate over the pay lines and one over the expenses.
+    """
+    from apps.load.models.driver import DriverExpense
+
+    lines = period_pay_lines(driver, pay_from, pay_to).aggregate(
+        loads=Count('load', distinct=True),
+        load_pays=Sum('amount', filter=Q(kind='BASE')),
+        other_pays=Sum('amount', filter=Q(kind__in=('PERCENTAGE', 'REIMBURSEMENT'))),
+        chargebacks=Sum('amount', filter=Q(kind='CHARGEBACK')),
+    )
+    expenses = DriverExpense.objects.filter(
+        driver=driver, expense_date__gte=pay_from, expense_date__lte=pay_to
+    ).aggregate(
+        expenses=Sum('amount', filter=Q(transaction_type='-')),
+        income=Sum('amount', filter=Q(transaction_type='+')),
+    )
+    total_load_pays = lines['load_pays'] or 0.0
+    total_other_pays = lines['other_pays'] or 0.0
+    total_chargebacks = -(lines['chargebacks'] or 0.0)
+    total_expenses = expenses['expenses'] or 0.0
+    total_income = expenses['income'] or 0.0
+    escrow = driver.escrow_deposit if driver.escrow_deposit else 0
+    total_pay = total_load_pays + total_other_pays - escrow - total_expenses + total_income - total_chargebacks
+    return {
+        'loads': lines['loads'],
+        'total_load_pays': total_load_pays,
+        'total_other_pays': total_other_pays,
+        'total_chargebacks': total_chargebacks,
+        'escrow': escrow,
+        'total_expenses': total_expenses,
+        'total_income': total_income,
+        'total_pay': max(total_pay, 0),
+    }
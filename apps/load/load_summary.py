@@ -0,0 +1,186 @@
+"""
+Load summary: the unit, trailer, driver, team and stops of a load as the
+dispatch message shows them.
+
+summary_queryset() plans the relations once: team, unit, driver user and
+dispatcher are joined, the unit's trailers and the stops are prefetched, so
+a whole queryset of loads costs three queries instead of six or more lazy
+ones per load. load_summary() only reads what that queryset loaded, and
+render_load_message() fills the module-level templates below with it.
+
+    for load in summary_queryset().filter(pk__in=ids):
+        text = render_load_message(load)
+"""
+from django.db.models import Prefetch
+
+from apps.load.models.load import Load
+from apps.load.models.stops import Stops
+from apps.load.models.trailer import Trailer
+
+
+SUMMARY_RELATED = ('team_id', 'unit_id', 'driver__user', 'dispatcher')
+
+NOT_ASSIGNED = "Not assigned"
+
+STOP_TEMPLATE = """
+<b>{name}:</b> 🏭
+{company}
+{address}
+Arrive: {arrive}
+{name} №: {ref}
+"""
+
+# stoplar bo'lmasa loadning o'z pickup / delivery maydonlari
+DEFAULT_PICKUP_TEMPLATE = """
+<b>Pick up:</b> 🏭
+{location}
+Arrive: Date {date} Time FCFS
+Pick up №: {ref}
+"""
+
+LAST_STOP_TEMPLATE = """
+{company}
+{address}
+Arrive: {arrive}
+Delivery №: {ref}"""
+
+DEFAULT_LAST_STOP_TEMPLATE = """
+{location}
+Arrive: Date {date} Time TBD
+Delivery №: """
+
+MESSAGE_TEMPLATE = """🚚 {unit_number}
+🔖{trailer_make}
+👨‍✈️ {driver_name}
+<b>Load:</b> {load_id}
+{stops}
+<b>Last Stop:</b> 🏭{last_stop}
+
+<b>Estimated Payout:</b> ${load_pay}
+  DHM: {empty_mile}
+  LM: {mile}
+<b>$PM:</b> {per_mile}
+
+<b>Team {team}</b>
+{company_name}
+---------------------------
+⚠️-Traffic/Construction/Weather or other delays (photos or videos) -  should be updated in good time by drivers
+⚠️-Please Scale the load after pick up, to avoid axle overweight. Missing scale ticket - 200$ penalty fee.
+⚠️-After hooking up the trailer, PTI should be done !!!
+🛞<b>Tire pressure:</b>
+✍️Drive tire - 105 psi.
+✍️Steering tire - 110 psi.
+✍️Trailer tire - 100 psi.
+🛞🔨if tire has inflation system you need to hit with a hammer to check the pressure.
+⚠️📲If you hear air leak sound or detect an oil leak around the rims let us know immediately.
+---------------------------
+<b>On time PU/DEL:</b>  $150"""
+
+
+def summary_queryset(queryset=None, prefix=''):
+    """
+    ``queryset`` (all loads by default) with everything load_summary()
+    reads joined or prefetched. For a queryset of another model pass the
+    path to its load as ``prefix``, e.g. 'load__'.
+    """
+    queryset = Load.objects.all() if queryset is None else queryset
+    return queryset.select_related(*(prefix + related for related in SUMMARY_RELATED)).prefetch_related(
+        # birinchi trailer: avvalgi trailer.first() kabi pk bo'yicha
+        Prefetch(f'{prefix}unit_id__trailer', queryset=Trailer.objects.only('id', 'make').order_by('pk')),
+        Prefetch(f'{prefix}stop', queryset=Stops.objects.order_by('pk')),
+    )
+
+
+def _date(value):
+    return value.strftime('%m/%d/%Y')
+
+
+def _arrive(stop):
+    for value in (stop.appointmentdate, stop.fcfs, stop.plus_hour):
+        if value:
+            return f"Date {_date(value)} Time {value.strftime('%H:%M')}"
+    return "FCFS"
+
+
+def _stop(stop):
+    address = [part for part in (stop.address1, stop.address2, stop.city, stop.state) if part]
+    if stop.zip_code:
+        address.append(str(stop.zip_code))
+    return {
+        'name': stop.stop_name or 'Stop',
+        'company': stop.company_name,
+        'address': ", ".join(address) if address else "Address not specified",
+        'arrive': _arrive(stop),
+        'ref': stop.reference_id or "",
+    }
+
+
+def _driver_name(driver):
+    if not driver or not driver.user:
+        return NOT_ASSIGNED
+    return f"{driver.user.first_name or ''} {driver.user.last_name or ''}".strip() or NOT_ASSIGNED
+
+
+def _team(load):
+    team = load.team_id
+    if not team:
+        return NOT_ASSIGNED
+    nickname = f"    ({load.dispatcher.nickname})" if load.dispatcher else ""
+    return f"{team.name or 'Unknown Team'}{nickname}"
+
+
+def load_summary(load):
+    """
+    The summary of a load from summary_queryset() (no queries): unit,
+    trailer, driver and team labels, the stops other than DELIVERY and the
+    delivery stop (None when the load has none).
+    """
+    unit = load.unit_id
+    trailers = list(unit.trailer.all()) if unit else []
+    stops = [_stop(stop) for stop in load.stop.all()]
+    deliveries = [stop for stop in stops if stop['name'].upper() == 'DELIVERY']
+    return {
+        'unit_number': unit.unit_number if unit else NOT_ASSIGNED,
+        'trailer_make': (trailers[0].make if trailers else None) or NOT_ASSIGNED,
+        'driver_name': _driver_name(load.driver),
+        'team': _team(load),
+        'stops': [stop for stop in stops if stop['name'].upper() != 'DELIVERY'],
+        # bir nechta DELIVERY bo'lsa oxirgisi
+        'delivery': deliveries[-1] if deliveries else None,
+    }
+
+
+def render_load_message(load):
+    """The dispatch message (Telegram HTML) of a load from summary_queryset()."""
+    summary = load_summary(load)
+    if summary['stops']:
+        stops = "".join(STOP_TEMPLATE.format(**stop) for stop in summary['stops'])
+    else:
+        stops = DEFAULT_PICKUP_TEMPLATE.format(
+            location=load.pickup_location or 'Location not specified',
+            date=_date(load.pickup_date) if load.pickup_date else 'TBD', ref='')
+    if summary['delivery']:
+        last_stop = LAST_STOP_TEMPLATE.format(**summary['delivery'])
+    else:
+        last_stop = DEFAULT_LAST_STOP_TEMPLATE.format(
+            location=load.delivery_location or 'Location not specified',
+            date=_date(load.delivery_date) if load.delivery_date else 'TBD')
+    return MESSAGE_TEMPLATE.format(
+        unit_number=summary['unit_number'],
+        trailer_make=summary['trailer_make'],
+        driver_name=summary['driver_name'],
+        load_id=load.load_id or 'Not specified',
+        stops=stops,
+        last_stop=last_stop,
+        load_pay=load.load_pay or 'TBD',
+        empty_mile=load.empty_mile or 'TBD',
+        mile=load.mile or 'TBD',
+        per_mile=load.per_mile or 'TBD',
+        team=summary['team'],
+        company_name=load.company_name or 'Unknown Company',
+    )
+
+
+def render_load_messages(load_ids):
+    """{load id: dispatch message} for ``load_ids``, loaded with one summary_queryset()."""
+    return {load.pk: render_load_message(load) for load in summary_queryset().filter(pk__in=load_ids)}
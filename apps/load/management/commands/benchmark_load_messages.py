@@ -0,0 +1,106 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.auth.models import Company, User
+from apps.load.load_summary import render_load_message, render_load_messages
+from apps.load.models import Dispatcher, Driver, Load, Stops, Trailer
+from apps.load.models.team import Team
+from apps.load.models.truck import Unit
+
+
+class Command(BaseCommand):
+    help = ("Dispatch message rendering (apps/load/load_summary.py) for many loads: one Load fetched per "
+            "message with its relations loaded lazily, against one summary_queryset() for all of them. "
+            "Seeds loads with units, trailers, drivers and stops and deletes them afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loads', type=int, default=1000)
+        parser.add_argument('--units', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if options['loads'] < 1 or options['units'] < 1:
+            raise CommandError("--loads and --units must be at least 1.")
+        company = Company.objects.create(company_name='benchmark_load_messages')
+        seeded = {}
+        try:
+            load_ids = self.seed(company, options['loads'], options['units'], seeded)
+
+            def lazy():
+                return {pk: render_load_message(Load.objects.get(pk=pk)) for pk in load_ids}
+
+            def planned():
+                return render_load_messages(load_ids)
+
+            results = {}
+            for label, render in (('lazy, per load', lazy), ('summary_queryset', planned)):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    results[label] = render()
+                    elapsed = time.perf_counter() - started
+                self.stdout.write(f"{label:>16}: {len(load_ids)} messages in {elapsed:.2f} s, "
+                                  f"{elapsed / len(load_ids) * 1e3:.2f} ms each, {len(queries)} queries")
+            lazy_messages, planned_messages = results.values()
+            if lazy_messages != planned_messages:
+                raise CommandError("The two renderings differ.")
+        finally:
+            Stops.objects.filter(pk__in=seeded.get('stops', [])).delete()
+            # CASCADE: foydalanuvchi -> driver / dispatcher -> load
+            User.objects.filter(company=company).delete()
+            Unit.objects.filter(pk__in=seeded.get('units', [])).delete()
+            Trailer.objects.filter(pk__in=seeded.get('trailers', [])).delete()
+            Team.objects.filter(pk__in=seeded.get('teams', [])).delete()
+            company.delete()
+
+    def seed(self, company, loads, units, seeded):
+        """Committed loads made with bulk_create (no signals, so nothing is queued for Telegram)."""
+        rng = random.Random(loads)
+        team = Team.objects.create(name='Benchmark Team')
+        seeded['teams'] = [team.pk]
+        trailers = Trailer.objects.bulk_create([
+            Trailer(unit_number=f'BT{index}', make=rng.choice(['Utility', 'Wabash', 'Great Dane', None]))
+            for index in range(units * 2)
+        ])
+        seeded['trailers'] = [trailer.pk for trailer in trailers]
+        unit_objects = Unit.objects.bulk_create([Unit(unit_number=f'benchmark-{index}') for index in range(units)])
+        seeded['units'] = [unit.pk for unit in unit_objects]
+        Unit.trailer.through.objects.bulk_create([
+            Unit.trailer.through(unit_id=unit.pk, trailer_id=trailer.pk)
+            for index, unit in enumerate(unit_objects) for trailer in trailers[index * 2:index * 2 + rng.randint(0, 2)]
+        ])
+
+        drivers, dispatchers = [], []
+        for index in range(units):
+            user = User.objects.create(email=f'benchmark-messages-{index}@example.com', company=company,
+                                       first_name=f'Driver{index}', last_name='Benchmark')
+            drivers.append(Driver.objects.create(user=user))
+            user = User.objects.create(email=f'benchmark-dispatcher-{index}@example.com', company=company)
+            dispatchers.append(Dispatcher.objects.create(user=user, nickname=f'disp{index}'))
+
+        now = timezone.now()
+        load_objects = Load.objects.bulk_create([
+            Load(load_id=f'BM{index}', team_id=team, unit_id=unit_objects[index % units],
+                 driver=drivers[index % units], dispatcher=dispatchers[index % units],
+                 company_name='Benchmark Freight', load_pay=rng.randrange(500, 5000), mile=rng.randrange(100, 2000),
+                 empty_mile=rng.randrange(0, 200), pickup_location='Chicago, IL', delivery_location='Dallas, TX',
+                 pickup_date=now, delivery_date=now + timedelta(days=2))
+            for index in range(loads)
+        ])
+        stops, links = [], []
+        for load in load_objects:
+            for name in ('PICKUP', *(['Stop-2'] * rng.randint(0, 2)), 'DELIVERY'):
+                stops.append(Stops(stop_name=name, company_name=f'{name.title()} Co', reference_id=f'R{load.pk}',
+                                   address1='100 Main St', city='Chicago', state='IL', zip_code=60601,
+                                   appointmentdate=now + timedelta(hours=rng.randrange(72))))
+                links.append(load.pk)
+        stops = Stops.objects.bulk_create(stops)
+        seeded['stops'] = [stop.pk for stop in stops]
+        Load.stop.through.objects.bulk_create([
+            Load.stop.through(load_id=load_id, stops_id=stop.pk) for load_id, stop in zip(links, stops)
+        ])
+        return [load.pk for load in load_objects]
@@ -0,0 +1,91 @@
+import asyncio
+import random
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.load.events import LoadEventBroker, load_scope
+
+
+class Command(BaseCommand):
+    help = "Load event stream fan-out benchmark: N subscribers on one event loop, events published from another thread"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=300)
+        parser.add_argument('--events', type=int, default=2000)
+        parser.add_argument('--teams', type=int, default=10)
+        parser.add_argument('--unfiltered', type=int, default=20, help="subscribers that receive every event")
+
+    def handle(self, *args, **options):
+        teams = options['teams']
+        broker = LoadEventBroker(queue_size=options['events'])
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+
+        sent_at = {}
+        latencies = []
+        received = [0]
+        done = threading.Event()
+        expected = [None]
+
+        async def consume(subscription):
+            while True:
+                frame = await subscription.queue.get()
+                if frame is None:
+                    return
+                latencies.append(time.perf_counter() - sent_at[int(frame[4:frame.index('\n')])])
+                received[0] += 1
+                if received[0] == expected[0]:
+                    done.set()
+
+        async def subscribe_all():
+            subscriptions, tasks = [], []
+            for index in range(options['subscribers']):
+                filters = {} if index < options['unfiltered'] else {'team': [index % teams]}
+                subscription = broker.subscribe(filters)
+                subscriptions.append(subscription)
+                tasks.append(loop.create_task(consume(subscription)))
+            return subscriptions, tasks
+
+        async def stop_all():
+            for subscription in subscriptions:
+                broker.unsubscribe(subscription)
+                subscription.queue.put_nowait(None)
+            await asyncio.gather(*tasks)
+
+        subscriptions, tasks = asyncio.run_coroutine_threadsafe(subscribe_all(), loop).result()
+
+        publish_times = []
+        deliveries = 0
+        started = time.perf_counter()
+        for number in range(1, options['events'] + 1):
+            team = random.randrange(teams)
+            data = {'op': 'updated', 'id': number, 'load_id': f'L{number}', 'load_status': 'ON_ROUTE',
+                    'team': team, 'dispatcher': None, 'driver': None}
+            before = time.perf_counter()
+            # frame ids are sequential from 1, so the publish time can be looked up by id
+            sent_at[number] = before
+            deliveries += broker.publish('load', data, [load_scope(team=team)])
+            publish_times.append(time.perf_counter() - before)
+        expected[0] = deliveries
+        if received[0] == deliveries:
+            done.set()
+        done.wait(timeout=60)
+        elapsed = time.perf_counter() - started
+
+        asyncio.run_coroutine_threadsafe(stop_all(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+        publish_times.sort()
+        latencies.sort()
+        self.stdout.write(f"subscribers: {options['subscribers']} ({options['unfiltered']} unfiltered, {teams} teams)")
+        self.stdout.write(f"events: {options['events']}, deliveries: {received[0]}/{deliveries}, "
+                          f"overflowed: {sum(s.overflowed for s in subscriptions)}")
+        self.stdout.write(f"publish: median {statistics.median(publish_times) * 1e6:.0f} us, "
+                          f"p99 {publish_times[int(len(publish_times) * 0.99)] * 1e6:.0f} us")
+        if latencies:
+            self.stdout.write(f"delivery latency: median {statistics.median(latencies) * 1e3:.2f} ms, "
+                              f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.2f} ms")
+        self.stdout.write(f"throughput: {received[0] / elapsed:,.0f} deliveries/s")
@@ -0,0 +1,113 @@
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.auth.models import Company, User
+from apps.load.models import Driver, Load, Stops
+from apps.load.models.driver import DriverExpense, Pay
+from apps.load.models.otherpay import OtherPay
+from apps.load.payroll import calculate_settlement
+from apps.load.payroll_vector import VectorSettlement
+from apps.load.stop_span import refresh_stop_span
+
+
+class _Rollback(Exception):
+    pass
+
+
+# --pay-type bo'yicha Pay.standart
+PAY_TYPE_STANDART = {'Percentage': 30, 'Per Mile': 0.65, 'Hourly': 27.5}
+
+
+class Command(BaseCommand):
+    help = ("Settlement calculation cost against the number of loads in the period, for the "
+            "calculate_settlement() loop and the vectorized VectorSettlement (totals only, and with the formula "
+            "text), and how far their totals are apart. Seeds one driver per size inside a transaction that is "
+            "rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,100,1000', help="comma separated loads per period")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--pay-type', choices=sorted(PAY_TYPE_STANDART), default='Percentage')
+        parser.add_argument('--per-stop', action='store_true',
+                            help="pay extra picks / drops (Pay.picks_per, drops_per) and seed extra stops")
+        parser.add_argument('--round-lines', action='store_true',
+                            help="VectorSettlement rounds every line to the cent (statement rounding)")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        pay_to = timezone.localdate()
+        pay_from = pay_to - timedelta(days=6)
+        try:
+            with transaction.atomic():
+                company = Company.objects.create(company_name='benchmark_payroll')
+                round_lines = options['round_lines']
+                for size in sizes:
+                    driver, pay = self.seed(company, size, pay_from, options['pay_type'], options['per_stop'])
+                    settlement = self.measure(size, 'loop', options['repeat'],
+                                              lambda: calculate_settlement(driver, pay, pay_from, pay_to))
+                    vector = self.measure(size, 'vector', options['repeat'],
+                                          lambda: VectorSettlement(driver, pay, pay_from, pay_to, round_lines))
+                    self.measure(size, 'vector+text', options['repeat'], lambda: (
+                        lambda result: (result.formulas(), result.load_details()))(
+                            VectorSettlement(driver, pay, pay_from, pay_to, round_lines)))
+                    loop_total = Decimal(settlement['total_pay']['Result'].lstrip('$'))
+                    vector_total = vector.totals()['total_pay']
+                    self.stdout.write(f"{size:>6} loads {'total':>12}: {len(settlement['loads'])} in period, "
+                                      f"loop ${loop_total}, vector ${vector_total} ({vector_total - loop_total:+})")
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def measure(self, size, label, repeat, calculate):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                result = calculate()
+                timings.append(time.perf_counter() - started)
+        self.stdout.write(f"{size:>6} loads {label:>12}: {len(queries)} queries, best {min(timings) * 1e3:.1f} ms")
+        return result
+
+    def seed(self, company, size, pay_from, pay_type='Percentage', per_stop=False):
+        rng = random.Random(size)
+        user = User.objects.create(email=f'benchmark-payroll-{size}@example.com', company=company)
+        driver = Driver.objects.create(user=user, escrow_deposit=50)
+        pay = Pay.objects.create(driver=driver, pay_type=pay_type, standart=PAY_TYPE_STANDART[pay_type],
+                                 picks_per=75 if per_stop else None, drops_per=50 if per_stop else None)
+        start = timezone.make_aware(datetime.combine(pay_from, datetime.min.time()))
+
+        loads = Load.objects.bulk_create([
+            Load(load_id=f'BP{size}-{index}', driver=driver, load_pay=Decimal(rng.randrange(50000, 500000)) / 100,
+                 mile=rng.randrange(100, 1500))
+            for index in range(size)
+        ])
+        stops = []
+        for load in loads:
+            pickup = start + timedelta(hours=rng.randrange(6 * 24))
+            stops.append(Stops(load=load, stop_name='PICKUP', appointmentdate=pickup, city='Chicago', state='IL'))
+            stops.append(Stops(load=load, stop_name='DELIVERY', appointmentdate=pickup + timedelta(hours=20),
+                               city='Dallas', state='TX'))
+            if per_stop and rng.random() < 0.3:
+                stops.append(Stops(load=load, stop_name=rng.choice(['PICKUP', 'Stop-2']),
+                                   appointmentdate=pickup + timedelta(hours=rng.randrange(1, 20))))
+        Stops.objects.bulk_create(stops)
+        Load.stop.through.objects.bulk_create(
+            [Load.stop.through(load_id=stop.load_id, stops_id=stop.pk) for stop in stops])
+        refresh_stop_span(Load.objects.filter(driver=driver))
+        OtherPay.objects.bulk_create([
+            OtherPay(load=load, pay_type=pay_type, amount=Decimal(rng.randrange(1000, 30000)) / 100)
+            for load in loads for pay_type in ('DETENTION', 'CHARGEBACK', 'LUMPER') if rng.random() < 0.5
+        ])
+        DriverExpense.objects.bulk_create([
+            DriverExpense(driver=driver, transaction_type=rng.choice('+-'), description='fuel',
+                          amount=rng.randrange(1000, 50000) / 100, expense_date=pay_from + timedelta(days=day))
+            for day in range(7)
+        ])
+        return driver, pay
@@ -0,0 +1,105 @@
+import io
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from pypdf import PdfReader, PdfWriter
+
+from apps.auth.models import Company, User
+from apps.load.models import Driver
+from apps.load.models.driver import DriverPay
+from apps.load.settlement_packet import PACKET_WORKERS, build_settlement_packet, render_packet_part
+
+
+class Command(BaseCommand):
+    help = ("Settlement packet build time, peak Python memory and size against a naive in-memory merge "
+            "(pypdf PdfWriter). Seeds committed DriverPays (the workers read them over their own "
+            "connections) and deletes them afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drivers', type=int, default=200)
+        parser.add_argument('--loads', type=int, default=12, help="loads per settlement")
+        parser.add_argument('--workers', type=int, default=PACKET_WORKERS)
+
+    def handle(self, *args, **options):
+        if options['drivers'] < 1:
+            raise CommandError("--drivers must be at least 1.")
+        company = Company.objects.create(company_name='benchmark_settlement_packet')
+        try:
+            driver_pay_ids = self.seed(company, options['drivers'], options['loads'])
+            self.measure('naive merge', lambda sink: self.naive(driver_pay_ids, sink))
+            self.measure('stream, inline', lambda sink: build_settlement_packet(driver_pay_ids, sink, workers=0))
+            if options['workers']:
+                self.measure(f"stream, {options['workers']} workers",
+                             lambda sink: build_settlement_packet(driver_pay_ids, sink, workers=options['workers']))
+        finally:
+            # CASCADE: foydalanuvchi -> driver -> DriverPay
+            User.objects.filter(company=company).delete()
+            company.delete()
+
+    def measure(self, label, build):
+        sink = io.BytesIO()
+        started = time.perf_counter()
+        build(sink)
+        elapsed = time.perf_counter() - started
+        pages = len(PdfReader(io.BytesIO(sink.getvalue()), strict=True).pages)
+        size = sink.getbuffer().nbytes
+
+        # tracemalloc vaqtni bir necha marta sekinlashtiradi: xotira alohida o'lchanadi
+        sink = io.BytesIO()
+        tracemalloc.start()
+        try:
+            build(sink)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # chiqish fayli xotirada (BytesIO): peak undan tashqari hisoblanadi
+        self.stdout.write(f"{label:>20}: {elapsed:6.1f} s, peak {(peak - size) / 2**20:7.1f} MiB "
+                          f"without the output, {size / 2**20:6.1f} MiB, {pages} pages")
+
+    def naive(self, driver_pay_ids, sink):
+        """Every part rendered and appended to one PdfWriter, which keeps all pages until write()."""
+        writer = PdfWriter()
+        with tempfile.TemporaryDirectory() as directory:
+            for driver_pay_id in driver_pay_ids:
+                title, _, paths = render_packet_part(driver_pay_id, directory)
+                first_page = len(writer.pages)
+                for path in paths:
+                    with open(path, 'rb') as source:
+                        writer.append(io.BytesIO(source.read()))
+                writer.add_outline_item(title, first_page)
+        writer.write(sink)
+
+    def seed(self, company, drivers, loads_per_driver):
+        rng = random.Random(drivers)
+        pay_to = timezone.localdate()
+        pay_from = pay_to - timedelta(days=6)
+        driver_pays = []
+        for index in range(drivers):
+            user = User.objects.create(email=f'benchmark-packet-{index}@example.com', company=company,
+                                       first_name=f'Driver{index:04d}', last_name='Benchmark')
+            company_driver = index % 4 == 0
+            driver = Driver.objects.create(user=user, escrow_deposit=50,
+                                           driver_type='COMPANY_DRIVER' if company_driver else 'OWNER_OPERATOR')
+            loads, cd_loads = [], []
+            for number in range(loads_per_driver):
+                load_pay = rng.randrange(50000, 500000) / 100
+                loads.append({
+                    'Load #': f'PK{index}-{number}', 'Pickup': 'Chicago, IL', 'Delivery': 'Dallas, TX',
+                    'Formula': f'${load_pay:.2f} * 30%', 'Result': f'${load_pay * 0.3:.2f}',
+                    'Notes': 'benchmark load with a long note' if number % 3 == 0 else '',
+                })
+                miles = rng.randrange(100, 1500)
+                cd_loads.append({'load_number': f'PK{index}-{number}', 'load_id': f'PK{index}-{number}',
+                                 'loaded_miles': miles, 'pickup_location': 'Chicago, IL',
+                                 'delivery_location': 'Dallas, TX', 'trip': 'Chicago, IL - Dallas, TX'})
+            driver_pays.append(DriverPay(
+                driver=driver, pay_from=pay_from, pay_to=pay_to, loads=loads,
+                amount=round(sum(float(load['Result'].lstrip('$')) for load in loads), 2),
+                company_driver_data={'loads': cd_loads} if company_driver else {},
+                created_at=timezone.now()))
+        return [driver_pay.pk for driver_pay in DriverPay.objects.bulk_create(driver_pays)]
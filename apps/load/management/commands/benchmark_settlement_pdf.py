@@ -0,0 +1,72 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from pypdf import PdfReader
+
+from utils import pdf_templates
+from utils.pdf_generator import generate_company_driver_pdf, generate_driver_pay_pdf
+
+
+COMPANY = {'company_name': 'Benchmark Freight LLC', 'phone': '(312) 555-0100', 'fax': '(312) 555-0101'}
+
+
+def _settlement(rng, index, loads):
+    """A settlement response shaped like apps.load.settlement_pdf.report_data(), with CD loads."""
+    rows, cd_loads = [], []
+    for number in range(loads):
+        load_pay = rng.randrange(50000, 500000) / 100
+        rows.append({'Load #': f'BS{index}-{number}', 'Pickup': 'Chicago, IL', 'Delivery': 'Dallas, TX',
+                     'Formula': f'${load_pay:.2f} * 30%', 'Result': f'${load_pay * 0.3:.2f}',
+                     'Notes': 'benchmark load with a long note' if number % 3 == 0 else ''})
+        cd_loads.append({'load_number': f'BS{index}-{number}', 'load_id': f'BS{index}-{number}',
+                         'loaded_miles': rng.randrange(100, 1500), 'pickup_location': 'Chicago, IL',
+                         'delivery_location': 'Dallas, TX'})
+    total = sum(float(row['Result'].lstrip('$')) for row in rows)
+    data = {
+        'driver': {'first_name': f'Driver{index}', 'last_name': 'Benchmark', 'contact_number': '(312) 555-0199',
+                   'report_date': '2025-01-08 09:00:00', 'search_from': '2025-01-01', 'search_to': '2025-01-07'},
+        'loads': rows,
+        'escrow_deduction': {'Formula': '-$50.00', 'Result': '$50.00'},
+        'total_pay': {'Result': f'${total:.2f}'},
+    }
+    return data, cd_loads
+
+
+class Command(BaseCommand):
+    help = ("Settlement PDF rendering throughput (utils/pdf_generator.py) with the template registry warm "
+            "and with it cleared before every settlement (styles rebuilt per call, as before the registry), "
+            "plus the page count of one long settlement.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--settlements', type=int, default=500)
+        parser.add_argument('--loads', type=int, default=12, help="loads per settlement")
+        parser.add_argument('--long-loads', type=int, default=150, help="loads of the multi-page settlement")
+        parser.add_argument('--company-driver-every', type=int, default=4,
+                            help="every Nth settlement also renders the company driver PDF (0: none)")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['settlements'])
+        settlements = [_settlement(rng, index, options['loads']) for index in range(options['settlements'])]
+        every = options['company_driver_every']
+
+        def render(cold):
+            for index, (data, cd_loads) in enumerate(settlements):
+                if cold:
+                    pdf_templates._build.cache_clear()
+                generate_driver_pay_pdf(data, None, COMPANY)
+                if every and index % every == 0:
+                    generate_company_driver_pdf(data, None, cd_loads, COMPANY)
+
+        for label, cold in (('template per call', True), ('template registry', False)):
+            pdf_templates._build.cache_clear()
+            started = time.perf_counter()
+            render(cold)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{label:>18}: {len(settlements)} settlements in {elapsed:.2f} s, "
+                              f"{len(settlements) / elapsed:.0f}/s, {elapsed / len(settlements) * 1e3:.1f} ms each")
+
+        data, cd_loads = _settlement(rng, 'long', options['long_loads'])
+        pages = len(PdfReader(generate_driver_pay_pdf(data, None, COMPANY)).pages)
+        cd_pages = len(PdfReader(generate_company_driver_pdf(data, None, cd_loads, COMPANY)).pages)
+        self.stdout.write(f"{options['long_loads']} loads: {pages} pages, company driver PDF {cd_pages} pages")
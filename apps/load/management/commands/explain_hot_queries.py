@@ -0,0 +1,161 @@
+import random
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from api.filters import filter_loads
+from apps.auth.models import Company, User, UserLocation
+from apps.load.models import Driver, Load, Stops
+from apps.load.models.driver import DriverExpense
+from apps.load.payroll import period_loads
+from apps.load.stop_span import analyze_stop_tables, refresh_stop_span
+
+
+# Indexes added for these queries (apps_load 0044 and 0048, apps_auth 0020); "before" plans are taken with them dropped
+HOT_PATH_INDEXES = (
+    'load_reference_idx',
+    'load_invoice_number_idx',
+    'load_weekly_number_idx',
+    'stops_name_appointment_idx',
+    'driverexpense_driver_date_idx',
+    'userlocation_user_created_idx',
+    'load_driver_first_pickup_idx',
+    'load_driver_last_delivery_idx',
+    'load_first_pickup_idx',
+    'load_last_delivery_idx',
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("EXPLAIN the hot-path load/pay/relay queries with and without the hot-path indexes. "
+            "Everything, including --seed data and the dropped indexes, is rolled back at the end; "
+            "DROP INDEX locks the tables meanwhile, so run it against a copy, not production.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help="create this many synthetic loads first")
+        parser.add_argument('--analyze', action='store_true', help="EXPLAIN ANALYZE (runs the queries)")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("The plans are only meaningful on PostgreSQL.")
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    self.seed(options['seed'])
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+                queries = self.queries()
+
+                self.stdout.write(self.style.MIGRATE_HEADING('=== before (hot-path indexes dropped) ==='))
+                sid = transaction.savepoint()
+                with connection.cursor() as cursor:
+                    for name in HOT_PATH_INDEXES:
+                        cursor.execute(f'DROP INDEX IF EXISTS {connection.ops.quote_name(name)}')
+                self.explain_all(queries, options['analyze'])
+                transaction.savepoint_rollback(sid)
+
+                self.stdout.write(self.style.MIGRATE_HEADING('=== after ==='))
+                self.explain_all(queries, options['analyze'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def explain_all(self, queries, analyze):
+        for title, queryset in queries:
+            self.stdout.write(self.style.SQL_KEYWORD(f'-- {title}'))
+            self.stdout.write(queryset.explain(analyze=analyze) + '\n')
+
+    def queries(self):
+        load = Load.objects.exclude(reference_id__isnull=True).order_by('?').first()
+        driver = Driver.objects.order_by('?').first()
+        user = User.objects.filter(locations__isnull=False).order_by('?').first()
+        if not (load and driver and user):
+            raise CommandError("Not enough data to build the queries; pass --seed.")
+        pay_to = timezone.localdate()
+        pay_from = pay_to - timedelta(days=14)
+
+        # the pay-period query before first_pickup_at / last_delivery_at (apps_load 0048)
+        aggregate_pay_loads = Load.objects.filter(
+            driver=driver, stop__appointmentdate__isnull=False
+        ).annotate(
+            calculated_pickup_date=Min('stop__appointmentdate', filter=Q(stop__stop_name='PICKUP')),
+            calculated_delivery_date=Max('stop__appointmentdate', filter=Q(stop__stop_name='DELIVERY'))
+        ).filter(
+            calculated_pickup_date__isnull=False, calculated_delivery_date__isnull=False
+        ).filter(
+            Q(calculated_pickup_date__date__gte=pay_from, calculated_pickup_date__date__lte=pay_to) |
+            Q(calculated_delivery_date__date__gte=pay_from, calculated_delivery_date__date__lte=pay_to) |
+            Q(calculated_pickup_date__date__lte=pay_from, calculated_delivery_date__date__gte=pay_to)
+        ).distinct()
+
+        return [
+            ("find_and_update_load: Load by reference_id",
+             Load.objects.filter(reference_id=load.reference_id)),
+            ("payroll: driver's loads in the pay period, aggregated from the stops (before 0048)",
+             aggregate_pay_loads),
+            ("payroll: period_loads() on first_pickup_at / last_delivery_at",
+             period_loads(driver, pay_from, pay_to)),
+            ("DriverPayCreateView: driver's expenses in the pay period",
+             DriverExpense.objects.filter(driver=driver, expense_date__gte=pay_from, expense_date__lte=pay_to)),
+            ("LoadListView: ?invoice_number=",
+             filter_loads(Load.objects.all(), {'invoice_number': '1001'}).order_by('-updated_date', '-id')[:50]),
+            ("LoadListView: ?load_status=&driver=",
+             filter_loads(Load.objects.all(), {'load_status': 'DELIVERED', 'driver': str(driver.pk)})
+             .order_by('-updated_date', '-id')[:50]),
+            ("LoadBoardView: loads with a pickup in the next day",
+             Load.objects.filter(stop__stop_name='PICKUP', stop__appointmentdate__range=(
+                 timezone.now(), timezone.now() + timedelta(days=1))).distinct()),
+            ("LoadBoardView: ?first_pickup_from=&first_pickup_to= (next day)",
+             filter_loads(Load.objects.all(), {'first_pickup_from': timezone.now().isoformat(),
+                                               'first_pickup_to': (timezone.now() + timedelta(days=1)).isoformat()})),
+            ("Reports: ?period_from=&period_to= (loads on the road in the last two weeks)",
+             filter_loads(Load.objects.all(), {'period_from': str(pay_from), 'period_to': str(pay_to)})),
+            ("Latest location of a user",
+             UserLocation.objects.filter(user=user).order_by('-created_at')[:1]),
+        ]
+
+    def seed(self, count):
+        rng = random.Random(0)
+        self.stdout.write(f"seeding {count} loads...")
+        company = Company.objects.create(company_name='explain_hot_queries')
+        users = User.objects.bulk_create([
+            User(email=f'explain-{index}@example.com', company=company) for index in range(max(count // 100, 10))])
+        drivers = Driver.objects.bulk_create([Driver(user=user) for user in users])
+        now = timezone.now()
+        statuses = [choice for choice, _ in Load._meta.get_field('load_status').choices] or ['OPEN']
+
+        loads = Load.objects.bulk_create([
+            Load(
+                load_id=f'EX{index}', reference_id=f'T-{rng.randrange(10 ** 9)}' if rng.random() < 0.8 else None,
+                driver=rng.choice(drivers), load_status=rng.choice(statuses),
+                invoice_number=str(1000 + index // 200) if rng.random() < 0.3 else None,
+                weekly_number=str(index // 500) if rng.random() < 0.3 else None,
+            )
+            for index in range(count)
+        ], batch_size=2000)
+        stops = []
+        for load in loads:
+            pickup = now - timedelta(days=rng.randrange(-30, 335), hours=rng.randrange(24))
+            stops.append(Stops(load=load, stop_name='PICKUP', appointmentdate=pickup))
+            stops.append(Stops(load=load, stop_name='DELIVERY', appointmentdate=pickup + timedelta(days=rng.randrange(1, 4))))
+        Stops.objects.bulk_create(stops, batch_size=2000)
+        Load.stop.through.objects.bulk_create(
+            [Load.stop.through(load_id=stop.load_id, stops_id=stop.pk) for stop in stops], batch_size=2000)
+        analyze_stop_tables(Load)
+        refresh_stop_span(Load.objects.filter(pk__in=[load.pk for load in loads]))
+
+        DriverExpense.objects.bulk_create([
+            DriverExpense(driver=driver, transaction_type='-', description='fuel', amount=100,
+                          expense_date=date.today() - timedelta(days=rng.randrange(365)))
+            for driver in drivers for _ in range(50)
+        ], batch_size=2000)
+        UserLocation.objects.bulk_create([
+            UserLocation(user=user, latitude=0, longitude=0) for user in users for _ in range(200)
+        ], batch_size=2000)
@@ -0,0 +1,31 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from apps.load.miles import BATCH_SIZE, POLL_INTERVAL, run_worker
+
+
+class Command(BaseCommand):
+    help = ("Calculates the miles of bulk written loads queued in MileQueue (apps/load/miles.py). "
+            "Runs until SIGTERM / Ctrl+C; several workers may run side by side.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL, help="seconds between empty polls")
+        parser.add_argument('--once', action='store_true', help="exit when the queue is empty")
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+
+        def shutdown(signum, frame):
+            # joriy partiya tugatiladi, yangisi olinmaydi
+            self.stdout.write("Stopping after the current batch...")
+            stop.set()
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        processed = run_worker(batch_size=options['batch_size'], poll_interval=options['poll_interval'],
+                               once=options['once'], stop=stop)
+        summary = ", ".join(f"{count} {outcome}" for outcome, count in sorted(processed.items()))
+        self.stdout.write(self.style.SUCCESS(f"Mile worker stopped: {summary or 'nothing queued'}"))
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.load.models import LoadTombstone
+
+
+class Command(BaseCommand):
+    help = ("Deletes the load tombstones older than LoadTombstone.RETENTION. The changes feed answers older "
+            "cursors with 410 Gone, so those clients resync instead of missing the purged deletes. Run daily.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=LoadTombstone.RETENTION.days,
+                            help="keep this many days (more than the default only)")
+
+    def handle(self, *args, **options):
+        # feed RETENTION dan yoshroq cursorlarni qabul qiladi: undan qisqa saqlash ularni buzadi
+        retention = max(timedelta(days=options['days']), LoadTombstone.RETENTION)
+        deleted, _ = LoadTombstone.objects.filter(deleted_at__lt=timezone.now() - retention).delete()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} load tombstones older than {retention.days} days deleted"))
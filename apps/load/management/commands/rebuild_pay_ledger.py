@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.load.ledger import index_pay_lines, ledger_totals
+from apps.load.models import Load
+from apps.load.models.driver import DriverPay
+from apps.load.payroll import calculate_settlement, latest_pay
+
+
+class Command(BaseCommand):
+    help = ("Rebuilds the LoadPayLine ledger for every load (run once after migrating to 0047_load_pay_ledger). "
+            "With --verify, re-runs each historic DriverPay period from the ledger and through "
+            "calculate_settlement() and compares the totals.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true')
+        parser.add_argument('--skip-rebuild', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not options['skip_rebuild']:
+            started = time.perf_counter()
+            index_pay_lines(Load.objects.all(), batch_size=options['batch_size'])
+            self.stdout.write(f"ledger rebuilt in {time.perf_counter() - started:.1f} s")
+        if options['verify']:
+            self.verify()
+
+    def verify(self):
+        periods = (DriverPay.objects.filter(driver__isnull=False, pay_from__isnull=False, pay_to__isnull=False)
+                   .select_related('driver').order_by('driver_id', 'pay_from', 'pay_to')
+                   .distinct('driver_id', 'pay_from', 'pay_to'))
+        ledger_time = settlement_time = 0.0
+        checked = mismatched = 0
+        for driver_pay in periods:
+            driver = driver_pay.driver
+            pay = latest_pay(driver)
+            if pay is None:
+                continue
+            started = time.perf_counter()
+            totals = ledger_totals(driver, driver_pay.pay_from, driver_pay.pay_to)
+            ledger_time += time.perf_counter() - started
+            started = time.perf_counter()
+            settlement = calculate_settlement(driver, pay, driver_pay.pay_from, driver_pay.pay_to)
+            settlement_time += time.perf_counter() - started
+
+            checked += 1
+            ledger_total, settlement_total = f"{totals['total_pay']:.2f}", f"{settlement['amount']:.2f}"
+            if ledger_total != settlement_total:
+                mismatched += 1
+                self.stdout.write(self.style.WARNING(
+                    f"driver {driver.pk} {driver_pay.pay_from} - {driver_pay.pay_to}: "
+                    f"ledger {ledger_total}, settlement {settlement_total}"))
+        if checked:
+            self.stdout.write(
+                f"{checked} periods, {mismatched} mismatched; ledger {ledger_time / checked * 1e3:.1f} ms, "
+                f"calculate_settlement {settlement_time / checked * 1e3:.1f} ms per period")
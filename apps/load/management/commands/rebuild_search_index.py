@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.load.models import Load
+from apps.load.search import index_loads
+
+
+class Command(BaseCommand):
+    help = ("Rebuilds search_document and search_vector (load search) for every load. "
+            "Run once after migrating to 0043_load_search; saves keep them current afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index_loads(Load.objects.all(), batch_size=options['batch_size'])
+        self.stdout.write(f"search index rebuilt for {Load.objects.count()} loads "
+                          f"in {time.perf_counter() - started:.1f} s")
@@ -0,0 +1,41 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from apps.load.models.driver import DriverPay
+from apps.load.settlement_pdf import BATCH_SIZE, POLL_INTERVAL, queue_settlement_pdf, run_worker
+
+
+class Command(BaseCommand):
+    help = ("Renders the settlement PDFs queued PENDING (and RENDERING ones whose worker died) "
+            "(apps/load/settlement_pdf.py). With --worker, keeps rendering until SIGTERM / Ctrl+C; several "
+            "workers may run side by side. --failed retries FAILED ones.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('driver_pays', nargs='*', type=int, help="re-render only these DriverPay ids")
+        parser.add_argument('--failed', action='store_true', help="also retry FAILED")
+        parser.add_argument('--worker', action='store_true', help="keep polling for queued PDFs")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL, help="seconds between empty polls")
+
+    def handle(self, *args, **options):
+        driver_pay_ids = options['driver_pays'] or None
+        if driver_pay_ids:
+            queue_settlement_pdf(driver_pay_ids)
+        if options['failed']:
+            queue_settlement_pdf(DriverPay.objects.filter(pdf_status='FAILED').values_list('pk', flat=True))
+
+        stop = threading.Event()
+        if options['worker']:
+            def shutdown(signum, frame):
+                # joriy partiya tugatiladi, yangisi olinmaydi
+                self.stdout.write("Stopping after the current batch...")
+                stop.set()
+            signal.signal(signal.SIGTERM, shutdown)
+            signal.signal(signal.SIGINT, shutdown)
+
+        processed = run_worker(batch_size=options['batch_size'], poll_interval=options['poll_interval'],
+                               once=not options['worker'], stop=stop, driver_pay_ids=driver_pay_ids)
+        self.stdout.write(f"Settlement PDFs: {processed.get('READY', 0)} ready, {processed.get('FAILED', 0)} failed "
+                          f"(see DriverPay.pdf_error)")
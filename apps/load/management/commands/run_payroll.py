@@ -0,0 +1,81 @@
+import signal
+import threading
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.load.models import PayrollRun
+from apps.load.payroll_run import DEFAULT_WORKERS, POLL_INTERVAL, execute_payroll_run, run_worker
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}. Use YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = ("Creates DriverPay for every active driver for a pay period, in parallel worker processes. "
+            "Progress and per-driver failures are recorded on a PayrollRun. With --worker, executes the "
+            "runs queued by the API (and re-claims stalled ones) until SIGTERM / Ctrl+C.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('pay_from', nargs='?', help="YYYY-MM-DD")
+        parser.add_argument('pay_to', nargs='?', help="YYYY-MM-DD")
+        parser.add_argument('--notes', default='')
+        parser.add_argument('--invoice-number', type=int)
+        parser.add_argument('--weekly-number', type=int)
+        parser.add_argument('--drivers', help="comma separated driver ids instead of every active driver")
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="0 runs in this process")
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument('--worker', action='store_true', help="execute queued PayrollRuns instead of a new one")
+        parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL, help="seconds between empty polls")
+        parser.add_argument('--once', action='store_true', help="with --worker: exit when no run is queued")
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            return self.work(options)
+        if not options['pay_from'] or not options['pay_to']:
+            raise CommandError("pay_from and pay_to are required (or use --worker).")
+        pay_from, pay_to = _date(options['pay_from']), _date(options['pay_to'])
+        if pay_from > pay_to:
+            raise CommandError("pay_from must not be after pay_to.")
+        driver_ids = None
+        if options['drivers']:
+            driver_ids = [int(driver_id) for driver_id in options['drivers'].split(',')]
+
+        # RUNNING: navbatdagi ishchi bu runni olmaydi
+        run = PayrollRun.objects.create(
+            pay_from=pay_from, pay_to=pay_to, notes=options['notes'], driver_ids=driver_ids,
+            invoice_number=options['invoice_number'], weekly_number=options['weekly_number'],
+            status='RUNNING', started_at=timezone.now())
+        self.stdout.write(f"PayrollRun {run.pk}: {pay_from} - {pay_to}")
+        self.report(execute_payroll_run(run.pk, workers=options['workers'], chunk_size=options['chunk_size']))
+
+    def work(self, options):
+        stop = threading.Event()
+
+        def shutdown(signum, frame):
+            # joriy run tugatiladi, yangisi olinmaydi
+            self.stdout.write("Stopping after the current run...")
+            stop.set()
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        runs = run_worker(workers=options['workers'], chunk_size=options['chunk_size'],
+                          poll_interval=options['poll_interval'], once=options['once'], stop=stop)
+        for run in runs:
+            self.stdout.write(f"PayrollRun {run.pk}: {run.pay_from} - {run.pay_to}")
+            self.report(run)
+        self.stdout.write(self.style.SUCCESS(f"Payroll worker stopped: {len(runs)} runs executed"))
+
+    def report(self, run):
+        for result in run.results:
+            if result['status'] != 'ok':
+                self.stdout.write(f"  driver {result['driver']}: {result['status']} - {result['detail']}")
+        style = self.style.SUCCESS if run.status == 'COMPLETED' else self.style.WARNING
+        self.stdout.write(style(
+            f"{run.status}: {run.success_count} settled, {run.skipped_count} skipped, "
+            f"{run.error_count} failed of {run.total_count}"))
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.load.management.commands.run_payroll import _date
+from apps.load.models import PayrollRun
+from apps.load.settlement_packet import PACKET_WORKERS, build_settlement_packet, period_driver_pays
+
+
+class Command(BaseCommand):
+    help = ("Writes one PDF with the settlement of every driver of a pay period (or of a PayrollRun), "
+            "with a table of contents. Drivers are rendered in parallel worker processes and streamed "
+            "into the file.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('pay_from', nargs='?', help="YYYY-MM-DD")
+        parser.add_argument('pay_to', nargs='?', help="YYYY-MM-DD")
+        parser.add_argument('--run', type=int, help="the DriverPays created by this PayrollRun instead of a period")
+        parser.add_argument('--output', '-o', help="default: settlement_packet_<pay_from>_<pay_to>.pdf")
+        parser.add_argument('--workers', type=int, default=PACKET_WORKERS, help="0 renders in this process")
+
+    def handle(self, *args, **options):
+        if options['run']:
+            try:
+                run = PayrollRun.objects.get(pk=options['run'])
+            except PayrollRun.DoesNotExist:
+                raise CommandError(f"PayrollRun {options['run']} not found.")
+            pay_from, pay_to = run.pay_from, run.pay_to
+            created = {result['driver_pay'] for result in run.results if result['status'] == 'ok'}
+            driver_pay_ids = [pk for pk in period_driver_pays(pay_from, pay_to).values_list('pk', flat=True)
+                              if pk in created]
+        elif options['pay_from'] and options['pay_to']:
+            pay_from, pay_to = _date(options['pay_from']), _date(options['pay_to'])
+            driver_pay_ids = list(period_driver_pays(pay_from, pay_to).values_list('pk', flat=True))
+        else:
+            raise CommandError("Give pay_from and pay_to, or --run.")
+        if not driver_pay_ids:
+            raise CommandError(f"No DriverPay for {pay_from} - {pay_to}.")
+
+        output = options['output'] or f"settlement_packet_{pay_from}_{pay_to}.pdf"
+        started = time.perf_counter()
+        with open(output, 'wb') as sink:
+            pages = build_settlement_packet(driver_pay_ids, sink, workers=options['workers'],
+                                            title=f"Driver Settlements {pay_from} - {pay_to}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{output}: {len(driver_pay_ids)} drivers, {pages} pages in {time.perf_counter() - started:.1f} s"))
@@ -0,0 +1,49 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.load.notifications import BATCH_SIZE, POLL_INTERVAL, WORKERS, queue_depth, run_worker
+from utils.telegram import telegram_client
+
+
+class Command(BaseCommand):
+    help = ("Sends the load Telegram notifications queued in NotificationOutbox with a bounded thread pool "
+            "(or one event loop with --asyncio). "
+            "Runs until SIGTERM / Ctrl+C; several workers may run side by side.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=WORKERS, help="concurrent Telegram requests")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL, help="seconds between empty polls")
+        parser.add_argument('--asyncio', action='store_true',
+                            help="send each batch on one event loop instead of the thread pool (--workers is unused)")
+        parser.add_argument('--once', action='store_true', help="exit when nothing is due")
+        parser.add_argument('--stats', action='store_true', help="print the queue depth and exit")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            depth = queue_depth()
+            for status, count in depth['counts'].items():
+                self.stdout.write(f"{status:>9}: {count}")
+            oldest = depth['oldest_due_seconds']
+            self.stdout.write(f"oldest due: {f'{oldest:.0f} s' if oldest is not None else '-'}")
+            return
+        if options['workers'] < 1:
+            raise CommandError("--workers must be at least 1.")
+
+        stop = threading.Event()
+
+        def shutdown(signum, frame):
+            # joriy partiya tugatiladi, yangisi olinmaydi
+            self.stdout.write("Stopping after the current batch...")
+            stop.set()
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        processed = run_worker(workers=options['workers'], batch_size=options['batch_size'],
+                               poll_interval=options['poll_interval'], once=options['once'], stop=stop,
+                               use_asyncio=options['asyncio'])
+        summary = ", ".join(f"{count} {status.lower()}" for status, count in sorted(processed.items()))
+        self.stdout.write(self.style.SUCCESS(f"Telegram worker stopped: {summary or 'nothing sent'}"))
+        self.stdout.write(f"Telegram client: {telegram_client().stats()}")
@@ -0,0 +1,202 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Bu modellar / ustunlar ilgari migratsiyasiz qo'shilgan: ishlayotgan bazada
+# ular allaqachon bor, migratsiyadan qurilgan (yangi / test) bazada esa yo'q.
+# Holat modelga moslanadi, bazada faqat yo'q jadval, ustun va indekslar
+# yaratiladi (IF NOT EXISTS), mavjud ma'lumotga tegilmaydi.
+CREATE_TABLES = """
+CREATE TABLE IF NOT EXISTS "apps_load_amazonrelaypayment" (
+    "id" bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    "work_period_start" date NULL, "work_period_end" date NULL, "file" varchar(100) NOT NULL,
+    "uploaded_at" timestamp with time zone NOT NULL, "status" varchar(20) NOT NULL,
+    "processed_at" timestamp with time zone NULL, "total_amount" numeric(10, 2) NOT NULL,
+    "loads_updated" integer NOT NULL, "error_message" text NOT NULL,
+    "invoice_number" varchar(100) NULL, "weekly_number" varchar(100) NULL
+);
+CREATE TABLE IF NOT EXISTS "apps_load_csvimport" (
+    "id" bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    "csv_file" varchar(100) NOT NULL, "start_row" integer NOT NULL, "end_row" integer NOT NULL,
+    "created_at" timestamp with time zone NOT NULL, "processed" boolean NOT NULL,
+    "success_count" integer NOT NULL, "error_count" integer NOT NULL, "error_log" text NULL
+);
+CREATE TABLE IF NOT EXISTS "apps_load_amazonrelayprocessedrecord" (
+    "id" bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    "trip_id" varchar(100) NULL, "load_id" varchar(100) NULL, "route" varchar(200) NOT NULL,
+    "gross_pay" numeric(10, 2) NOT NULL, "start_date" date NULL, "end_date" date NULL,
+    "distance" numeric(10, 2) NOT NULL, "is_matched" boolean NOT NULL,
+    "created_at" timestamp with time zone NOT NULL,
+    "matched_load_id" bigint NULL
+        CONSTRAINT "apps_load_amazonrela_matched_load_id_bd8fc923_fk_apps_load"
+        REFERENCES "apps_load_load" ("id") DEFERRABLE INITIALLY DEFERRED,
+    "payment_id" bigint NOT NULL
+        CONSTRAINT "apps_load_amazonrela_payment_id_71e49915_fk_apps_load"
+        REFERENCES "apps_load_amazonrelaypayment" ("id") DEFERRABLE INITIALLY DEFERRED
+);
+CREATE INDEX IF NOT EXISTS "apps_load_amazonrelayprocessedrecord_matched_load_id_bd8fc923"
+    ON "apps_load_amazonrelayprocessedrecord" ("matched_load_id");
+CREATE INDEX IF NOT EXISTS "apps_load_amazonrelayprocessedrecord_payment_id_71e49915"
+    ON "apps_load_amazonrelayprocessedrecord" ("payment_id");
+"""
+
+ADD_COLUMNS = """
+ALTER TABLE "apps_load_driverexpense"
+    ADD COLUMN IF NOT EXISTS "invoice_number" integer NULL,
+    ADD COLUMN IF NOT EXISTS "weekly_number" integer NULL;
+ALTER TABLE "apps_load_driverpay"
+    ADD COLUMN IF NOT EXISTS "cd_file" varchar(100) NULL,
+    ADD COLUMN IF NOT EXISTS "company_driver_data" jsonb NULL,
+    ADD COLUMN IF NOT EXISTS "company_driver_pay" double precision NULL,
+    ADD COLUMN IF NOT EXISTS "invoice_number" integer NULL,
+    ADD COLUMN IF NOT EXISTS "miles_rate" double precision NULL,
+    ADD COLUMN IF NOT EXISTS "total_miles" integer NULL,
+    ADD COLUMN IF NOT EXISTS "weekly_number" integer NULL;
+ALTER TABLE "apps_load_load"
+    ADD COLUMN IF NOT EXISTS "amazon_amount" numeric(10, 2) NULL,
+    ADD COLUMN IF NOT EXISTS "invoice_number" varchar(100) NULL,
+    ADD COLUMN IF NOT EXISTS "weekly_number" varchar(100) NULL;
+ALTER TABLE "apps_load_stops" ALTER COLUMN "stop_name" TYPE varchar(20);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps_load', '0038_alter_customerbroker_contact_number'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(CREATE_TABLES + ADD_COLUMNS, migrations.RunSQL.noop),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name='AmazonRelayPayment',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('work_period_start', models.DateField(blank=True, null=True)),
+                        ('work_period_end', models.DateField(blank=True, null=True)),
+                        ('file', models.FileField(upload_to='amazon_relay_files/')),
+                        ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+                        ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                        ('processed_at', models.DateTimeField(blank=True, null=True)),
+                        ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                        ('loads_updated', models.IntegerField(default=0)),
+                        ('error_message', models.TextField(blank=True)),
+                        ('invoice_number', models.CharField(blank=True, max_length=100, null=True)),
+                        ('weekly_number', models.CharField(blank=True, max_length=100, null=True)),
+                    ],
+                    options={
+                        'verbose_name': 'Amazon Relay Payment',
+                        'verbose_name_plural': 'Amazon Relay Payments',
+                        'ordering': ['-uploaded_at'],
+                    },
+                ),
+                migrations.CreateModel(
+                    name='CSVImport',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('csv_file', models.FileField(upload_to='amazon_relay_files/')),
+                        ('start_row', models.IntegerField(default=2, help_text='Qaysi qatordan boshlash (Excel formatida, masalan 2)')),
+                        ('end_row', models.IntegerField(help_text='Qaysi qatorgacha (Excel formatida, masalan 2200)')),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('processed', models.BooleanField(default=False)),
+                        ('success_count', models.IntegerField(default=0)),
+                        ('error_count', models.IntegerField(default=0)),
+                        ('error_log', models.TextField(blank=True, null=True)),
+                    ],
+                    options={
+                        'verbose_name': 'CSV Import',
+                        'verbose_name_plural': 'CSV Imports',
+                    },
+                ),
+                migrations.AddField(
+                    model_name='driverexpense',
+                    name='invoice_number',
+                    field=models.IntegerField(blank=True, null=True),
+                ),
+                migrations.AddField(
+                    model_name='driverexpense',
+                    name='weekly_number',
+                    field=models.IntegerField(blank=True, null=True),
+                ),
+                migrations.AddField(
+                    model_name='driverpay',
+                    name='cd_file',
+                    field=models.FileField(blank=True, null=True, upload_to='driver_pay_cd_files/'),
+                ),
+                migrations.AddField(
+                    model_name='driverpay',
+                    name='company_driver_data',
+                    field=models.JSONField(blank=True, default=dict, null=True),
+                ),
+                migrations.AddField(
+                    model_name='driverpay',
+                    name='company_driver_pay',
+                    field=models.FloatField(blank=True, null=True),
+                ),
+                migrations.AddField(
+                    model_name='driverpay',
+                    name='invoice_number',
+                    field=models.IntegerField(blank=True, null=True),
+                ),
+                migrations.AddField(
+                    model_name='driverpay',
+                    name='miles_rate',
+                    field=models.FloatField(blank=True, default=0.65, null=True),
+                ),
+                migrations.AddField(
+                    model_name='driverpay',
+                    name='total_miles',
+                    field=models.IntegerField(blank=True, null=True),
+                ),
+                migrations.AddField(
+                    model_name='driverpay',
+                    name='weekly_number',
+                    field=models.IntegerField(blank=True, null=True),
+                ),
+                migrations.AddField(
+                    model_name='load',
+                    name='amazon_amount',
+                    field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+                ),
+                migrations.AddField(
+                    model_name='load',
+                    name='invoice_number',
+                    field=models.CharField(blank=True, max_length=100, null=True),
+                ),
+                migrations.AddField(
+                    model_name='load',
+                    name='weekly_number',
+                    field=models.CharField(blank=True, max_length=100, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='stops',
+                    name='stop_name',
+                    field=models.CharField(blank=True, choices=[('PICKUP', 'Pickup'), ('DELIVERY', 'Delivery'), ('Stop-2', 'Stop-2'), ('Stop-3', 'Stop-3')], max_length=20, null=True),
+                ),
+                migrations.CreateModel(
+                    name='AmazonRelayProcessedRecord',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('trip_id', models.CharField(blank=True, max_length=100, null=True)),
+                        ('load_id', models.CharField(blank=True, max_length=100, null=True)),
+                        ('route', models.CharField(blank=True, max_length=200)),
+                        ('gross_pay', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                        ('start_date', models.DateField(blank=True, null=True)),
+                        ('end_date', models.DateField(blank=True, null=True)),
+                        ('distance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                        ('is_matched', models.BooleanField(default=False)),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('matched_load', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='apps_load.load')),
+                        ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='processed_records', to='apps_load.amazonrelaypayment')),
+                    ],
+                    options={
+                        'verbose_name': 'Amazon Relay Processed Record',
+                        'verbose_name_plural': 'Amazon Relay Processed Records',
+                    },
+                ),
+            ],
+        ),
+    ]
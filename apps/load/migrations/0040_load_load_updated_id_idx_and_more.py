@@ -0,0 +1,55 @@
+# Generated by Django 5.2 on 2026-10-17 21:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps_load', '0039_reconcile_model_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(fields=['updated_date', 'id'], name='load_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(fields=['load_status', 'updated_date', 'id'], name='load_status_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(fields=['invoice_status', 'updated_date', 'id'], name='load_invoice_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(fields=['driver', 'updated_date', 'id'], name='load_driver_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(fields=['dispatcher', 'updated_date', 'id'], name='load_dispatcher_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(fields=['team_id', 'updated_date', 'id'], name='load_team_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(fields=['unit_id', 'updated_date', 'id'], name='load_unit_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(fields=['created_date'], name='load_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(fields=['pickup_date'], name='load_pickup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(fields=['delivery_date'], name='load_delivery_idx'),
+        ),
+    ]
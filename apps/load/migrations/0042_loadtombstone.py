@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-17 21:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps_load', '0041_commodities_updated_at_customerbroker_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoadTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('load_pk', models.IntegerField()),
+                ('load_id', models.CharField(blank=True, max_length=200, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['deleted_at', 'id'], name='load_tombstone_deleted_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-17 21:35
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+# Mavjud loadlar uchun search_document / search_vector migratsiyadan keyin
+# to'ldiriladi: manage.py rebuild_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps_load', '0042_loadtombstone'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='load',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='load',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='load_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_document'], name='load_search_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
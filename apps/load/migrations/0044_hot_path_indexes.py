@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-17 21:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps_load', '0043_load_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='driverexpense',
+            index=models.Index(fields=['driver', 'expense_date'], name='driverexpense_driver_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(condition=models.Q(('reference_id__isnull', False)), fields=['reference_id'], name='load_reference_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(condition=models.Q(('invoice_number__isnull', False)), fields=['invoice_number'], name='load_invoice_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(condition=models.Q(('weekly_number__isnull', False)), fields=['weekly_number'], name='load_weekly_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stops',
+            index=models.Index(fields=['stop_name', 'appointmentdate'], name='stops_name_appointment_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    # settings.CACHES dagi DatabaseCache jadvallari (payroll_cache)
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+def drop_cache_table(apps, schema_editor):
+    schema_editor.execute('DROP TABLE IF EXISTS payroll_cache')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps_load', '0045_payroll_run'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, drop_cache_table),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-17 21:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Mavjud loadlar uchun ledger migratsiyadan keyin to'ldiriladi:
+# manage.py rebuild_pay_ledger
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps_load', '0046_payroll_cache_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoadPayLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('BASE', 'Base percentage'), ('PERCENTAGE', 'Detention / layover'), ('REIMBURSEMENT', 'Reimbursement'), ('CHARGEBACK', 'Chargeback')], max_length=20)),
+                ('pay_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('basis', models.FloatField(default=0)),
+                ('rate', models.FloatField(blank=True, null=True)),
+                ('amount', models.FloatField(default=0)),
+                ('pickup_date', models.DateField()),
+                ('delivery_date', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pay_lines', to='apps_load.driver')),
+                ('load', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pay_lines', to='apps_load.load')),
+                ('other_pay', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pay_lines', to='apps_load.otherpay')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='loadpayline',
+            index=models.Index(fields=['driver', 'pickup_date', 'delivery_date'], name='loadpayline_driver_period_idx'),
+        ),
+    ]
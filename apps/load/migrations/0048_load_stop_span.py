@@ -0,0 +1,65 @@
+# Generated by Django 5.2 on 2026-10-17 22:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_stop_span(apps, schema_editor):
+    # apps.load.stop_span bilan bir xil qoida, tarixiy jadvallar ustida:
+    # M2M (Load.stop) stoplarining eng erta PICKUP va eng kech DELIVERY vaqti
+    Load = apps.get_model('apps_load', 'Load')
+    through = Load._meta.get_field('stop').remote_field.through
+    Stops = Load._meta.get_field('stop').related_model
+    quote = schema_editor.connection.ops.quote_name
+    load, link, stops = (quote(model._meta.db_table) for model in (Load, through, Stops))
+    load_id = quote(through._meta.get_field('load').column)
+    stops_id = quote(through._meta.get_field('stops').column)
+
+    def span(aggregate, stop_name):
+        return (f'(SELECT {aggregate}(s.appointmentdate) FROM {link} t JOIN {stops} s ON s.id = t.{stops_id} '
+                f"WHERE t.{load_id} = {load}.id AND s.stop_name = '{stop_name}')")
+
+    with schema_editor.connection.cursor() as cursor:
+        # statistikasiz Postgres har load uchun subqueryni seq scan qiladi
+        cursor.execute(f'ANALYZE {link}, {stops}')
+        cursor.execute(f"UPDATE {load} SET first_pickup_at = {span('MIN', 'PICKUP')}, "
+                       f"last_delivery_at = {span('MAX', 'DELIVERY')}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps_load', '0047_load_pay_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='load',
+            name='first_pickup_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='load',
+            name='last_delivery_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        # indexes are built after the backfill, in one pass
+        migrations.RunPython(backfill_stop_span, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(fields=['driver', 'first_pickup_at'], name='load_driver_first_pickup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(fields=['driver', 'last_delivery_at'], name='load_driver_last_delivery_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(fields=['first_pickup_at'], name='load_first_pickup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='load',
+            index=models.Index(fields=['last_delivery_at'], name='load_last_delivery_idx'),
+        ),
+    ]
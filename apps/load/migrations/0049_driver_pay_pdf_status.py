@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 22:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps_load', '0048_load_stop_span'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driverpay',
+            name='pdf_error',
+            field=models.TextField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='driverpay',
+            name='pdf_rendered_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='driverpay',
+            name='pdf_status',
+            field=models.CharField(blank=True, choices=[('PENDING', 'Pending'), ('RENDERING', 'Rendering'), ('READY', 'Ready'), ('FAILED', 'Failed')], editable=False, max_length=20, null=True),
+        ),
+    ]
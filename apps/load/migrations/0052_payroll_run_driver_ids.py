@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 23:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps_load', '0051_notification_outbox_text_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payrollrun',
+            name='driver_ids',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
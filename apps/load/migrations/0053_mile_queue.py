@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 23:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apps_load', '0052_payroll_run_driver_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MileQueue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.IntegerField(default=0)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('load', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mile_queue', to='apps_load.load')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,116 @@
+"""
+Mileage for bulk written loads.
+
+Load.save() calculates missing miles itself; the bulk endpoint writes loads
+without save(), so notify_loads_saved() queues a MileQueue row per load in
+the same transaction and the mile_worker command does the geocoding later,
+outside any request:
+
+  claim()    locks queued rows with SELECT ... FOR UPDATE SKIP LOCKED and
+             stamps locked_at; a row whose worker died is claimed again
+             after LOCK_TIMEOUT.
+  process()  calculates the load's miles if it still has none, refreshes
+             its pay lines and payroll preview, queues the Telegram edit,
+             and deletes the row. A failing row (including a geocoding or
+             distance lookup that comes back empty) keeps its lock, so it
+             is retried after LOCK_TIMEOUT, up to MAX_ATTEMPTS times.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.load.ledger import refresh_pay_lines
+from apps.load.models.load import Load
+from apps.load.models.mile_queue import MileQueue
+from apps.load.notifications import enqueue_load_updates
+from apps.load.payroll import invalidate_payroll_preview
+
+logger = logging.getLogger(__name__)
+
+
+BATCH_SIZE = 20
+POLL_INTERVAL = 2.0  # sekund
+LOCK_TIMEOUT = timedelta(minutes=5)
+MAX_ATTEMPTS = 3
+
+
+def enqueue_mile_calculation(load_ids):
+    """Queues the loads that have both locations but no miles; written on the caller's connection."""
+    load_ids = Load.objects.filter(pk__in=load_ids, pickup_location__gt='', delivery_location__gt='').filter(
+        Q(mile__isnull=True) | Q(mile=0) | Q(total_miles__isnull=True) | Q(total_miles=0)).values_list('pk', flat=True)
+    MileQueue.objects.bulk_create([MileQueue(load_id=load_id) for load_id in load_ids])
+
+
+def claim(batch_size=BATCH_SIZE):
+    """Locks up to ``batch_size`` queued rows for this worker and returns their ids, oldest first."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            MileQueue.objects.select_for_update(skip_locked=True)
+            .filter(Q(locked_at__isnull=True) | Q(locked_at__lt=now - LOCK_TIMEOUT))
+            .order_by('id')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if ids:
+            MileQueue.objects.filter(pk__in=ids).update(locked_at=now, attempts=F('attempts') + 1)
+    return ids
+
+
+def process(job_id):
+    """Calculates one claimed row's miles; returns 'done', 'unchanged', 'missing' or 'failed' ('retry' when it stays queued)."""
+    job = MileQueue.objects.select_related('load').filter(pk=job_id).first()
+    if job is None:
+        # load o'chirilgan: qator ham cascade bilan ketgan
+        return 'missing'
+    load = job.load
+    try:
+        # Load.save() dagi kabi: millar yo'q bo'lsa hisoblash
+        if not (load.pickup_location and load.delivery_location and (not load.mile or not load.total_miles)):
+            job.delete()
+            return 'unchanged'
+        if not load.calculate_miles():
+            # geocoding / masofa xizmati javob bermadi: qayta urinish mumkin
+            raise RuntimeError("Coordinates or distance could not be calculated")
+        Load.objects.filter(pk=load.pk).update(
+            mile=load.mile, per_mile=load.per_mile, empty_mile=load.empty_mile, total_miles=load.total_miles,
+            updated_date=timezone.now())
+        refresh_pay_lines([load.pk])
+        invalidate_payroll_preview([load.driver_id])
+        # xabardagi millar ham yangilansin
+        if load.team_id_id:
+            enqueue_load_updates([load.pk])
+    except Exception as e:
+        logger.exception("Mile calculation for load %s failed", load.pk)
+        if job.attempts < MAX_ATTEMPTS:
+            # qulf qoladi: LOCK_TIMEOUT dan keyin qayta olinadi
+            MileQueue.objects.filter(pk=job.pk).update(last_error=str(e) or repr(e))
+            return 'retry'
+        job.delete()
+        return 'failed'
+    job.delete()
+    return 'done'
+
+
+def run_worker(batch_size=BATCH_SIZE, poll_interval=POLL_INTERVAL, once=False, stop=None):
+    """Works the queue until ``stop`` is set (or, with ``once``, it is empty); returns the outcome counts."""
+    stop = stop or threading.Event()
+    processed = {}
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            ids = claim(batch_size)
+            if not ids:
+                if once:
+                    break
+                stop.wait(poll_interval)
+                continue
+            for job_id in ids:
+                outcome = process(job_id)
+                processed[outcome] = processed.get(outcome, 0) + 1
+    finally:
+        connection.close()
+    return processed
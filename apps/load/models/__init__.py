@@ -3,9 +3,13 @@ from .customerbroker import CustomerBroker
 from .dispatcher import Dispatcher, DispatcherTags
 from .driver import Driver, DriverTags
 from .employee import Employee, EmployeeTags
-from .load import Load, LoadTags
+from .load import Load, LoadTags, LoadTombstone
 from .otherpay import OtherPay
 from .stops import Stops
 from .trailer import Trailer, TrailerTags
 from .truck import Truck, TruckTags
-from .csv_import import CSVImport
\ No newline at end of file
+from .csv_import import CSVImport
+from .payroll_run import PayrollRun
+from .ledger import LoadPayLine
+from .notification import NotificationOutbox
+from .mile_queue import MileQueue
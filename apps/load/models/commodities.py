@@ -21,4 +21,5 @@ class Commodities(models.Model):
     height = models.IntegerField(blank=True, null=True)
     length = models.IntegerField(blank=True, null=True)
     note = models.CharField(max_length=200, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
 
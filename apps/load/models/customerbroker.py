@@ -75,6 +75,7 @@ class CustomerBroker(models.Model):
     city = models.CharField(max_length=50, blank=True, null=True)
     billing_type = models.CharField(max_length=50, choices=BILLING_TYPE_CHOICES, blank=True, null=True)
     terms_days = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
 
     def __str__(self):
         return self.company_name if self.company_name else f"CustomerBroker id {self.id}"
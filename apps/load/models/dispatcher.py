@@ -3,6 +3,7 @@ from django.conf import settings
 
 class DispatcherTags(models.Model):
     tag = models.CharField(max_length=40, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
 
 
 class Dispatcher(models.Model):
@@ -81,6 +82,7 @@ class Dispatcher(models.Model):
     company_name = models.CharField(max_length=50, blank=True, null=True)
     office = models.CharField(max_length=50, blank=True, null=True)
     dispatcher_tags = models.ForeignKey(DispatcherTags, related_name='dispatchertags', on_delete=models.CASCADE, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
     
     def __str__(self):
         return self.nickname or self.user.email
@@ -7,6 +7,7 @@ from django.conf import settings
 
 class DriverTags(models.Model):
     tag = models.CharField(max_length=50, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
 
     def __str__(self):
         return self.tag
@@ -131,6 +132,7 @@ class Driver(models.Model):
     payd = models.FloatField(blank=True, null=True)
     escrow_deposit = models.FloatField(blank=True, null=True)
     motive_id = models.CharField(max_length=100, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
 
     def __str__(self):
         return f"{self.user} - {self.id}"
@@ -154,6 +156,7 @@ class Pay(models.Model):
     picks_per = models.IntegerField(blank=True, null=True)
     drops_per = models.IntegerField(blank=True, null=True)
     wait_time = models.IntegerField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
     
 
 class DriverPay(models.Model):
@@ -166,7 +169,7 @@ class DriverPay(models.Model):
     file = models.FileField(upload_to='driver_pay_files/', blank=True, null=True)
     cd_file = models.FileField(upload_to='driver_pay_cd_files/', blank=True, null=True)
     created_at = models.DateTimeField(blank=True, null=True)
-    updated_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
     loads = models.JSONField(blank=True, null=True, default=list)  # Loads JSON sifatida saqlanadi
     invoice_number = models.IntegerField(blank=True, null=True)
     weekly_number = models.IntegerField(blank=True, null=True)
@@ -177,6 +180,17 @@ class DriverPay(models.Model):
     miles_rate = models.FloatField(default=0.65, blank=True, null=True)  # Per mile rate (0.65)
     company_driver_pay = models.FloatField(blank=True, null=True)  # Total pay for company driver
 
+    # Settlement PDF (file / cd_file) fonda yaratiladi: apps/load/settlement_pdf.py
+    PDF_STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RENDERING', 'Rendering'),
+        ('READY', 'Ready'),
+        ('FAILED', 'Failed'),
+    ]
+    pdf_status = models.CharField(max_length=20, choices=PDF_STATUS_CHOICES, blank=True, null=True, editable=False)
+    pdf_error = models.TextField(blank=True, null=True, editable=False)
+    pdf_rendered_at = models.DateTimeField(blank=True, null=True, editable=False)
+
 
     def __str__(self):
         return f"DriverPay {self.id} for {self.driver}"
@@ -195,6 +209,13 @@ class DriverExpense(models.Model):
     invoice_number = models.IntegerField(blank=True, null=True)
     weekly_number = models.IntegerField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # DriverPayCreateView: a driver's expenses in the pay period
+            models.Index(fields=['driver', 'expense_date'], name='driverexpense_driver_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.description} - ${self.amount} ({self.transaction_type})"
@@ -3,6 +3,7 @@ from apps.auth.models import User
 
 class EmployeeTags(models.Model):
     tag = models.CharField(max_length=40, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
 
     def __str__(self):
         return self.tag
@@ -84,4 +85,5 @@ class Employee(models.Model):
     employee_status = models.CharField(max_length=50, choices=EMPLOYMENT_STATUS_CHOICES, blank=True, null=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='employee_profile', blank=True, null=True)
     note = models.CharField(max_length=50, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
 
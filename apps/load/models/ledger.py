@@ -0,0 +1,39 @@
+from django.db import models
+
+from .driver import Driver
+from .load import Load
+from .otherpay import OtherPay
+
+
+class LoadPayLine(models.Model):
+    """
+    Loadning to'lov qatorlari (apps/load/ledger.py signallar orqali yangilaydi):
+    settlement dagi har bir hisob-kitob qatori, davr bo'yicha yig'ish uchun sanalar bilan
+    """
+
+    KIND_CHOICES = [
+        ('BASE', 'Base percentage'),
+        ('PERCENTAGE', 'Detention / layover'),
+        ('REIMBURSEMENT', 'Reimbursement'),
+        ('CHARGEBACK', 'Chargeback'),
+    ]
+
+    load = models.ForeignKey(Load, on_delete=models.CASCADE, related_name='pay_lines')
+    driver = models.ForeignKey(Driver, on_delete=models.CASCADE, related_name='pay_lines')
+    other_pay = models.ForeignKey(OtherPay, on_delete=models.CASCADE, related_name='pay_lines', blank=True, null=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    pay_type = models.CharField(max_length=50, blank=True, null=True)  # OtherPay.pay_type
+    basis = models.FloatField(default=0)  # load_pay yoki OtherPay.amount
+    rate = models.FloatField(blank=True, null=True)  # Pay.standart (Percentage da %, Per Mile / Hourly da $)
+    amount = models.FloatField(default=0)  # load to'loviga qo'shiladigan summa (chargeback manfiy)
+    pickup_date = models.DateField()
+    delivery_date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['driver', 'pickup_date', 'delivery_date'], name='loadpayline_driver_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.amount} (load {self.load_id})"
@@ -1,5 +1,8 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 import logging
+from datetime import timedelta
 
 # Logging sozlamalari
 logging.basicConfig(level=logging.INFO)
@@ -23,6 +26,7 @@ class LoadTags(models.Model):
     ]
 
     tag = models.CharField(max_length=50, choices=TAG_CHOICES, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
 
     def __str__(self):
         return self.tag
@@ -107,7 +111,41 @@ class Load(models.Model):
     amazon_amount = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     invoice_number = models.CharField(max_length=100, blank=True, null=True)
     weekly_number = models.CharField(max_length=100, blank=True, null=True)
-    
+    # Qidiruv uchun: apps/load/search.py to'ldiradi (load + stoplar matni)
+    search_document = models.TextField(blank=True, null=True, editable=False)
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
+    # Stoplar (M2M) dan: birinchi PICKUP va oxirgi DELIVERY vaqti, apps/load/stop_span.py yangilaydi
+    first_pickup_at = models.DateTimeField(blank=True, null=True, editable=False)
+    last_delivery_at = models.DateTimeField(blank=True, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination on (updated_date, id), alone and behind the list filters
+            models.Index(fields=['updated_date', 'id'], name='load_updated_id_idx'),
+            models.Index(fields=['load_status', 'updated_date', 'id'], name='load_status_updated_idx'),
+            models.Index(fields=['invoice_status', 'updated_date', 'id'], name='load_invoice_updated_idx'),
+            models.Index(fields=['driver', 'updated_date', 'id'], name='load_driver_updated_idx'),
+            models.Index(fields=['dispatcher', 'updated_date', 'id'], name='load_dispatcher_updated_idx'),
+            models.Index(fields=['team_id', 'updated_date', 'id'], name='load_team_updated_idx'),
+            models.Index(fields=['unit_id', 'updated_date', 'id'], name='load_unit_updated_idx'),
+            models.Index(fields=['created_date'], name='load_created_idx'),
+            models.Index(fields=['pickup_date'], name='load_pickup_idx'),
+            models.Index(fields=['delivery_date'], name='load_delivery_idx'),
+            # Amazon relay matching (find_and_update_load) and ?invoice_number= / ?weekly_number=;
+            # partial, most loads have none of these
+            models.Index(fields=['reference_id'], name='load_reference_idx', condition=models.Q(reference_id__isnull=False)),
+            models.Index(fields=['invoice_number'], name='load_invoice_number_idx', condition=models.Q(invoice_number__isnull=False)),
+            models.Index(fields=['weekly_number'], name='load_weekly_number_idx', condition=models.Q(weekly_number__isnull=False)),
+            # /api/load/search/: ranked full-text match, trigram for typos and partial ids
+            GinIndex(fields=['search_vector'], name='load_search_vector_idx'),
+            GinIndex(fields=['search_document'], opclasses=['gin_trgm_ops'], name='load_search_trgm_idx'),
+            # Pay period overlap (payroll: per driver; board/reports: ?first_pickup_*, ?period_*)
+            models.Index(fields=['driver', 'first_pickup_at'], name='load_driver_first_pickup_idx'),
+            models.Index(fields=['driver', 'last_delivery_at'], name='load_driver_last_delivery_idx'),
+            models.Index(fields=['first_pickup_at'], name='load_first_pickup_idx'),
+            models.Index(fields=['last_delivery_at'], name='load_last_delivery_idx'),
+        ]
+
     def get_coordinates(self, address):
         """Manzilni koordinatalarga aylantirish (Nominatim API)"""
         try:
@@ -246,3 +284,20 @@ class Load(models.Model):
             # Xatolik bo'lsa ham saqlashni davom ettiramiz
             super().save(*args, **kwargs)
 
+
+class LoadTombstone(models.Model):
+    """O'chirilgan loadlar izi: changes feed mijozlari o'z nusxasidan ham o'chirishi uchun"""
+    # purge_load_tombstones shundan eskisini o'chiradi; changes feed bundan eski cursorni rad etadi
+    RETENTION = timedelta(days=30)
+
+    load_pk = models.IntegerField()
+    load_id = models.CharField(max_length=200, blank=True, null=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='load_tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deleted load {self.load_pk} ({self.load_id})"
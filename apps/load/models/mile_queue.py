@@ -0,0 +1,19 @@
+from django.db import models
+
+from apps.load.models.load import Load
+
+
+class MileQueue(models.Model):
+    """Bulk yozilgan loadlar uchun mile hisoblash navbati: notify_loads_saved yozadi, mile_worker bajaradi (apps/load/miles.py)"""
+
+    load = models.ForeignKey(Load, on_delete=models.CASCADE, related_name='mile_queue')
+    attempts = models.IntegerField(default=0)
+    locked_at = models.DateTimeField(blank=True, null=True)  # olingan vaqt: qotib qolganlar qayta olinadi
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"MileQueue {self.id} load {self.load_id}"
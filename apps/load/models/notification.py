@@ -0,0 +1,43 @@
+from django.db import models
+from django.utils import timezone
+
+from apps.load.models.load import Load
+
+
+class NotificationOutbox(models.Model):
+    """Load Telegram xabarlari navbati: signal yozadi, telegram_worker yuboradi (apps/load/notifications.py)"""
+
+    KIND_CHOICES = [
+        ('LOAD_CREATED', 'Load created'),
+        ('LOAD_UPDATED', 'Load updated'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENDING', 'Sending'),
+        ('SENT', 'Sent'),
+        ('UNCHANGED', 'Unchanged'),  # matn oxirgi yuborilgani bilan bir xil: tahrir qilinmadi
+        ('SKIPPED', 'Skipped'),
+        ('FAILED', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    load = models.ForeignKey(Load, on_delete=models.CASCADE, related_name='notifications')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)  # SENDING ga o'tgan vaqt: qotib qolganlar qayta olinadi
+    last_error = models.TextField(blank=True, null=True)
+    text_hash = models.CharField(max_length=64, blank=True, null=True)  # yuborilgan matnning sha256 i
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_due_idx'),
+            models.Index(fields=['load', 'status'], name='outbox_load_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"NotificationOutbox {self.id} {self.kind} load {self.load_id} {self.status}"
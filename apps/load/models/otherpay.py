@@ -22,5 +22,6 @@ class OtherPay(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     pay_type = models.CharField(max_length=100, choices=TYPE_CHOICES, blank=True, null=True)
     note = models.CharField(max_length=200, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
 
 
@@ -0,0 +1,41 @@
+from django.db import models
+
+from apps.auth.models import User
+
+
+class PayrollRun(models.Model):
+    """Bitta davr uchun barcha aktiv driverlarga DriverPay hisoblash (apps/load/payroll_run.py)"""
+
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('COMPLETED_WITH_ERRORS', 'Completed with errors'),
+        ('FAILED', 'Failed'),
+    ]
+
+    pay_from = models.DateField()
+    pay_to = models.DateField()
+    notes = models.TextField(blank=True, null=True)
+    invoice_number = models.IntegerField(blank=True, null=True)
+    weekly_number = models.IntegerField(blank=True, null=True)
+    driver_ids = models.JSONField(blank=True, null=True)  # bo'sh bo'lsa barcha aktiv driverlar
+    status = models.CharField(max_length=30, choices=STATUS_CHOICES, default='PENDING')
+    total_count = models.IntegerField(default=0)
+    processed_count = models.IntegerField(default=0)
+    success_count = models.IntegerField(default=0)
+    skipped_count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    results = models.JSONField(blank=True, default=list)  # [{driver, status, driver_pay | detail}]
+    error_log = models.TextField(blank=True, null=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='payroll_runs', blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"PayrollRun {self.id} ({self.pay_from} - {self.pay_to}) {self.status}"
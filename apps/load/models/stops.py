@@ -79,3 +79,10 @@ class Stops(models.Model):
     location = models.CharField(max_length=100, blank=True, null=True)
     fcfs = models.DateTimeField(blank=True, null=True)
     plus_hour = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # PICKUP/DELIVERY stops in a time window (dispatch board, pay periods)
+            models.Index(fields=['stop_name', 'appointmentdate'], name='stops_name_appointment_idx'),
+        ]
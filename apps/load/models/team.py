@@ -7,6 +7,7 @@ class Team(models.Model):
     telegram_token = models.CharField(max_length=255, blank=True, null=True)
     telegram_channel_id = models.CharField(max_length=255, blank=True, null=True)
     telegram_group_id = models.CharField(max_length=255, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
     
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -3,6 +3,7 @@ from django.db import models
 
 class TrailerTags(models.Model):
     tag = models.CharField(max_length=50, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
 
     def __str__(self):
         return self.tag
@@ -62,6 +63,7 @@ class Trailer(models.Model):
     drop_date = models.DateField(blank=True, null=True)
     pickup_date = models.DateField(blank=True, null=True)
     location = models.CharField(max_length=100, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
 
     def __str__(self):
         return f"{self.unit_number}"
@@ -8,6 +8,7 @@ from .team import Team
 from apps.auth.models import User
 class TruckTags(models.Model):
     tag = models.CharField(max_length=40, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
 
 
 class Truck(models.Model):
@@ -125,6 +126,7 @@ class Truck(models.Model):
     mileage_on_pickup = models.IntegerField(blank=True, null=True)
     mileage_on_drop = models.IntegerField(blank=True, null=True)
     comment = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
 
 
 
@@ -139,4 +141,5 @@ class Unit(models.Model):
     team_id = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='unit_team_id', blank=True, null=True)
     trailer = models.ManyToManyField(Trailer, related_name='unit_trailers', blank=True, null=True)
     employee = models.ManyToManyField(Employee, related_name='unit_employees', blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, blank=True, null=True, db_index=True)
     # load = models.ManyToManyField('load.Load', related_name='loads', blank=True, null=True)
\ No newline at end of file
@@ -0,0 +1,332 @@
+"""
+Durable outbox for load Telegram notifications.
+
+The Load signals only insert NotificationOutbox rows, in the same
+transaction as the save, so nothing is sent from the request and nothing is
+lost when a web worker recycles. The telegram_worker command drains the
+outbox with a bounded thread pool:
+
+  claim()    locks due rows with SELECT ... FOR UPDATE SKIP LOCKED (several
+             workers can run side by side), skipping a load while an older
+             notification of it is still open so a load's messages keep
+             their order, and marks them SENDING.
+  process()  delivers one row with apps/load/telegram.py and records the
+             outcome: SENT, UNCHANGED (the edit would repeat the last text),
+             SKIPPED (team without Telegram settings), FAILED (rejected by
+             Telegram, or out of attempts), or back to PENDING with an
+             exponential backoff for network errors, 429 and 5xx. A
+             message held back by the client's rate limits goes back to
+             PENDING for when the limit frees up, without using an attempt.
+
+Edits are debounced: an update of a load that already has a PENDING row
+joins that row (the message is rendered when it is sent, so it carries the
+latest state) and moves it DEBOUNCE_WINDOW later, up to DEBOUNCE_MAX_DELAY
+after it was queued. A burst of saves becomes one editMessageText per chat,
+and none when the rendered text hashes to the last one sent.
+
+With use_asyncio (telegram_worker --asyncio) a claimed batch goes out on
+one event loop instead of a thread pool: the messages are rendered on the
+database thread, every load's channel and group requests are sent
+concurrently over the shared client's httpx pool, and the posted message ids
+are saved in one UPDATE per load.
+
+A row left SENDING by a worker that died is claimed again after
+LOCK_TIMEOUT. queue_depth() reports the queue (telegram_worker --stats).
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, Exists, F, Min, OuterRef, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from apps.load.load_summary import summary_queryset
+from apps.load.models.load import Load
+from apps.load.models.notification import NotificationOutbox
+from apps.load.telegram import (
+    deliver_load_notification, prepare_load_notification, save_message_ids, send_load_notification_async,
+)
+from utils.telegram import TelegramError, TelegramRetry, TelegramThrottled, telegram_client
+
+logger = logging.getLogger(__name__)
+
+
+WORKERS = 4
+BATCH_SIZE = 20
+POLL_INTERVAL = 2.0
+MAX_ATTEMPTS = 6
+RETRY_BASE = timedelta(seconds=15)
+RETRY_MAX = timedelta(minutes=30)
+LOCK_TIMEOUT = timedelta(minutes=5)
+DEBOUNCE_WINDOW = timedelta(seconds=5)
+DEBOUNCE_MAX_DELAY = timedelta(seconds=60)
+RETENTION = timedelta(days=7)
+PURGE_EVERY = 3600  # sekund
+STATS_EVERY = 300  # sekund: Telegram client hisoblagichlari logga
+
+OPEN_STATUSES = ('PENDING', 'SENDING')
+
+
+def enqueue_load_notification(load, created):
+    """Outbox row for a saved Load; written on the caller's connection, so inside its transaction."""
+    if created:
+        NotificationOutbox.objects.create(load=load, kind='LOAD_CREATED')
+    else:
+        enqueue_load_updates([load.pk])
+
+
+def enqueue_load_updates(load_ids):
+    """
+    Queues an edit for each load, unless a PENDING row of the load can carry
+    it: that row is locked until the caller commits (claim() skips locked
+    rows, so it cannot be sent with the state before this change) and an
+    update row is pushed DEBOUNCE_WINDOW later.
+    """
+    load_ids = set(load_ids)
+    if not load_ids:
+        return
+    now = timezone.now()
+    with transaction.atomic():
+        pending = NotificationOutbox.objects.select_for_update().filter(load_id__in=load_ids, status='PENDING')
+        joined = set(pending.values_list('load_id', flat=True))
+        pending.filter(kind='LOAD_UPDATED', created_at__gte=now - DEBOUNCE_MAX_DELAY).update(
+            next_attempt_at=Greatest(F('next_attempt_at'), now + DEBOUNCE_WINDOW), updated_at=now)
+        NotificationOutbox.objects.bulk_create([
+            NotificationOutbox(load_id=load_id, kind='LOAD_UPDATED', next_attempt_at=now + DEBOUNCE_WINDOW)
+            for load_id in sorted(load_ids - joined)
+        ])
+
+
+def enqueue_bulk_notifications(created_ids, updated_ids):
+    """Outbox rows for bulk written loads (no post_save), for those with a team like the signal."""
+    created = set(created_ids)
+    load_ids = set(Load.objects.filter(pk__in=[*created_ids, *updated_ids], team_id__isnull=False).values_list(
+        'pk', flat=True))
+    NotificationOutbox.objects.bulk_create([
+        NotificationOutbox(load_id=load_id, kind='LOAD_CREATED') for load_id in sorted(load_ids & created)
+    ])
+    enqueue_load_updates(load_ids - created)
+
+
+def retry_delay(attempts, retry_after=None):
+    """Exponential backoff after ``attempts`` failed attempts; Telegram's retry_after wins when longer."""
+    # daraja cheklanadi: katta attempts da timedelta to'lib ketmasin
+    delay = min(RETRY_BASE * 2 ** min(max(attempts - 1, 0), 16), RETRY_MAX)
+    if retry_after:
+        delay = max(delay, timedelta(seconds=retry_after))
+    return delay
+
+
+def claim(batch_size=BATCH_SIZE):
+    """Marks up to ``batch_size`` due notifications SENDING and returns their ids, oldest first."""
+    now = timezone.now()
+    older_open = NotificationOutbox.objects.filter(load=OuterRef('load'), pk__lt=OuterRef('pk'),
+                                                   status__in=OPEN_STATUSES)
+    with transaction.atomic():
+        ids = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='PENDING', next_attempt_at__lte=now) | Q(status='SENDING', locked_at__lt=now - LOCK_TIMEOUT))
+            .exclude(Exists(older_open))
+            .order_by('id')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if ids:
+            NotificationOutbox.objects.filter(pk__in=ids).update(
+                status='SENDING', locked_at=now, attempts=F('attempts') + 1, updated_at=now)
+    return ids
+
+
+def _finish(notification, status, error=None, next_attempt_at=None, text_hash=None, attempts=None):
+    now = timezone.now()
+    fields = {'status': status, 'last_error': error, 'locked_at': None, 'text_hash': text_hash, 'updated_at': now}
+    if attempts is not None:
+        fields['attempts'] = attempts
+    if status == 'SENT':
+        fields['sent_at'] = now
+    if next_attempt_at is not None:
+        fields['next_attempt_at'] = next_attempt_at
+    NotificationOutbox.objects.filter(pk=notification.pk).update(**fields)
+    return status
+
+
+def _last_hashes(load_ids):
+    """Text hash of each load's last delivered message (SENT / UNCHANGED)."""
+    hashes = {}
+    for load_id, text_hash in NotificationOutbox.objects.filter(
+            load_id__in=load_ids, status__in=('SENT', 'UNCHANGED'), text_hash__isnull=False,
+    ).order_by('-id').values_list('load_id', 'text_hash'):
+        hashes.setdefault(load_id, text_hash)
+    return hashes
+
+
+def _record(notification, outcome=None, text_hash=None, error=None):
+    """Stores the result of a delivery: its ``outcome``, or the ``error`` it raised."""
+    if isinstance(error, TelegramThrottled):
+        # limit tufayli kechiktirildi: urinish hisoblanmaydi
+        return _finish(notification, 'PENDING', str(error), timezone.now() + timedelta(seconds=error.retry_after),
+                       attempts=notification.attempts - 1)
+    if isinstance(error, TelegramRetry):
+        if notification.attempts >= MAX_ATTEMPTS:
+            return _finish(notification, 'FAILED', f"{error} (after {notification.attempts} attempts)")
+        return _finish(notification, 'PENDING', str(error),
+                       timezone.now() + retry_delay(notification.attempts, error.retry_after))
+    if isinstance(error, TelegramError):
+        return _finish(notification, 'FAILED', str(error))
+    if error is not None:
+        logger.error("Telegram notification %s failed", notification.pk, exc_info=error)
+        return _finish(notification, 'FAILED', str(error) or repr(error))
+    if outcome == 'SKIPPED':
+        return _finish(notification, 'SKIPPED', "No Telegram configuration or no posted message.")
+    return _finish(notification, outcome, text_hash=text_hash)
+
+
+def _claimed(notification_ids):
+    # xabar uchun kerak bo'lgan hamma narsa bir rejadagi querysetda (load_summary)
+    return summary_queryset(NotificationOutbox.objects.filter(pk__in=notification_ids), prefix='load__').order_by('id')
+
+
+def process(notification_id):
+    """Delivers one claimed notification; returns its new status."""
+    try:
+        notification = _claimed([notification_id]).get()
+        last_hash = _last_hashes([notification.load_id]).get(notification.load_id)
+        try:
+            outcome, text_hash = deliver_load_notification(
+                notification.load, notification.kind == 'LOAD_CREATED', last_hash)
+        except Exception as e:
+            return _record(notification, error=e)
+        return _record(notification, outcome, text_hash)
+    finally:
+        # pool ipi: ulanishni keyingi vazifaga qoldirmaslik (PgBouncer)
+        connection.close()
+
+
+def _prepare_batch(notification_ids):
+    """
+    asyncio mode, on the database thread: renders the claimed notifications
+    and records those with nothing to send. Returns (to send, statuses);
+    each to send item is (notification, text hash, message, posted ids).
+    """
+    notifications = list(_claimed(notification_ids))
+    last_hashes = _last_hashes({notification.load_id for notification in notifications})
+    pending, statuses = [], []
+    for notification in notifications:
+        load = notification.load
+        try:
+            outcome, text_hash, message = prepare_load_notification(
+                load, notification.kind == 'LOAD_CREATED', last_hashes.get(load.pk))
+        except Exception as e:
+            statuses.append(_record(notification, error=e))
+            continue
+        if outcome:
+            statuses.append(_record(notification, outcome, text_hash))
+        else:
+            pending.append((notification, text_hash, message, (load.message_id, load.group_message_id)))
+    return pending, statuses
+
+
+def _record_batch(pending, errors):
+    """asyncio mode: saves new message ids (one UPDATE per load) and the outcomes; returns the statuses."""
+    try:
+        statuses = []
+        for (notification, text_hash, message, posted), error in zip(pending, errors):
+            load = notification.load
+            if (load.message_id, load.group_message_id) != posted:
+                save_message_ids(load)
+            statuses.append(_record(notification, 'SENT', text_hash, error))
+        return statuses
+    finally:
+        connection.close()
+
+
+def queue_depth():
+    """Counts by status and the age of the oldest due notification (None when nothing is due)."""
+    counts = dict(NotificationOutbox.objects.values_list('status').annotate(count=Count('id')).order_by())
+    oldest = NotificationOutbox.objects.filter(status='PENDING', next_attempt_at__lte=timezone.now()).aggregate(
+        oldest=Min('created_at'))['oldest']
+    return {
+        'counts': {status: counts.get(status, 0) for status, _ in NotificationOutbox.STATUS_CHOICES},
+        'oldest_due_seconds': (timezone.now() - oldest).total_seconds() if oldest else None,
+    }
+
+
+def purge(older_than=RETENTION):
+    """Deletes delivered / skipped notifications older than ``older_than``; FAILED ones are kept for inspection."""
+    deleted, _ = NotificationOutbox.objects.filter(
+        status__in=('SENT', 'UNCHANGED', 'SKIPPED'), updated_at__lt=timezone.now() - older_than).delete()
+    return deleted
+
+
+def _housekeeping(state):
+    """Purges the outbox and logs the client stats when they are due; ``state`` keeps the last times."""
+    now = time.monotonic()
+    if now - state.setdefault('purge', now - PURGE_EVERY - 1) > PURGE_EVERY:
+        purge()
+        state['purge'] = now
+    if now - state.setdefault('stats', now) > STATS_EVERY:
+        logger.info("Telegram client: %s", telegram_client().stats())
+        state['stats'] = now
+
+
+def _claim_due(batch_size, state):
+    _housekeeping(state)
+    close_old_connections()
+    return claim(batch_size)
+
+
+def run_worker(workers=WORKERS, batch_size=BATCH_SIZE, poll_interval=POLL_INTERVAL, once=False, stop=None,
+               use_asyncio=False):
+    """
+    Drains the outbox until ``stop`` (a threading.Event) is set; with
+    ``once`` returns as soon as nothing is due. Returns the status counts of
+    what it processed.
+
+    By default a claimed batch is delivered by ``workers`` threads, one
+    notification each. With ``use_asyncio`` the whole batch is sent on one
+    event loop (channel and group requests of a load together) and the
+    database work runs on a single thread.
+    """
+    stop = stop or threading.Event()
+    processed = {}
+    if use_asyncio:
+        asyncio.run(_run_asyncio(batch_size, poll_interval, once, stop, processed))
+        return processed
+    state = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='telegram') as pool:
+        while not stop.is_set():
+            ids = _claim_due(batch_size, state)
+            if not ids:
+                if once:
+                    break
+                stop.wait(poll_interval)
+                continue
+            for status in pool.map(process, ids):
+                processed[status] = processed.get(status, 0) + 1
+    return processed
+
+
+async def _run_asyncio(batch_size, poll_interval, once, stop, processed):
+    state = {}
+    async with telegram_client().async_session() as api:
+        while not stop.is_set():
+            # ORM chaqiruvlari sync_to_async orqali bitta thread da
+            ids = await sync_to_async(_claim_due)(batch_size, state)
+            if not ids:
+                if once:
+                    break
+                await asyncio.sleep(poll_interval)
+                continue
+            pending, statuses = await sync_to_async(_prepare_batch)(ids)
+            errors = await asyncio.gather(*(
+                send_load_notification_async(api, notification.load, notification.kind == 'LOAD_CREATED', message)
+                for notification, text_hash, message, posted in pending
+            ), return_exceptions=True)
+            statuses += await sync_to_async(_record_batch)(pending, errors)
+            for status in statuses:
+                processed[status] = processed.get(status, 0) + 1
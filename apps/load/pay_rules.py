@@ -0,0 +1,139 @@
+"""
+Driver pay rules.
+
+pay_rule() compiles a Pay row (pay_type, standart, picks_per, drops_per)
+once into a PayRule: a list of term functions evaluated over RuleInput rows,
+one per load. The compiled rule and its per-load results are cached by the
+Pay row version (pk, updated_at and the configuration itself), so a Pay edit
+starts a fresh rule and nothing has to be invalidated.
+
+  Percentage  load_pay * standart%; DETENTION / LAYOVER other pays too
+  Per Mile    loaded miles (Load.mile) * standart $
+  Hourly      hours from the first PICKUP to the last DELIVERY * standart $
+  picks_per   $ per PICKUP after the first one
+  drops_per   $ per DELIVERY after the first one, intermediate stops included
+
+A Pay without pay_type is a percentage, as settlements have always treated it.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+PERCENTAGE = 'Percentage'
+PER_MILE = 'Per Mile'
+HOURLY = 'Hourly'
+
+# Load.stop dagi nomlar: PICKUP, DELIVERY va oraliq Stop-2 / Stop-3
+PICKUP_STOP_NAMES = ('PICKUP',)
+DROP_STOP_NAMES = ('DELIVERY', 'Stop-2', 'Stop-3')
+
+RULE_CACHE_SIZE = 256
+RESULT_CACHE_SIZE = 4096
+
+# Bitta load bo'yicha qoidaga kerak bo'ladigan hamma narsa (hashable: natija keshi kaliti)
+RuleInput = namedtuple('RuleInput', 'load_pay mile first_pickup_at last_delivery_at pickups drops')
+RuleResult = namedtuple('RuleResult', 'amount formula')
+
+
+def stop_counts(stop_names):
+    """(pickups, drops) of one load's stop names."""
+    pickups = drops = 0
+    for name in stop_names:
+        if name in PICKUP_STOP_NAMES:
+            pickups += 1
+        elif name in DROP_STOP_NAMES:
+            drops += 1
+    return pickups, drops
+
+
+def _hours(row):
+    if row.first_pickup_at is None or row.last_delivery_at is None:
+        return 0.0
+    return max((row.last_delivery_at - row.first_pickup_at).total_seconds(), 0) / 3600
+
+
+def _percentage_term(standart):
+    def term(row):
+        if row.load_pay:
+            # calculate_settlement() dagi float arifmetika, tartibi bilan
+            return float(row.load_pay) * (float(standart) / 100), f"${row.load_pay:.2f} * {standart}%"
+        return None
+    return term
+
+
+def _per_mile_term(rate):
+    def term(row):
+        if row.mile:
+            return row.mile * float(rate), f"{row.mile} mi * ${rate}"
+        return None
+    return term
+
+
+def _hourly_term(rate):
+    def term(row):
+        hours = _hours(row)
+        if hours:
+            return hours * float(rate), f"{hours:.2f} h * ${rate}"
+        return None
+    return term
+
+
+def _extra_stops_term(field, rate, label):
+    def term(row):
+        extra = max(getattr(row, field) - 1, 0)
+        if extra:
+            return extra * float(rate), f"{extra} extra {label} * ${rate}"
+        return None
+    return term
+
+
+class PayRule:
+    """A compiled Pay configuration; call it with a RuleInput."""
+
+    def __init__(self, pay_type, standart, picks_per=None, drops_per=None):
+        self.pay_type = pay_type or PERCENTAGE
+        self.standart = standart
+        # DETENTION / LAYOVER faqat foizli to'lovda standart foiz bilan hisoblanadi
+        self.percent = standart if self.pay_type == PERCENTAGE and standart else None
+        self.terms = []
+        if standart:
+            base = {PERCENTAGE: _percentage_term, PER_MILE: _per_mile_term, HOURLY: _hourly_term}.get(self.pay_type)
+            if base is not None:
+                self.terms.append(base(standart))
+        # stop sonlari faqat shu qoidalar uchun kerak
+        self.needs_stops = bool(picks_per or drops_per)
+        if picks_per:
+            self.terms.append(_extra_stops_term('pickups', picks_per, 'picks'))
+        if drops_per:
+            self.terms.append(_extra_stops_term('drops', drops_per, 'drops'))
+        self._cached = lru_cache(maxsize=RESULT_CACHE_SIZE)(self._evaluate)
+
+    def _evaluate(self, row):
+        amount = 0.0
+        formula = []
+        for term in self.terms:
+            line = term(row)
+            if line is not None:
+                amount += line[0]
+                formula.append(line[1])
+        return RuleResult(amount, tuple(formula))
+
+    def __call__(self, row):
+        return self._cached(row)
+
+    def evaluate(self, rows):
+        """RuleResult of every row, in order."""
+        return [self._cached(row) for row in rows]
+
+
+@lru_cache(maxsize=RULE_CACHE_SIZE)
+def _compile(pay_id, version, pay_type, standart, picks_per, drops_per):
+    return PayRule(pay_type, standart, picks_per, drops_per)
+
+
+def pay_rule(pay):
+    """The compiled rule of a Pay row (also a historical model instance); None gives an empty rule."""
+    if pay is None:
+        return _compile(None, None, None, None, None, None)
+    updated_at = getattr(pay, 'updated_at', None)
+    return _compile(pay.pk, updated_at and updated_at.timestamp(), pay.pay_type, pay.standart,
+                    pay.picks_per, pay.drops_per)
@@ -0,0 +1,467 @@
+"""
+Driver settlement (pay period) engine.
+
+calculate_settlement() reads everything a period needs in a fixed number of
+queries (loads with their first PICKUP / last DELIVERY aggregated in SQL,
+stops and other pays prefetched, expenses) and does no writes. What a load
+pays comes from the driver's compiled Pay rule (apps/load/pay_rules.py).
+create_driver_pay() is the DriverPayCreateView behaviour on top of it;
+preview_settlement() is the cached, read-only variant.
+"""
+import logging
+import uuid
+from datetime import datetime
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.auth.models import Company
+from apps.load.models.driver import DriverExpense, DriverPay, Pay
+from apps.load.models.load import Load
+from apps.load.models.otherpay import OtherPay
+from apps.load.models.stops import Stops
+from apps.load.pay_rules import PER_MILE, RuleInput, pay_rule, stop_counts
+from apps.load.settlement_pdf import queue_settlement_pdf
+from apps.load.stop_span import span_overlaps
+
+logger = logging.getLogger(__name__)
+
+
+# OtherPay turlari: standart foiz bilan qo'shiladigan va ayiriladigan; qolganlari to'g'ridan-to'g'ri qo'shiladi
+PERCENTAGE_PAY_TYPES = ('DETENTION', 'LAYOVER')
+CHARGEBACK_PAY_TYPE = 'CHARGEBACK'
+COMPANY_DRIVER_MILES_RATE = 0.65
+
+# Preview keshi: settings.CACHES['payroll'] (DatabaseCache, barcha workerlar uchun umumiy)
+PREVIEW_CACHE_ALIAS = 'payroll'
+PREVIEW_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Columns the settlement reads. Rows come back as named tuples: building
+# model instances was most of the cost on long periods.
+SETTLEMENT_LOAD_FIELDS = ('id', 'load_id', 'load_pay', 'note', 'mile', 'first_pickup_at', 'last_delivery_at')
+SETTLEMENT_STOP_FIELDS = ('stop_name', 'appointmentdate', 'city', 'state', 'address1')
+SETTLEMENT_OTHER_PAY_FIELDS = ('amount', 'pay_type', 'note')
+SETTLEMENT_EXPENSE_FIELDS = ('id', 'transaction_type', 'description', 'amount', 'expense_date')
+
+
+def latest_pay(driver):
+    """The driver's current Pay terms, or None."""
+    return Pay.objects.filter(driver=driver).order_by('-id').first()
+
+
+def period_loads(driver, pay_from, pay_to):
+    """
+    The driver's loads whose PICKUP..DELIVERY span overlaps the period
+    (both dates inclusive), on the stored first_pickup_at / last_delivery_at.
+    """
+    return Load.objects.filter(
+        driver=driver,
+        first_pickup_at__isnull=False,
+        last_delivery_at__isnull=False,
+    ).filter(span_overlaps(pay_from, pay_to)).order_by('pk')
+
+
+def period_expenses(driver, pay_from, pay_to):
+    return DriverExpense.objects.filter(
+        driver=driver,
+        expense_date__gte=pay_from,
+        expense_date__lte=pay_to
+    ).order_by('pk')
+
+
+def _rows_by_load(queryset, fields):
+    rows = {}
+    for row in queryset.values_list('load_ref', *fields, named=True):
+        rows.setdefault(row.load_ref, []).append(row)
+    return rows
+
+
+def _stop_location(stop):
+    return f"{stop.city}, {stop.state}" if stop.city else stop.address1
+
+
+def _period_stops(stops):
+    # the last PICKUP / DELIVERY stop wins, as it always has
+    pickup_stop = delivery_stop = None
+    for stop in stops:
+        if stop.stop_name == 'PICKUP':
+            pickup_stop = stop
+        elif stop.stop_name == 'DELIVERY':
+            delivery_stop = stop
+    return pickup_stop, delivery_stop
+
+
+def _other_pay_line(other_pay, amount, standart):
+    """(amount added to the load payment, detail dict) for one OtherPay row."""
+    note = other_pay.note if other_pay.note else ''
+    if other_pay.pay_type in PERCENTAGE_PAY_TYPES:
+        # DETENTION va LAYOVER: standart foiz bilan hisoblanadi va qo'shiladi
+        result = amount * (float(standart) / 100) if standart else amount
+        return result, {
+            "pay_type": other_pay.pay_type,
+            "formula": f"${amount:.2f} * {standart}%" if standart else f"${amount:.2f}",
+            "result": f"${result:.2f}",
+            "note": note
+        }
+    if other_pay.pay_type == CHARGEBACK_PAY_TYPE:
+        return -amount, {
+            "pay_type": other_pay.pay_type,
+            "formula": f"-${amount:.2f}",
+            "result": f"-${amount:.2f}",
+            "note": note
+        }
+    return amount, {
+        "pay_type": other_pay.pay_type,
+        "formula": f"${amount:.2f}",
+        "result": f"${amount:.2f}",
+        "note": note
+    }
+
+
+def calculate_settlement(driver, pay, pay_from, pay_to):
+    """
+    The settlement breakdown for one driver and period, without writing
+    anything. Float arithmetic in the same order as it has always been
+    done, so the totals match earlier settlements to the cent.
+    """
+    rule = pay_rule(pay)
+    # OtherPay foizi: faqat Percentage to'lovda
+    standart = rule.percent
+    loads = list(period_loads(driver, pay_from, pay_to).values_list(*SETTLEMENT_LOAD_FIELDS, named=True))
+    load_ids = [load.id for load in loads]
+    # stops through the M2M, as the filter above sees them
+    stops = _rows_by_load(
+        Stops.objects.filter(related_loads__in=load_ids).annotate(load_ref=F('related_loads')).order_by('pk'),
+        SETTLEMENT_STOP_FIELDS)
+    other_pays = _rows_by_load(
+        OtherPay.objects.filter(load__in=load_ids).annotate(load_ref=F('load')).order_by('pk'),
+        SETTLEMENT_OTHER_PAY_FIELDS)
+    expenses = list(period_expenses(driver, pay_from, pay_to).values_list(*SETTLEMENT_EXPENSE_FIELDS, named=True))
+
+    total_load_pays = 0.0
+    total_other_pays = 0.0
+    total_chargebag_amount = 0.0
+    load_details = []
+    chargebag_deductions = []
+    total_loads_formula = []
+    total_other_pays_formula = []
+
+    rule_results = rule.evaluate([
+        RuleInput(load.load_pay, load.mile, load.first_pickup_at, load.last_delivery_at,
+                  *stop_counts(stop.stop_name for stop in stops.get(load.id, ())))
+        for load in loads
+    ])
+    for load, rule_result in zip(loads, rule_results):
+        load_payment = rule_result.amount
+        total_load_pays += load_payment
+        load_formula = list(rule_result.formula)
+
+        load_chargebag_amount = 0.0
+        other_pay_details = []
+        for other_pay in other_pays.get(load.id, ()):
+            if not other_pay.amount:
+                continue
+            amount = float(other_pay.amount)
+            result, info = _other_pay_line(other_pay, amount, standart)
+            load_payment += result
+            if other_pay.pay_type == CHARGEBACK_PAY_TYPE:
+                load_chargebag_amount += amount
+                total_chargebag_amount += amount
+                chargebag_deductions.append({
+                    "load_id": load.load_id,
+                    "amount": f"${amount:.2f}",
+                    "note": info["note"],
+                    "pay_type": other_pay.pay_type
+                })
+            else:
+                total_other_pays += result
+                total_other_pays_formula.append(info["formula"])
+            other_pay_details.append(info)
+
+        pickup_stop, delivery_stop = _period_stops(stops.get(load.id, ()))
+        pickup_info = delivery_info = "N/A"
+        if pickup_stop and pickup_stop.appointmentdate:
+            pickup_info = f"{pickup_stop.appointmentdate.strftime('%Y-%m-%d')}, {_stop_location(pickup_stop)}"
+        if delivery_stop and delivery_stop.appointmentdate:
+            delivery_info = f"{delivery_stop.appointmentdate.strftime('%Y-%m-%d')}, {_stop_location(delivery_stop)}"
+
+        load_info = {
+            "Load #": load.load_id,
+            "Pickup": pickup_info,
+            "Delivery": delivery_info,
+            "Formula": " + ".join(load_formula) if load_formula else "N/A",
+            "Result": f"${load_payment:.2f}",
+            "Notes": load.note if load.note else '',
+            "Chargebag Deduction": f"${load_chargebag_amount:.2f}" if load_chargebag_amount > 0 else None,
+            "Other Payments": other_pay_details if other_pay_details else None
+        }
+        load_details.append(load_info)
+        if load_formula:
+            total_loads_formula.append(f"({load_info['Formula']} = ${load_payment:.2f})")
+
+    escrow_weekly = driver.escrow_deposit if driver.escrow_deposit else 0
+
+    total_expenses = 0.0
+    total_income = 0.0
+    expense_details = []
+    income_formula = []
+    expenses_formula = []
+    for expense in expenses:
+        amount = float(expense.amount)
+        if expense.transaction_type == '+':
+            total_income += amount
+            income_formula.append(f"${amount:.2f}")
+        elif expense.transaction_type == '-':
+            total_expenses += amount
+            expenses_formula.append(f"${amount:.2f}")
+        expense_details.append({
+            "Description": expense.description,
+            "Formula": f"{'+' if expense.transaction_type == '+' else '-'}${amount:.2f}",
+            "Result": f"${amount:.2f}",
+            "Type": "Income" if expense.transaction_type == '+' else "Expense",
+            "Date": expense.expense_date.strftime('%Y-%m-%d') if expense.expense_date else 'N/A'
+        })
+
+    total_pay = total_load_pays + total_other_pays - escrow_weekly - total_expenses + total_income - total_chargebag_amount
+    logger.debug("settlement driver=%s loads=%s other=%s chargeback=%s escrow=%s expenses=%s income=%s total=%s",
+                 driver.pk, total_load_pays, total_other_pays, total_chargebag_amount, escrow_weekly,
+                 total_expenses, total_income, total_pay)
+    total_pay = max(total_pay, 0)
+
+    total_pay_formula = []
+    if total_load_pays > 0:
+        total_pay_formula.append(f"Load Pays: ${total_load_pays:.2f}")
+    if total_other_pays > 0:
+        total_pay_formula.append(f"Other Pays: ${total_other_pays:.2f}")
+    if total_chargebag_amount > 0:
+        total_pay_formula.append(f"Chargeback: -${total_chargebag_amount:.2f}")
+    if escrow_weekly > 0:
+        total_pay_formula.append(f"Escrow: -${escrow_weekly:.2f}")
+    if total_income > 0:
+        total_pay_formula.append(f"Income: ${total_income:.2f}")
+    if total_expenses > 0:
+        total_pay_formula.append(f"Expenses: -${total_expenses:.2f}")
+
+    settlement = {
+        "load_ids": load_ids,
+        "expense_ids": [expense.id for expense in expenses],
+        "amount": total_pay,
+        "escrow": escrow_weekly,
+        "loads": load_details,
+        "total_load_pays": {
+            "Formula": " + ".join(total_loads_formula) if total_loads_formula else "N/A",
+            "Result": f"${total_load_pays:.2f}"
+        },
+        "total_other_pays": {
+            "Formula": " + ".join(total_other_pays_formula) if total_other_pays_formula else "N/A",
+            "Result": f"${total_other_pays:.2f}"
+        },
+        "escrow_deduction": {
+            "Formula": f"-${escrow_weekly:.2f}" if escrow_weekly else "N/A",
+            "Result": f"${escrow_weekly:.2f}"
+        },
+        "chargeback_deductions": chargebag_deductions,
+        "expenses": expense_details,
+        "total_expenses": {
+            "Formula": " + ".join(expenses_formula) if expenses_formula else "N/A",
+            "Result": f"${total_expenses:.2f}"
+        },
+        "total_income": {
+            "Formula": " + ".join(income_formula) if income_formula else "N/A",
+            "Result": f"${total_income:.2f}"
+        },
+        "total_pay": {
+            "Formula": " + ".join(total_pay_formula) if total_pay_formula else "N/A",
+            "Result": f"${total_pay:.2f}"
+        },
+        "company_driver": None,
+    }
+
+    if driver.driver_type == 'COMPANY_DRIVER':
+        settlement["company_driver"] = _company_driver_data(loads, stops, rule)
+    return settlement
+
+
+def _company_driver_data(loads, stops, rule):
+    # Company Driver: yuklangan millar * Per Mile stavkasi (Pay da bo'lmasa $0.65)
+    cd_loads_data = []
+    total_miles = 0
+    for load in loads:
+        loaded_miles = load.mile if load.mile else 0
+        total_miles += loaded_miles
+        pickup_stop, delivery_stop = _period_stops(stops.get(load.id, ()))
+        pickup_location = _stop_location(pickup_stop) if pickup_stop else "N/A"
+        delivery_location = _stop_location(delivery_stop) if delivery_stop else "N/A"
+        cd_loads_data.append({
+            'load_number': load.load_id,
+            'load_id': load.load_id,
+            'loaded_miles': loaded_miles,
+            'pickup_location': pickup_location,
+            'delivery_location': delivery_location,
+            'trip': f"{pickup_location} - {delivery_location}"
+        })
+
+    miles_rate = COMPANY_DRIVER_MILES_RATE
+    if rule.pay_type == PER_MILE and rule.standart:
+        miles_rate = rule.standart
+    company_driver_pay = total_miles * miles_rate
+    return {
+        'loads': cd_loads_data,
+        'total_miles': total_miles,
+        'miles_rate': miles_rate,
+        'total_pay': company_driver_pay,
+        'calculation_summary': {
+            'formula': f"{total_miles} miles × ${miles_rate} = ${company_driver_pay:.2f}",
+            'loads_count': len(cd_loads_data)
+        }
+    }
+
+
+def company_info():
+    company = Company.objects.first()
+    return {
+        "company_name": company.company_name if company else None,
+        "phone": company.phone if company else None,
+        "fax": company.fax if company else None,
+        "state": company.state if company else None,
+        "city": company.city if company else None,
+        "zip": company.zip if company else None,
+        "company_logo": company.company_logo.url if company and company.company_logo else None,
+    }
+
+
+def driver_header(driver, driver_pay):
+    """The "driver" block of the settlement response and PDFs."""
+    user = driver.user
+    return {
+        "first_name": user.first_name if user else None,
+        "last_name": user.last_name if user else None,
+        "contact_number": user.telephone if user else None,
+        "address1": user.address if user else None,
+        "generate_date": driver_pay.created_at.strftime('%Y-%m-%d %H:%M:%S') if driver_pay.created_at else None,
+        "report_date": driver_pay.updated_at.strftime('%Y-%m-%d %H:%M:%S') if driver_pay.updated_at else None,
+        "search_from": driver_pay.pay_from.strftime('%Y-%m-%d') if driver_pay.pay_from else None,
+        "search_to": driver_pay.pay_to.strftime('%Y-%m-%d') if driver_pay.pay_to else None,
+        "company_name": user.company_name if user else None,
+        "invoice_number": driver_pay.invoice_number,
+        "weekly_number": driver_pay.weekly_number,
+    }
+
+
+def settlement_response(driver, driver_pay, settlement, company=None):
+    """The DriverPayCreateView response body for a calculated settlement."""
+    response_data = {
+        "driver": driver_header(driver, driver_pay),
+        "company_info": company if company is not None else company_info(),
+    }
+    for key in ("loads", "total_load_pays", "total_other_pays", "escrow_deduction", "chargeback_deductions",
+                "expenses", "total_expenses", "total_income", "total_pay"):
+        response_data[key] = settlement[key]
+
+    data = settlement["company_driver"]
+    if data is not None:
+        response_data['company_driver_data'] = {
+            'total_miles': data['total_miles'],
+            'miles_rate': f"${data['miles_rate']}",
+            'company_driver_pay': f"${data['total_pay']:.2f}",
+            'loads_detail': data['loads'],
+            'calculation_summary': data['calculation_summary'],
+        }
+    return response_data
+
+
+def create_driver_pay(driver, pay, pay_from, pay_to, notes='', invoice_number=None, weekly_number=None,
+                      render_pdf=True):
+    """
+    Calculates and records a settlement: saves the DriverPay, adds the escrow
+    deposit to driver.cost and stamps invoice_number / weekly_number on the
+    period's loads and expenses, then queues its PDFs unless ``render_pdf``
+    is False. Returns (driver_pay, response body).
+    """
+    with transaction.atomic():
+        settlement = calculate_settlement(driver, pay, pay_from, pay_to)
+        now = datetime.now()
+        driver_pay = DriverPay(
+            driver=driver,
+            pay=pay,
+            pay_from=pay_from,
+            pay_to=pay_to,
+            amount=settlement["amount"],
+            notes=notes,
+            invoice_number=invoice_number,
+            weekly_number=weekly_number,
+            created_at=now,
+            updated_at=now,
+            loads=settlement["loads"],
+        )
+        data = settlement["company_driver"]
+        if data is not None:
+            driver_pay.total_miles = data['total_miles']
+            driver_pay.miles_rate = data['miles_rate']
+            driver_pay.company_driver_pay = data['total_pay']
+            driver_pay.company_driver_data = data
+        driver_pay.save()
+        if render_pdf:
+            queue_settlement_pdf([driver_pay.pk])
+
+        escrow_weekly = settlement["escrow"]
+        if escrow_weekly > 0:
+            driver.cost = (driver.cost or 0) + escrow_weekly
+            driver.save()
+
+        update_fields = {}
+        if invoice_number:
+            update_fields['invoice_number'] = invoice_number
+        if weekly_number:
+            update_fields['weekly_number'] = weekly_number
+        if update_fields:
+            DriverExpense.objects.filter(pk__in=settlement["expense_ids"]).update(**update_fields)
+            # update() auto_now ni chetlab o'tadi, changes feed ko'rishi uchun updated_date qo'lda
+            Load.objects.filter(pk__in=settlement["load_ids"]).update(updated_date=timezone.now(), **update_fields)
+
+    return driver_pay, settlement_response(driver, driver_pay, settlement)
+
+
+def _preview_version_key(driver_id):
+    return f'payroll-preview:version:{driver_id}'
+
+
+def _preview_version(cache, driver_id):
+    # token yo'q bo'lsa (yangi yoki invalidate qilingan) yangisi yaratiladi
+    key = _preview_version_key(driver_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_payroll_preview(driver_ids):
+    """
+    Drops the cached previews of these drivers once the current transaction
+    commits (so a preview can't be re-cached from the uncommitted state).
+    """
+    keys = [_preview_version_key(driver_id) for driver_id in set(driver_ids) if driver_id]
+    if keys:
+        transaction.on_commit(lambda: caches[PREVIEW_CACHE_ALIAS].delete_many(keys))
+
+
+def preview_settlement(driver, pay, pay_from, pay_to):
+    """
+    calculate_settlement(), cached per driver, period and data version.
+    The version token is replaced by invalidate_payroll_preview() whenever
+    one of the driver's loads, stops, other pays or expenses changes; Pay and
+    Driver edits change the key through their updated_at.
+    """
+    cache = caches[PREVIEW_CACHE_ALIAS]
+    key = ':'.join(str(part) for part in (
+        'payroll-preview', driver.pk, pay_from, pay_to, _preview_version(cache, driver.pk),
+        pay.pk, pay.updated_at and pay.updated_at.timestamp(),
+        driver.updated_at and driver.updated_at.timestamp()))
+    settlement = cache.get(key)
+    if settlement is None:
+        settlement = calculate_settlement(driver, pay, pay_from, pay_to)
+        cache.set(key, settlement, PREVIEW_CACHE_TIMEOUT)
+    return settlement
@@ -0,0 +1,204 @@
+"""
+Fleet-wide payroll run: one PayrollRun record, every active driver settled
+with payroll.create_driver_pay() in chunks spread over a process pool.
+
+Each driver is its own transaction, so a failing driver is recorded on the
+run and the rest carry on. Drivers that already have a DriverPay for exactly
+this period are skipped, which makes re-running a run's period safe: only
+the drivers that failed (or were added) are settled.
+
+The API only creates a PENDING run; `run_payroll --worker` executes them.
+claim_payroll_run() locks the oldest PENDING run with SKIP LOCKED (several
+workers can run side by side) and marks it RUNNING. The run's updated_at
+is saved after every chunk, so a RUNNING run that has not moved for
+LOCK_TIMEOUT belongs to a worker that died and is claimed again; it carries
+on with the drivers it has no result for yet.
+
+Workers are spawned (not forked), so this module is imported before Django
+is set up in them and must not import models at module level.
+"""
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+
+ACTIVE_EMPLOYMENT_STATUS = 'ACTIVE (DF)'
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+MAX_CHUNK_SIZE = 25
+LOCK_TIMEOUT = timedelta(minutes=15)  # shuncha vaqt progress bo'lmasa RUNNING run qayta olinadi
+POLL_INTERVAL = 5.0  # sekund
+
+
+def active_driver_ids():
+    from apps.load.models import Driver
+
+    return list(Driver.objects.filter(employment_status=ACTIVE_EMPLOYMENT_STATUS)
+                .order_by('pk').values_list('pk', flat=True))
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def settle_drivers(driver_ids, pay_from, pay_to, notes='', invoice_number=None, weekly_number=None):
+    """Settles each driver on its own; returns one result dict per driver, never raises for a driver."""
+    from django.db import close_old_connections
+
+    from apps.load.models import Driver
+    from apps.load.models.driver import DriverPay
+    from apps.load.payroll import create_driver_pay, latest_pay
+
+    close_old_connections()
+    drivers = Driver.objects.select_related('user').in_bulk(driver_ids)
+    settled = set(DriverPay.objects.filter(driver_id__in=driver_ids, pay_from=pay_from, pay_to=pay_to)
+                  .values_list('driver_id', flat=True))
+    results = []
+    for driver_id in driver_ids:
+        driver = drivers.get(driver_id)
+        if driver is None:
+            results.append({'driver': driver_id, 'status': 'error', 'detail': "Driver not found."})
+            continue
+        if driver_id in settled:
+            results.append({'driver': driver_id, 'status': 'skipped', 'detail': "Already settled for this period."})
+            continue
+        try:
+            pay = latest_pay(driver)
+            if pay is None:
+                results.append({'driver': driver_id, 'status': 'skipped', 'detail': "No Pay found for this driver."})
+                continue
+            # PDF lar partiya bilan navbatga qo'yiladi (_record)
+            driver_pay, _ = create_driver_pay(
+                driver, pay, pay_from, pay_to, notes=notes,
+                invoice_number=invoice_number, weekly_number=weekly_number, render_pdf=False)
+            results.append({'driver': driver_id, 'status': 'ok', 'driver_pay': driver_pay.pk,
+                            'amount': driver_pay.amount})
+        except Exception as e:
+            logger.exception("Payroll: driver %s settlement failed", driver_id)
+            results.append({'driver': driver_id, 'status': 'error', 'detail': str(e)})
+    return results
+
+
+def _chunks(driver_ids, workers, chunk_size=None):
+    if not chunk_size:
+        # ishchilar band bo'lib tursin, lekin progress tez-tez yangilansin
+        chunk_size = min(MAX_CHUNK_SIZE, max(1, math.ceil(len(driver_ids) / (max(workers, 1) * 4))))
+    return [driver_ids[index:index + chunk_size] for index in range(0, len(driver_ids), chunk_size)]
+
+
+def _record(run, results):
+    from apps.load.settlement_pdf import queue_settlement_pdf
+
+    counters = {'ok': 'success_count', 'skipped': 'skipped_count', 'error': 'error_count'}
+    errors = []
+    for result in results:
+        field = counters[result['status']]
+        setattr(run, field, getattr(run, field) + 1)
+        if result['status'] == 'error':
+            errors.append(f"Driver {result['driver']}: {result['detail']}")
+    run.processed_count += len(results)
+    run.results = run.results + results
+    if errors:
+        run.error_log = '\n'.join(filter(None, [run.error_log] + errors))
+    run.save(update_fields=['processed_count', 'success_count', 'skipped_count', 'error_count',
+                            'results', 'error_log', 'updated_at'])
+    queue_settlement_pdf([result['driver_pay'] for result in results if result['status'] == 'ok'])
+
+
+def claim_payroll_run():
+    """Marks the oldest PENDING run (or a RUNNING one stalled for LOCK_TIMEOUT) RUNNING; returns its id or None."""
+    from django.db import transaction
+    from django.db.models import Q
+    from django.utils import timezone
+
+    from apps.load.models import PayrollRun
+
+    now = timezone.now()
+    with transaction.atomic():
+        run_id = (PayrollRun.objects.select_for_update(skip_locked=True)
+                  .filter(Q(status='PENDING') | Q(status='RUNNING', updated_at__lt=now - LOCK_TIMEOUT))
+                  .order_by('id').values_list('pk', flat=True).first())
+        if run_id is not None:
+            # updated_at: boshqa ishchi LOCK_TIMEOUT gacha bu runni olmaydi
+            PayrollRun.objects.filter(pk=run_id).update(status='RUNNING', updated_at=now)
+    return run_id
+
+
+def execute_payroll_run(run_id, workers=DEFAULT_WORKERS, chunk_size=None):
+    """
+    Settles the run's drivers (every active driver when it names none) for
+    its period and records progress on the run after every chunk. Drivers
+    that already have a result on the run are not settled again.
+    ``workers=0`` runs the chunks in this process.
+    """
+    from django.conf import settings
+    from django.utils import timezone
+
+    from apps.load.models import PayrollRun
+
+    run = PayrollRun.objects.get(pk=run_id)
+    try:
+        driver_ids = run.driver_ids if run.driver_ids is not None else active_driver_ids()
+        run.status = 'RUNNING'
+        run.started_at = run.started_at or timezone.now()
+        run.total_count = len(driver_ids)
+        run.save(update_fields=['status', 'started_at', 'total_count', 'updated_at'])
+
+        # qayta olingan run: natijasi yozilgan driverlar o'tkazib yuboriladi
+        recorded = {result['driver'] for result in run.results}
+        driver_ids = [driver_id for driver_id in driver_ids if driver_id not in recorded]
+        args = (run.pay_from, run.pay_to, run.notes or '', run.invoice_number, run.weekly_number)
+        chunks = _chunks(driver_ids, workers, chunk_size)
+        if workers == 0:
+            for chunk in chunks:
+                _record(run, settle_drivers(chunk, *args))
+        elif chunks:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(chunks)), mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker, initargs=(settings.SETTINGS_MODULE,),
+            ) as pool:
+                futures = {pool.submit(settle_drivers, chunk, *args): chunk for chunk in chunks}
+                for future in as_completed(futures):
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        # ishchi jarayon yiqildi (BrokenProcessPool va h.k.): chunk xato deb yoziladi
+                        logger.exception("Payroll run %s: chunk failed", run_id)
+                        results = [{'driver': driver_id, 'status': 'error', 'detail': str(e) or repr(e)}
+                                   for driver_id in futures[future]]
+                    _record(run, results)
+
+        run.status = 'COMPLETED_WITH_ERRORS' if run.error_count else 'COMPLETED'
+    except Exception as e:
+        logger.exception("Payroll run %s failed", run_id)
+        run.status = 'FAILED'
+        run.error_log = '\n'.join(filter(None, [run.error_log, f"Payroll run failed: {e}"]))
+    run.finished_at = timezone.now()
+    run.save(update_fields=['status', 'error_log', 'finished_at', 'updated_at'])
+    return run
+
+
+def run_worker(workers=DEFAULT_WORKERS, chunk_size=None, poll_interval=POLL_INTERVAL, once=False, stop=None):
+    """Executes claimed runs one after another until ``stop`` is set (or, with ``once``, none is left); returns them."""
+    from django.db import close_old_connections
+
+    stop = stop or threading.Event()
+    runs = []
+    while not stop.is_set():
+        close_old_connections()
+        run_id = claim_payroll_run()
+        if run_id is None:
+            if once:
+                break
+            stop.wait(poll_interval)
+            continue
+        logger.info("Payroll run %s claimed", run_id)
+        runs.append(execute_payroll_run(run_id, workers=workers, chunk_size=chunk_size))
+    return runs
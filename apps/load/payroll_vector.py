@@ -0,0 +1,198 @@
+"""
+Vectorized, cent-exact settlement totals.
+
+The period's loads, other pays and expenses are read into int64 arrays of
+cents (Decimal columns converted in SQL, float columns through their decimal
+repr) and every line is computed in one numpy pass, in integer units of
+1/RATE_SCALE cent: percentages are applied as integer rates, and the Per
+Mile, Hourly and per-stop Pay rules (apps/load/pay_rules.py) are evaluated
+per load. Nothing is lost to binary floats. Formula strings and per-load
+details are only built when asked for.
+
+Rounding is ROUND_HALF_UP, and where it happens is explicit:
+
+  round_lines=False (default)  each total is the exact sum of its lines,
+      rounded once. This is what calculate_settlement() computes, so the
+      totals agree with it, except when a total is exactly on a half cent:
+      there the float loop rounds by the binary value (30% of $10.25 is
+      $3.07 there, $3.08 here). A load's line in load_details() likewise.
+  round_lines=True  every line is rounded to the cent first and the totals
+      are sums of what the statement shows. A total can then differ from
+      calculate_settlement() by up to half a cent per line; do not compare
+      it with settled DriverPay amounts.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+from django.db.models import BigIntegerField, F
+from django.db.models.functions import Cast
+
+from apps.load.models.otherpay import OtherPay
+from apps.load.models.load import Load
+from apps.load.models.stops import Stops
+from apps.load.pay_rules import PERCENTAGE, RuleInput, pay_rule, stop_counts
+from apps.load.payroll import (
+    CHARGEBACK_PAY_TYPE, PERCENTAGE_PAY_TYPES, _period_stops, _stop_location, period_expenses, period_loads,
+)
+
+
+# standart foizi 0.0001% aniqlikda butun son sifatida: 30% -> 300000
+RATE_UNITS = 10_000
+# qatorlar sentning 1/RATE_SCALE ulushlarida: cents * rate aniq butun son
+RATE_SCALE = 100 * RATE_UNITS
+CENT = Decimal('0.01')
+
+
+def _cents(value):
+    """Cents of a float / Decimal through its decimal repr (0.1 -> 10, not 9)."""
+    return int((Decimal(str(value)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP)) if value else 0
+
+
+def _units(value):
+    """A float / Decimal amount in 1/RATE_SCALE cents, through its decimal repr."""
+    return int((Decimal(str(value)) * 100 * RATE_SCALE).quantize(Decimal(1), rounding=ROUND_HALF_UP)) if value else 0
+
+
+def _rate(standart):
+    return int((Decimal(str(standart)) * RATE_UNITS).quantize(Decimal(1), rounding=ROUND_HALF_UP)) if standart else 0
+
+
+def _round_cents(units):
+    # units / RATE_SCALE, ROUND_HALF_UP (noldan uzoqqa), butun sonlarda; massiv yoki bitta son
+    return np.sign(units) * ((np.abs(units) * 2 + RATE_SCALE) // (2 * RATE_SCALE))
+
+
+def _money(cents):
+    return (Decimal(int(cents)) / 100).quantize(CENT)
+
+
+class VectorSettlement:
+    """
+    Totals of one driver's period; amounts are Decimal, line arrays are in
+    1/RATE_SCALE cents. ``round_lines`` rounds every line to the cent
+    before the totals (see the module docstring). ``load_details()`` and
+    ``formulas()`` build the strings on demand.
+    """
+
+    def __init__(self, driver, pay, pay_from, pay_to, round_lines=False):
+        self.driver, self.pay, self.pay_from, self.pay_to = driver, pay, pay_from, pay_to
+        self.round_lines = round_lines
+        self.rule = pay_rule(pay)
+        self.rate = _rate(self.rule.percent)
+
+        loads = list(period_loads(driver, pay_from, pay_to).annotate(
+            load_pay_cents=Cast(F('load_pay') * 100, BigIntegerField())
+        ).values_list('id', 'load_id', 'load_pay_cents', 'note', 'load_pay', 'mile',
+                      'first_pickup_at', 'last_delivery_at'))
+        self.load_ids = np.array([row[0] for row in loads], dtype=np.int64)
+        self._load_rows = loads
+        self._rule_results = None
+        load_pay = np.array([row[2] or 0 for row in loads], dtype=np.int64)
+
+        other_pays = list(OtherPay.objects.filter(load__in=self.load_ids.tolist()).exclude(amount=0).exclude(
+            amount__isnull=True
+        ).annotate(amount_cents=Cast(F('amount') * 100, BigIntegerField())).order_by('pk').values_list(
+            'load_id', 'pay_type', 'amount_cents', 'note'))
+        self._other_pay_rows = other_pays
+        other_load = np.searchsorted(self.load_ids, np.array([row[0] for row in other_pays], dtype=np.int64))
+        other_amount = np.array([row[2] for row in other_pays], dtype=np.int64)
+        pay_types = np.array([row[1] or '' for row in other_pays], dtype=object)
+        percentage = np.isin(pay_types, PERCENTAGE_PAY_TYPES)
+        self.chargeback_mask = pay_types == CHARGEBACK_PAY_TYPE
+
+        # bitta o'tishda barcha qatorlar
+        if self.rule.pay_type == PERCENTAGE and not self.rule.needs_stops:
+            self.base = load_pay * self.rate if self.rate else np.zeros_like(load_pay)
+        else:
+            self.base = np.array([_units(result.amount) for result in self.rule_results()], dtype=np.int64)
+        self.other = np.where(percentage & bool(self.rate), other_amount * self.rate, other_amount * RATE_SCALE)
+        self.other = np.where(self.chargeback_mask, -other_amount * RATE_SCALE, self.other)
+        if round_lines:
+            self.base = _round_cents(self.base) * RATE_SCALE
+            self.other = _round_cents(self.other) * RATE_SCALE
+        self.per_load = self.base.copy()
+        np.add.at(self.per_load, other_load, self.other)
+
+        expenses = list(period_expenses(driver, pay_from, pay_to).values_list('transaction_type', 'amount'))
+        kinds = np.array([row[0] for row in expenses], dtype=object)
+        expense_cents = np.array([_cents(row[1]) for row in expenses], dtype=np.int64)
+
+        load_pays = int(self.base.sum())
+        other_pays = int(self.other[~self.chargeback_mask].sum())
+        self.load_pays_cents = int(_round_cents(load_pays))
+        self.other_pays_cents = int(_round_cents(other_pays))
+        self.chargebacks_cents = int(-self.other[self.chargeback_mask].sum()) // RATE_SCALE
+        self.expenses_cents = int(expense_cents[kinds == '-'].sum())
+        self.income_cents = int(expense_cents[kinds == '+'].sum())
+        self.escrow_cents = _cents(driver.escrow_deposit)
+        # jami ham aniq qiymatdan bir marta yaxlitlanadi
+        self.total_pay_cents = max(int(_round_cents(
+            load_pays + other_pays + (self.income_cents - self.escrow_cents - self.expenses_cents
+                                      - self.chargebacks_cents) * RATE_SCALE)), 0)
+
+    def rule_results(self):
+        """The Pay rule's RuleResult per load (stop names are read only for per-stop rules)."""
+        if self._rule_results is None:
+            names = {}
+            if self.rule.needs_stops:
+                through = Load.stop.through
+                for load_id, stop_name in (through.objects.filter(load_id__in=self.load_ids.tolist())
+                                           .values_list('load_id', 'stops__stop_name')):
+                    names.setdefault(load_id, []).append(stop_name)
+            self._rule_results = self.rule.evaluate([
+                RuleInput(row[4], row[5], row[6], row[7], *stop_counts(names.get(row[0], ())))
+                for row in self._load_rows
+            ])
+        return self._rule_results
+
+    def totals(self):
+        return {
+            'loads': len(self.load_ids),
+            'total_load_pays': _money(self.load_pays_cents),
+            'total_other_pays': _money(self.other_pays_cents),
+            'total_chargebacks': _money(self.chargebacks_cents),
+            'escrow': _money(self.escrow_cents),
+            'total_expenses': _money(self.expenses_cents),
+            'total_income': _money(self.income_cents),
+            'total_pay': _money(self.total_pay_cents),
+        }
+
+    def formulas(self):
+        """The calculate_settlement() style formula strings of the totals."""
+        standart = self.rule.percent
+        loads = [f"({' + '.join(result.formula)} = ${_money(_round_cents(self.per_load[index]))})"
+                 for index, result in enumerate(self.rule_results()) if result.formula]
+        other = [f"${_money(row[2])} * {standart}%" if row[1] in PERCENTAGE_PAY_TYPES and self.rate
+                 else f"${_money(row[2])}"
+                 for row in self._other_pay_rows if row[1] != CHARGEBACK_PAY_TYPE]
+        parts = [(self.load_pays_cents, "Load Pays: ${}"), (self.other_pays_cents, "Other Pays: ${}"),
+                 (self.chargebacks_cents, "Chargeback: -${}"), (self.escrow_cents, "Escrow: -${}"),
+                 (self.income_cents, "Income: ${}"), (self.expenses_cents, "Expenses: -${}")]
+        return {
+            'total_load_pays': " + ".join(loads) or "N/A",
+            'total_other_pays': " + ".join(other) or "N/A",
+            'total_pay': " + ".join(text.format(_money(cents)) for cents, text in parts if cents > 0) or "N/A",
+        }
+
+    def load_details(self):
+        """Per-load lines with pickup / delivery; reads the stops only now."""
+        stops = {}
+        for stop in (Stops.objects.filter(related_loads__in=self.load_ids.tolist())
+                     .annotate(load_ref=F('related_loads')).order_by('pk')
+                     .values_list('load_ref', 'stop_name', 'appointmentdate', 'city', 'state', 'address1', named=True)):
+            stops.setdefault(stop.load_ref, []).append(stop)
+        details = []
+        rule_results = self.rule_results()
+        for index, (load_pk, load_id, load_pay, note, *_) in enumerate(self._load_rows):
+            pickup_stop, delivery_stop = _period_stops(stops.get(load_pk, ()))
+            details.append({
+                "Load #": load_id,
+                "Pickup": f"{pickup_stop.appointmentdate:%Y-%m-%d}, {_stop_location(pickup_stop)}"
+                          if pickup_stop and pickup_stop.appointmentdate else "N/A",
+                "Delivery": f"{delivery_stop.appointmentdate:%Y-%m-%d}, {_stop_location(delivery_stop)}"
+                            if delivery_stop and delivery_stop.appointmentdate else "N/A",
+                "Formula": " + ".join(rule_results[index].formula) or "N/A",
+                "Result": f"${_money(_round_cents(self.per_load[index]))}",
+                "Notes": note or '',
+            })
+        return details
@@ -0,0 +1,67 @@
+from django.db import connections
+
+
+# Qidiruv matni: load_id/reference_id (A), kompaniya nomlari (B), joylar (C).
+# 'simple' konfiguratsiya: id va nomlar stemming qilinmaydi
+SEARCH_CONFIG = 'simple'
+
+
+def _join(values):
+    return ' '.join(str(value).strip() for value in values if value)
+
+
+def _stops(load):
+    # eski yozuvlar M2M (stop) orqali, yangilari FK (stops) orqali bog'langan
+    stops = {stop.pk: stop for stop in load.stop.all()}
+    stops.update((stop.pk, stop) for stop in load.stops.all())
+    return stops.values()
+
+
+def search_parts(load):
+    """(A, B, C) weighted text of one load, with customer_broker and stops already loaded."""
+    stops = list(_stops(load))
+    broker = load.customer_broker
+    return (
+        _join([load.load_id, load.reference_id] + [stop.reference_id for stop in stops]),
+        _join([load.company_name, broker.company_name if broker else None] + [stop.company_name for stop in stops]),
+        _join([load.pickup_location, load.delivery_location]
+              + [part for stop in stops for part in (stop.city, stop.state)]),
+    )
+
+
+def _write_batch(model, connection, rows):
+    # One UPDATE ... FROM (VALUES ...) per batch: bulk_update() with a
+    # SearchVector per row spends more time compiling expressions than writing.
+    table = connection.ops.quote_name(model._meta.db_table)
+    vector = ' || '.join(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', v.{part}), '{part.upper()}')" for part in ('a', 'b', 'c'))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} AS l SET search_document = v.document, search_vector = {vector} '
+            f'FROM (VALUES {", ".join(["(%s, %s, %s, %s, %s)"] * len(rows))}) AS v(id, a, b, c, document) '
+            'WHERE l.id = v.id',
+            [value for row in rows for value in row],
+        )
+
+
+def index_loads(queryset, batch_size=500):
+    """Rebuilds search_document and search_vector for every load in ``queryset``."""
+    queryset = queryset.select_related('customer_broker').prefetch_related('stop', 'stops').order_by('pk')
+    connection = connections[queryset.db]
+    batch = []
+    for load in queryset.iterator(chunk_size=batch_size):
+        a, b, c = search_parts(load)
+        batch.append((load.pk, a, b, c, _join([a, b, c]).lower()))
+        if len(batch) == batch_size:
+            _write_batch(queryset.model, connection, batch)
+            batch = []
+    if batch:
+        _write_batch(queryset.model, connection, batch)
+
+
+def refresh_search_index(load_ids):
+    from apps.load.models.load import Load
+
+    load_ids = [load_id for load_id in load_ids if load_id]
+    if load_ids:
+        index_loads(Load.objects.filter(pk__in=load_ids))
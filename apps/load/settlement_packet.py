@@ -0,0 +1,106 @@
+"""
+Weekly settlement packet: the settlement PDFs of many DriverPays in one
+document with a table of contents.
+
+Each DriverPay is rendered by a spawned worker process to files in a
+temporary directory (its stored PDFs are copied if settlement_pdf already
+made them READY); the parent appends the parts in order to a
+utils/pdf_packet.PdfPacketWriter that streams them to the sink, deleting
+each part once written. Memory therefore stays at one part per process
+whatever the number of drivers.
+
+Like apps/load/payroll_run.py, this module is imported by spawned workers
+before Django is set up: no model imports at module level.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from apps.load.payroll_run import DEFAULT_WORKERS, _init_worker
+from utils.pdf_packet import PdfPacketWriter
+
+
+PACKET_WORKERS = DEFAULT_WORKERS
+PACKET_CHUNK_SIZE = 4
+
+
+def period_driver_pays(pay_from, pay_to):
+    """The DriverPays of exactly this period, in packet order (driver name)."""
+    from apps.load.models.driver import DriverPay
+
+    return DriverPay.objects.filter(driver__isnull=False, pay_from=pay_from, pay_to=pay_to).order_by(
+        'driver__user__last_name', 'driver__user__first_name', 'pk')
+
+
+def _copy_stored(field_file, path):
+    with field_file.open('rb') as source, open(path, 'wb') as target:
+        shutil.copyfileobj(source, target)
+    return path
+
+
+def _write_buffer(buffer, path):
+    with open(path, 'wb') as target:
+        shutil.copyfileobj(buffer, target)
+    return path
+
+
+def render_packet_part(driver_pay_id, directory):
+    """Worker: one DriverPay's PDFs as files in ``directory``; returns (title, note, paths)."""
+    from django.db import close_old_connections
+
+    from apps.load.models.driver import DriverPay
+    from apps.load.settlement_pdf import render_settlement
+
+    close_old_connections()
+    driver_pay = DriverPay.objects.select_related('driver__user').get(pk=driver_pay_id)
+    base = os.path.join(directory, str(driver_pay.pk))
+    if driver_pay.pdf_status == 'READY' and driver_pay.file:
+        paths = [_copy_stored(driver_pay.file, f'{base}.pdf')]
+        if driver_pay.cd_file:
+            paths.append(_copy_stored(driver_pay.cd_file, f'{base}_cd.pdf'))
+    else:
+        buffer, cd_buffer = render_settlement(driver_pay)
+        paths = [_write_buffer(buffer, f'{base}.pdf')]
+        if cd_buffer is not None:
+            paths.append(_write_buffer(cd_buffer, f'{base}_cd.pdf'))
+
+    user = driver_pay.driver.user
+    title = f"{user.first_name or ''} {user.last_name or ''}".strip() or f"Driver {driver_pay.driver_id}"
+    note = f"{driver_pay.pay_from} - {driver_pay.pay_to}, ${driver_pay.amount or 0:.2f}"
+    return title, note, paths
+
+
+def build_settlement_packet(driver_pay_ids, sink, workers=PACKET_WORKERS, title="Driver Settlements"):
+    """
+    Writes the packet of ``driver_pay_ids`` (in that order) to the binary
+    file-like ``sink``; ``workers=0`` renders in this process. Returns the
+    page count.
+    """
+    from django.conf import settings
+
+    driver_pay_ids = list(driver_pay_ids)
+    with tempfile.TemporaryDirectory(prefix='settlement-packet-') as directory:
+        packet = PdfPacketWriter(sink, title=title, entry_label='Driver')
+        if workers == 0 or not driver_pay_ids:
+            for driver_pay_id in driver_pay_ids:
+                _append(packet, render_packet_part(driver_pay_id, directory))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(driver_pay_ids)), mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker, initargs=(settings.SETTINGS_MODULE,),
+            ) as pool:
+                # map() natijalarni tartib bilan beradi; ishchilar oldinda render qilib turadi
+                for part in pool.map(render_packet_part, driver_pay_ids, repeat(directory),
+                                     chunksize=PACKET_CHUNK_SIZE):
+                    _append(packet, part)
+        return packet.close()
+
+
+def _append(packet, part):
+    title, note, paths = part
+    packet.add_part(paths, title, note)
+    for path in paths:
+        os.remove(path)
@@ -0,0 +1,135 @@
+"""
+Settlement PDFs (DriverPay.file and, for company drivers, cd_file) rendered
+in the background.
+
+queue_settlement_pdf() only marks the DriverPays PENDING, so the API worker
+never renders (reportlab is pure Python and would hold its GIL).
+`render_settlement_pdfs --worker` renders them: claim_settlement_pdfs()
+locks PENDING DriverPays with SELECT ... FOR UPDATE SKIP LOCKED (several
+workers can run side by side) and moves them to RENDERING; a RENDERING one
+untouched for LOCK_TIMEOUT belongs to a worker that died and is claimed
+again. render_settlement_pdf() renders a claimed DriverPay from the stored
+settlement (loads, amount, company driver data) with utils/pdf_generator.py
+and saves the files into the default storage; the status ends READY or
+FAILED with the error.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.load.models.driver import DriverPay
+
+logger = logging.getLogger(__name__)
+
+
+BATCH_SIZE = 10
+POLL_INTERVAL = 2.0  # sekund
+LOCK_TIMEOUT = timedelta(minutes=10)  # shuncha vaqt RENDERING da qolgan PDF qayta olinadi
+
+
+def queue_settlement_pdf(driver_pay_ids):
+    """Marks the DriverPays PENDING for the render worker."""
+    driver_pay_ids = [driver_pay_id for driver_pay_id in driver_pay_ids if driver_pay_id]
+    if not driver_pay_ids:
+        return
+    # update() auto_now ni chetlab o'tadi: ETag bilan kuzatayotganlar holatni ko'rishi uchun updated_at qo'lda
+    DriverPay.objects.filter(pk__in=driver_pay_ids).exclude(pdf_status='RENDERING').update(
+        pdf_status='PENDING', pdf_error=None, updated_at=timezone.now())
+
+
+def claim_settlement_pdfs(batch_size=BATCH_SIZE, driver_pay_ids=None):
+    """Moves up to ``batch_size`` PENDING (or stalled RENDERING) DriverPays to RENDERING; returns their ids."""
+    now = timezone.now()
+    driver_pays = DriverPay.objects.filter(
+        Q(pdf_status='PENDING') | Q(pdf_status='RENDERING', updated_at__lt=now - LOCK_TIMEOUT))
+    if driver_pay_ids is not None:
+        driver_pays = driver_pays.filter(pk__in=driver_pay_ids)
+    with transaction.atomic():
+        ids = list(driver_pays.select_for_update(skip_locked=True).order_by('id')
+                   .values_list('pk', flat=True)[:batch_size])
+        if ids:
+            # updated_at: boshqa ishchi LOCK_TIMEOUT gacha bularni olmaydi
+            DriverPay.objects.filter(pk__in=ids).update(pdf_status='RENDERING', pdf_error=None, updated_at=now)
+    return ids
+
+
+def report_data(driver_pay):
+    """The settlement response fields the PDFs read, rebuilt from the stored DriverPay."""
+    from apps.load.payroll import driver_header
+
+    driver = driver_pay.driver
+    escrow = driver.escrow_deposit if driver.escrow_deposit else 0
+    return {
+        "driver": driver_header(driver, driver_pay),
+        "loads": driver_pay.loads or [],
+        "escrow_deduction": {
+            "Formula": f"-${escrow:.2f}" if escrow else "N/A",
+            "Result": f"${escrow:.2f}",
+        },
+        "total_pay": {"Result": f"${driver_pay.amount or 0:.2f}"},
+    }
+
+
+def render_settlement(driver_pay):
+    """(driver pay PDF, company driver PDF or None) buffers of a stored DriverPay."""
+    from apps.load.payroll import company_info
+    from utils.pdf_generator import generate_company_driver_pdf, generate_driver_pay_pdf
+
+    data = report_data(driver_pay)
+    company = company_info()
+    buffer = generate_driver_pay_pdf(data, driver_pay.driver, company)
+    cd_buffer = None
+    if driver_pay.company_driver_data:
+        cd_data = driver_pay.company_driver_data
+        cd_buffer = generate_company_driver_pdf(data, driver_pay.driver, cd_data.get('loads', []), company,
+                                                miles_rate=cd_data.get('miles_rate') or 0.65)
+    return buffer, cd_buffer
+
+
+def _store(field_file, name, buffer):
+    # qayta yaratishda eski fayl almashtiriladi; File() storage ga bo'laklab yoziladi
+    if field_file:
+        field_file.delete(save=False)
+    field_file.save(name, File(buffer), save=False)
+
+
+def render_settlement_pdf(driver_pay_id):
+    """Renders one claimed DriverPay's PDFs; returns the final status ('READY' / 'FAILED')."""
+    try:
+        driver_pay = DriverPay.objects.select_related('driver__user').get(pk=driver_pay_id)
+        buffer, cd_buffer = render_settlement(driver_pay)
+        _store(driver_pay.file, f"driver_pay_{driver_pay.pk}.pdf", buffer)
+        if cd_buffer is not None:
+            _store(driver_pay.cd_file, f"driver_pay_{driver_pay.pk}_cd.pdf", cd_buffer)
+        driver_pay.pdf_status = 'READY'
+        driver_pay.pdf_rendered_at = timezone.now()
+        driver_pay.save(update_fields=['file', 'cd_file', 'pdf_status', 'pdf_rendered_at', 'updated_at'])
+        return 'READY'
+    except Exception as e:
+        logger.exception("Settlement PDF: DriverPay %s failed", driver_pay_id)
+        DriverPay.objects.filter(pk=driver_pay_id).update(
+            pdf_status='FAILED', pdf_error=str(e) or repr(e), updated_at=timezone.now())
+        return 'FAILED'
+
+
+def run_worker(batch_size=BATCH_SIZE, poll_interval=POLL_INTERVAL, once=False, stop=None, driver_pay_ids=None):
+    """Renders claimed DriverPays until ``stop`` is set (or, with ``once``, none is left); returns the status counts."""
+    stop = stop or threading.Event()
+    processed = {}
+    while not stop.is_set():
+        close_old_connections()
+        ids = claim_settlement_pdfs(batch_size, driver_pay_ids)
+        if not ids:
+            if once:
+                break
+            stop.wait(poll_interval)
+            continue
+        for driver_pay_id in ids:
+            result = render_settlement_pdf(driver_pay_id)
+            processed[result] = processed.get(result, 0) + 1
+    return processed
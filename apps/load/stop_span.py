@@ -0,0 +1,61 @@
+from datetime import datetime, time, timedelta
+
+from django.db import connections
+from django.db.models import Max, Min, OuterRef, Q, Subquery
+from django.utils import timezone
+
+
+def _span(load_model, aggregate, stop_name):
+    # stops through the M2M (Load.stop), as payroll has always read them
+    through = load_model._meta.get_field('stop').remote_field.through
+    return Subquery(
+        through.objects.filter(load_id=OuterRef('pk'), stops__stop_name=stop_name)
+        .values('load_id').annotate(value=aggregate('stops__appointmentdate')).values('value')[:1]
+    )
+
+
+def stop_span_fields(load_model):
+    """update() kwargs recomputing first_pickup_at / last_delivery_at from the stops."""
+    return {
+        'first_pickup_at': _span(load_model, Min, 'PICKUP'),
+        'last_delivery_at': _span(load_model, Max, 'DELIVERY'),
+    }
+
+
+def refresh_stop_span(queryset):
+    return queryset.update(**stop_span_fields(queryset.model))
+
+
+def analyze_stop_tables(load_model, using='default'):
+    """
+    ANALYZE the stop tables before a bulk refresh_stop_span(): without
+    statistics (fresh restore, rows added in the same transaction) Postgres
+    plans the per-load subquery as a sequential scan of every stop.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    through = load_model._meta.get_field('stop').remote_field.through
+    stops = load_model._meta.get_field('stop').related_model
+    tables = ', '.join(connection.ops.quote_name(model._meta.db_table) for model in (through, stops))
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {tables}')
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def span_overlaps(pay_from, pay_to):
+    """
+    The pay-period rule on the stored span, with the dates compared as
+    half-open timestamp ranges so (driver, first_pickup_at) and
+    (driver, last_delivery_at) can be index-scanned: pickup in the period,
+    delivery in the period, or the period inside the load's span.
+    """
+    start, end = _day_start(pay_from), _day_start(pay_to + timedelta(days=1))
+    return (
+        Q(first_pickup_at__gte=start, first_pickup_at__lt=end) |
+        Q(last_delivery_at__gte=start, last_delivery_at__lt=end) |
+        Q(first_pickup_at__lt=_day_start(pay_from + timedelta(days=1)), last_delivery_at__gte=_day_start(pay_to))
+    )
@@ -0,0 +1,149 @@
+"""
+Load notifications to the team's Telegram channel and group.
+
+The dispatch message is rendered by apps/load/load_summary.py;
+deliver_load_notification() posts it (a new load) or edits the posted
+messages (an update) through the shared, rate limited client in
+utils/telegram.py. Retries are not done here: a transient failure raises
+TelegramRetry and apps/load/notifications.py schedules the next attempt.
+
+send_load_notification_async() is the asyncio variant used by the outbox
+worker's --asyncio mode: the message is rendered beforehand, the channel and
+group requests go out together and the caller saves both ids at once.
+"""
+import asyncio
+import hashlib
+
+from django.utils import timezone
+
+from apps.load.load_summary import render_load_message
+from apps.load.models.load import Load
+from utils.telegram import TelegramError, process_telegram_id, telegram_client
+
+
+# render_load_message() o'qiydigan Load maydonlari: boshqasi o'zgarsa xabar o'zgarmaydi
+MESSAGE_FIELDS = frozenset({
+    'load_id', 'driver', 'company_name', 'load_pay', 'mile', 'empty_mile', 'per_mile', 'pickup_date',
+    'delivery_date', 'pickup_location', 'delivery_location', 'unit_id', 'team_id', 'dispatcher',
+})
+
+
+def telegram_request(bot_token, method, data):
+    """One Bot API call through the shared client (utils/telegram.py)."""
+    return telegram_client().call(bot_token, method, data)
+
+
+def _is_not_modified(error):
+    # matn o'zgarmagan tahrir Telegram uchun xato, biz uchun esa yetkazilgan
+    return 'message is not modified' in str(error)
+
+
+def message_hash(message):
+    return hashlib.sha256(message.encode()).hexdigest()
+
+
+def _destinations(instance):
+    """(bot token, channel id, group id) of the load's team, or None without Telegram configuration."""
+    team = instance.team_id
+    if not team or not team.telegram_token or not team.telegram_channel_id or not team.telegram_group_id:
+        return None
+    return team.telegram_token, process_telegram_id(team.telegram_channel_id), process_telegram_id(
+        team.telegram_group_id)
+
+
+def prepare_load_notification(instance, created, last_hash=None):
+    """
+    (outcome, text hash, message) before anything is sent: the outcome is
+    'SKIPPED' when the team has no Telegram configuration or there is no
+    posted message to edit, 'UNCHANGED' for an edit whose text hashes to
+    ``last_hash``, otherwise None and the message has to be sent.
+    """
+    if _destinations(instance) is None:
+        return 'SKIPPED', None, None
+    if not created and not instance.message_id and not instance.group_message_id:
+        # e'lon qilinmagan load: tahrir qiladigan xabar yo'q
+        return 'SKIPPED', None, None
+    message = render_load_message(instance)
+    text_hash = message_hash(message)
+    if not created and text_hash == last_hash:
+        return 'UNCHANGED', text_hash, None
+    return None, text_hash, message
+
+
+def deliver_load_notification(instance, created, last_hash=None):
+    """
+    Posts (created) or edits the load's channel and group messages; returns
+    (outcome, text hash), the outcome being 'SENT' or that of
+    prepare_load_notification(). A new load's message ids are saved as soon
+    as each message is posted, so a retry after a failure does not post the
+    same message twice.
+    """
+    outcome, text_hash, message = prepare_load_notification(instance, created, last_hash)
+    if outcome:
+        return outcome, text_hash
+    bot_token, channel_id, group_id = _destinations(instance)
+
+    if created:
+        if not instance.message_id:
+            response = telegram_request(bot_token, 'sendMessage',
+                                        {"chat_id": channel_id, "text": message, "parse_mode": "HTML"})
+            instance.message_id = response["result"]["message_id"]
+            # signalni qayta ishga tushirmasdan saqlash
+            Load.objects.filter(pk=instance.pk).update(message_id=instance.message_id, updated_date=timezone.now())
+        if not instance.group_message_id:
+            response = telegram_request(bot_token, 'sendMessage',
+                                        {"chat_id": group_id, "text": message, "parse_mode": "HTML"})
+            instance.group_message_id = response["result"]["message_id"]
+            Load.objects.filter(pk=instance.pk).update(group_message_id=instance.group_message_id,
+                                                       updated_date=timezone.now())
+        return 'SENT', text_hash
+
+    for chat_id, message_id in ((channel_id, instance.message_id), (group_id, instance.group_message_id)):
+        if not message_id:
+            continue
+        try:
+            telegram_request(bot_token, 'editMessageText', {
+                "chat_id": chat_id, "message_id": message_id, "text": message, "parse_mode": "HTML"})
+        except TelegramError as e:
+            if not _is_not_modified(e):
+                raise
+    return 'SENT', text_hash
+
+
+async def send_load_notification_async(api, instance, created, message):
+    """
+    Sends a prepared message with an AsyncTelegramSession, the channel and
+    group requests concurrently. Nothing is written to the database: posted
+    message ids are set on ``instance`` (also when the other request fails)
+    for the caller to save with save_message_ids(). Raises the first error
+    once both requests are done.
+    """
+    bot_token, channel_id, group_id = _destinations(instance)
+    if created:
+        targets = [(field, chat_id) for field, chat_id in (('message_id', channel_id), ('group_message_id', group_id))
+                   if not getattr(instance, field)]
+        results = await asyncio.gather(*(
+            api.call(bot_token, 'sendMessage', {"chat_id": chat_id, "text": message, "parse_mode": "HTML"})
+            for _, chat_id in targets
+        ), return_exceptions=True)
+        for (field, _), result in zip(targets, results):
+            if not isinstance(result, BaseException):
+                setattr(instance, field, result["result"]["message_id"])
+    else:
+        results = await asyncio.gather(*(
+            api.call(bot_token, 'editMessageText',
+                     {"chat_id": chat_id, "message_id": message_id, "text": message, "parse_mode": "HTML"})
+            for chat_id, message_id in ((channel_id, instance.message_id), (group_id, instance.group_message_id))
+            if message_id
+        ), return_exceptions=True)
+        results = [result for result in results if not (isinstance(result, TelegramError) and _is_not_modified(result))]
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+def save_message_ids(instance):
+    """Both posted message ids in one UPDATE (no signals)."""
+    Load.objects.filter(pk=instance.pk).update(message_id=instance.message_id,
+                                               group_message_id=instance.group_message_id,
+                                               updated_date=timezone.now())
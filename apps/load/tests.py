@@ -0,0 +1,405 @@
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.views.load import LoadChangesView
+from apps.auth.models import Company, User
+from apps.load import miles, notifications
+from apps.load.ledger import ledger_totals
+from apps.load.miles import enqueue_mile_calculation
+from apps.load.models import (
+    CustomerBroker, Dispatcher, Driver, Employee, Load, LoadTags, LoadTombstone, OtherPay, Stops, Truck,
+)
+from apps.load.models.driver import DriverExpense, Pay
+from apps.load.models.mile_queue import MileQueue
+from apps.load.models.notification import NotificationOutbox
+from apps.load.models.team import Team
+from apps.load.payroll import calculate_settlement
+from apps.load.payroll_vector import VectorSettlement
+from utils.telegram import TelegramError, TelegramRetry, TelegramThrottled
+
+
+class LoadQueryBudgetTests(TestCase):
+    """
+    The load list and detail endpoints cost the same number of queries
+    however many loads (list) or stops (detail) they render, for the
+    default representation and for every ?fields= / ?expand= shape.
+    """
+    LIST_URLS = (
+        '/api/load/',
+        '/api/load/?fields=id,load_id,driver,stop',
+        '/api/load/?expand=driver,dispatcher,stop,tags',
+        '/api/load/?fields=id,load_id&expand=driver,stop',
+    )
+    DETAIL_PARAMS = ('', '?fields=id,load_id,stop', '?expand=driver,dispatcher,stop,tags,created_by')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(company_name='Query Budget')
+        cls.user = User.objects.create_user(email='budget@example.com', password='x', company=cls.company)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_loads(self, count, stops=2):
+        loads = []
+        for index in range(Load.objects.count(), Load.objects.count() + count):
+            driver = Driver.objects.create(user=User.objects.create_user(
+                email=f'driver{index}@example.com', password='x', company=self.company))
+            dispatcher = Dispatcher.objects.create(user=User.objects.create_user(
+                email=f'dispatcher{index}@example.com', password='x', company=self.company))
+            load = Load.objects.create(
+                load_id=f'QB{index}', driver=driver, dispatcher=dispatcher, created_by=self.user,
+                truck=Truck.objects.create(), customer_broker=CustomerBroker.objects.create(),
+                tags=LoadTags.objects.create(tag=f'TAG{index}'))
+            load.stop.add(*(Stops.objects.create(stop_name=f'STOP{stop}') for stop in range(stops)))
+            loads.append(load)
+        return loads
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries), response
+
+    def test_list_queries_do_not_grow_with_loads(self):
+        self.create_loads(2)
+        budgets = {url: self.count_queries(url)[0] for url in self.LIST_URLS}
+        self.create_loads(6, stops=3)
+        for url, budget in budgets.items():
+            with self.subTest(url=url), self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(len(response.data['results']), 8)
+
+    def test_detail_queries_do_not_grow_with_stops(self):
+        few, many = self.create_loads(1, stops=1) + self.create_loads(1, stops=6)
+        for params in self.DETAIL_PARAMS:
+            budget, _ = self.count_queries(f'/api/load/{few.pk}/{params}')
+            with self.subTest(params=params), self.assertNumQueries(budget):
+                response = self.client.get(f'/api/load/{many.pk}/{params}')
+            self.assertEqual(len(response.data['stop']), 6)
+
+    def test_expanded_list_nests_relations(self):
+        load, = self.create_loads(1)
+        _, response = self.count_queries('/api/load/?expand=driver,stop,tags')
+        row = response.data['results'][0]
+        self.assertEqual(row['driver']['id'], load.driver_id)
+        self.assertEqual(row['tags']['tag'], load.tags.tag)
+        self.assertEqual(sorted(stop['id'] for stop in row['stop']), sorted(load.stop.values_list('pk', flat=True)))
+
+
+class EmployeeListTests(TestCase):
+    """The employee list honours ?fields= and ?expand= like the detail endpoint."""
+
+    def test_fields_and_expand(self):
+        user = User.objects.create_user(email='employee@example.com', password='x')
+        employee = Employee.objects.create(user=user)
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/employee/?fields=id,user&expand=user')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{'id': employee.pk, 'user': client.get(
+            f'/api/employee/{employee.pk}/?fields=user&expand=user').data['user']}])
+        self.assertEqual(response.data[0]['user']['email'], user.email)
+
+
+class LoadChangesRetentionTests(TestCase):
+    """Tombstones past LoadTombstone.RETENTION are purged and cursors older than that are answered 410."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(email='changes@example.com', password='x'))
+
+    def sync(self, since=None):
+        return self.client.get('/api/load/changes/', {'since': since} if since else {})
+
+    def test_purge_and_expired_cursor(self):
+        old, recent = Load.objects.create(load_id='OLD'), Load.objects.create(load_id='RECENT')
+        old.delete()
+        recent.delete()
+        LoadTombstone.objects.filter(load_id='OLD').update(
+            deleted_at=timezone.now() - LoadTombstone.RETENTION - timedelta(days=1))
+        LoadTombstone.objects.filter(load_id='RECENT').update(deleted_at=timezone.now() - timedelta(days=1))
+
+        call_command('purge_load_tombstones', stdout=StringIO())
+        self.assertEqual(list(LoadTombstone.objects.values_list('load_id', flat=True)), ['RECENT'])
+
+        response = self.sync()
+        self.assertEqual([row['load_id'] for row in response.data['deleted']], ['RECENT'])
+        cursor = response.data['cursor']
+        self.assertEqual(self.sync(cursor).status_code, 200)
+        with mock.patch('django.utils.timezone.now',
+                        return_value=timezone.now() + LoadTombstone.RETENTION + timedelta(days=1)):
+            self.assertEqual(self.sync(cursor).status_code, 410)
+
+    def test_cursor_keeps_sync_time_while_paging(self):
+        for number in range(3):
+            Load.objects.create(load_id=f'PAGE{number}')
+        Load.objects.update(updated_date=timezone.now() - timedelta(minutes=1))
+        pages = [self.client.get('/api/load/changes/', {'page_size': 1}).data]
+        while pages[-1]['has_more']:
+            pages.append(self.client.get('/api/load/changes/', {'page_size': 1, 'since': pages[-1]['cursor']}).data)
+        synced = [LoadChangesView.decode_since(page['cursor'])[2] for page in pages]
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(synced[0], synced[1])
+        self.assertGreater(synced[2], synced[1])
+
+
+class SettlementParityTests(TestCase):
+    """
+    The ledger's period totals (ledger_totals) and VectorSettlement agree to
+    the cent with calculate_settlement() for every Pay rule, with other
+    pays, chargebacks, expenses and escrow in the period; with round_lines
+    VectorSettlement is within half a cent per rounded line.
+    """
+    TOTALS = ('total_load_pays', 'total_other_pays', 'total_expenses', 'total_income')
+    PAYS = (
+        {'pay_type': 'Percentage', 'standart': 30},
+        {'pay_type': 'Per Mile', 'standart': 0.65},
+        {'pay_type': 'Hourly', 'standart': 27.5},
+        {'pay_type': 'Percentage', 'standart': 30, 'picks_per': 75, 'drops_per': 50},
+    )
+
+    def settle(self, index, **pay_fields):
+        rng = random.Random(index)
+        pay_from = date(2026, 9, 7)
+        driver = Driver.objects.create(
+            user=User.objects.create_user(email=f'parity{index}@example.com', password='x'), escrow_deposit=50)
+        pay = Pay.objects.create(driver=driver, **pay_fields)
+        start = timezone.make_aware(datetime.combine(pay_from, datetime.min.time()))
+        for number in range(12):
+            load = Load.objects.create(load_id=f'P{index}-{number}', driver=driver, mile=rng.randrange(100, 1500),
+                                       load_pay=Decimal(rng.randrange(50000, 500000)) / 100)
+            pickup = start + timedelta(hours=rng.randrange(12, 6 * 24))
+            names = ['PICKUP', 'DELIVERY'] + (['PICKUP'] if rng.random() < 0.3 else [])
+            load.stop.add(*(Stops.objects.create(stop_name=name, appointmentdate=pickup + timedelta(hours=hours))
+                            for name, hours in zip(names, (0, 20, 4))))
+            for pay_type in ('DETENTION', 'CHARGEBACK', 'LUMPER'):
+                if rng.random() < 0.5:
+                    OtherPay.objects.create(load=load, pay_type=pay_type,
+                                            amount=Decimal(rng.randrange(1000, 30000)) / 100)
+        for day in range(7):
+            DriverExpense.objects.create(driver=driver, transaction_type=rng.choice('+-'), description='fuel',
+                                         amount=rng.randrange(1000, 50000) / 100,
+                                         expense_date=pay_from + timedelta(days=day))
+        pay_to = pay_from + timedelta(days=6)
+        return driver, pay, pay_from, pay_to
+
+    @staticmethod
+    def chargebacks(settlement):
+        return sum((Decimal(row['amount'].lstrip('$')) for row in settlement['chargeback_deductions']), Decimal(0))
+
+    def test_ledger_totals_match_settlement(self):
+        for index, pay_fields in enumerate(self.PAYS):
+            with self.subTest(**pay_fields):
+                driver, pay, pay_from, pay_to = self.settle(index, **pay_fields)
+                settlement, totals = calculate_settlement(driver, pay, pay_from, pay_to), ledger_totals(
+                    driver, pay_from, pay_to)
+                self.assertEqual(totals['loads'], len(settlement['load_ids']))
+                self.assertGreater(totals['loads'], 0)
+                for key in self.TOTALS:
+                    self.assertEqual(f"${totals[key]:.2f}", settlement[key]['Result'], key)
+                self.assertEqual(f"{totals['total_chargebacks']:.2f}", f"{self.chargebacks(settlement):.2f}")
+                self.assertEqual(f"{totals['total_pay']:.2f}", f"{settlement['amount']:.2f}")
+
+    def test_vector_totals_match_settlement(self):
+        for index, pay_fields in enumerate(self.PAYS):
+            with self.subTest(**pay_fields):
+                driver, pay, pay_from, pay_to = self.settle(index, **pay_fields)
+                settlement = calculate_settlement(driver, pay, pay_from, pay_to)
+                vector = VectorSettlement(driver, pay, pay_from, pay_to)
+                totals = vector.totals()
+                self.assertEqual(list(vector.load_ids), settlement['load_ids'])
+                for key in self.TOTALS:
+                    self.assertEqual(f"${totals[key]}", settlement[key]['Result'], key)
+                self.assertEqual(totals['total_chargebacks'], self.chargebacks(settlement))
+                self.assertEqual(f"{totals['total_pay']}", f"{settlement['amount']:.2f}")
+                # bitta load qatori yarim sentda float dan farq qilishi mumkin (ROUND_HALF_UP)
+                for vector_row, row in zip(vector.load_details(), settlement['loads'], strict=True):
+                    self.assertLessEqual(abs(Decimal(vector_row['Result'][1:]) - Decimal(row['Result'][1:])),
+                                         Decimal('0.01'), row['Load #'])
+                self.assertEqual(vector.formulas()['total_pay'], settlement['total_pay']['Formula'])
+
+                rounded = VectorSettlement(driver, pay, pay_from, pay_to, round_lines=True)
+                allowed = Decimal(len(rounded.base) + len(rounded.other)) / 200
+                for key in (*self.TOTALS, 'total_pay'):
+                    self.assertLessEqual(abs(rounded.totals()[key] - totals[key]), allowed, key)
+
+    def test_vector_rounds_half_cents_up(self):
+        driver, pay, pay_from, pay_to = self.settle(0, pay_type='Percentage', standart=30)
+        Load.objects.filter(driver=driver).exclude(pk=Load.objects.filter(driver=driver).order_by('pk')[0].pk).delete()
+        Load.objects.filter(driver=driver).update(load_pay=Decimal('10.25'))
+        OtherPay.objects.filter(load__driver=driver).delete()
+        settlement = calculate_settlement(driver, pay, pay_from, pay_to)
+        # 30% * $10.25 = $3.075: float 3.07499.. -> $3.07, ROUND_HALF_UP -> $3.08
+        self.assertEqual(settlement['total_load_pays']['Result'], '$3.07')
+        for round_lines in (False, True):
+            self.assertEqual(VectorSettlement(driver, pay, pay_from, pay_to, round_lines).totals()['total_load_pays'],
+                             Decimal('3.08'))
+
+
+class MileQueueTests(TestCase):
+    """The mile worker stores every calculated field, retries empty geocoding and survives deleted loads."""
+
+    def queue(self):
+        # bulk endpoint kabi: save() hisoblamasin, millar keyin o'chiriladi
+        load = Load.objects.create(load_id='M1', pickup_location='Chicago, IL', delivery_location='Dallas, TX',
+                                   mile=1, total_miles=1)
+        Load.objects.filter(pk=load.pk).update(mile=None, per_mile=None, total_miles=None)
+        enqueue_mile_calculation([load.pk])
+        return load
+
+    def work(self):
+        return [miles.process(job_id) for job_id in miles.claim()]
+
+    def test_process_stores_per_mile(self):
+        load = self.queue()
+
+        def calculate(self):
+            self.per_mile, self.mile, self.empty_mile, self.total_miles = Decimal('925.37'), 925, 0, 925
+            return True
+        with mock.patch.object(Load, 'calculate_miles', calculate):
+            self.assertEqual(self.work(), ['done'])
+        load.refresh_from_db()
+        self.assertEqual((load.mile, load.per_mile, load.total_miles), (925, Decimal('925.37'), 925))
+        self.assertFalse(MileQueue.objects.exists())
+
+    def test_empty_geocoding_is_retried_then_dropped(self):
+        self.queue()
+        with mock.patch.object(Load, 'calculate_miles', return_value=False):
+            for attempt in range(1, miles.MAX_ATTEMPTS):
+                self.assertEqual(self.work(), ['retry'])
+                self.assertEqual(miles.claim(), [])  # qulf hali ushlab turibdi
+                MileQueue.objects.update(locked_at=timezone.now() - miles.LOCK_TIMEOUT - timedelta(seconds=1))
+            self.assertEqual(self.work(), ['failed'])
+        self.assertFalse(MileQueue.objects.exists())
+
+    def test_deleted_load_is_skipped(self):
+        load = self.queue()
+        job_ids = miles.claim()
+        load.delete()
+        self.assertEqual([miles.process(job_id) for job_id in job_ids], ['missing'])
+
+
+class NotificationOutboxTests(TestCase):
+    """claim() and _record(): per-load order, stale SENDING rows, retry backoff and throttling."""
+
+    def setUp(self):
+        self.first, self.second = Load.objects.create(load_id='O1'), Load.objects.create(load_id='O2')
+
+    def queue(self, load, kind='LOAD_UPDATED'):
+        return NotificationOutbox.objects.create(load=load, kind=kind).pk
+
+    def claimed(self, notification_id):
+        return NotificationOutbox.objects.get(pk=notification_id)
+
+    def test_claim_keeps_per_load_order(self):
+        created = self.queue(self.first, 'LOAD_CREATED')
+        updated, other = self.queue(self.first), self.queue(self.second)
+        self.assertEqual(notifications.claim(), [created, other])
+        # eski xabar SENDING ekan, keyingisi olinmaydi
+        self.assertEqual(notifications.claim(), [])
+        notifications._record(self.claimed(created), 'SENT', 'hash')
+        self.assertEqual(notifications.claim(), [updated])
+
+    def test_stale_sending_row_is_claimed_again(self):
+        notification_id = self.queue(self.first)
+        self.assertEqual(notifications.claim(), [notification_id])
+        self.assertEqual(notifications.claim(), [])
+        NotificationOutbox.objects.update(
+            locked_at=timezone.now() - notifications.LOCK_TIMEOUT - timedelta(seconds=1))
+        self.assertEqual(notifications.claim(), [notification_id])
+        self.assertEqual(self.claimed(notification_id).attempts, 2)
+
+    def test_retry_backoff_until_max_attempts(self):
+        notification_id = self.queue(self.first)
+        for attempt in range(1, notifications.MAX_ATTEMPTS):
+            self.assertEqual(notifications.claim(), [notification_id])
+            before = timezone.now()
+            status = notifications._record(self.claimed(notification_id), error=TelegramRetry("HTTP 502"))
+            notification = self.claimed(notification_id)
+            self.assertEqual((status, notification.attempts), ('PENDING', attempt))
+            self.assertGreaterEqual(notification.next_attempt_at, before + notifications.retry_delay(attempt))
+            self.assertEqual(notifications.claim(), [])  # hali vaqti kelmagan
+            NotificationOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(notifications.claim(), [notification_id])
+        status = notifications._record(self.claimed(notification_id), error=TelegramRetry("HTTP 502"))
+        self.assertEqual(status, 'FAILED')
+        self.assertIn(f"after {notifications.MAX_ATTEMPTS} attempts", self.claimed(notification_id).last_error)
+
+    def test_retry_after_wins_over_backoff(self):
+        self.assertEqual(notifications.retry_delay(1), notifications.RETRY_BASE)
+        self.assertEqual(notifications.retry_delay(3), notifications.RETRY_BASE * 4)
+        self.assertEqual(notifications.retry_delay(50), notifications.RETRY_MAX)
+        self.assertEqual(notifications.retry_delay(1, retry_after=600), timedelta(seconds=600))
+
+    def test_throttled_delay_is_not_an_attempt(self):
+        notification_id = self.queue(self.first)
+        for _ in range(notifications.MAX_ATTEMPTS + 1):
+            self.assertEqual(notifications.claim(), [notification_id])
+            before = timezone.now()
+            status = notifications._record(self.claimed(notification_id),
+                                           error=TelegramThrottled("rate limited", retry_after=30))
+            notification = self.claimed(notification_id)
+            self.assertEqual((status, notification.attempts), ('PENDING', 0))
+            self.assertGreaterEqual(notification.next_attempt_at, before + timedelta(seconds=30))
+            NotificationOutbox.objects.update(next_attempt_at=timezone.now())
+
+    def test_rejected_message_fails_at_once(self):
+        notification_id = self.queue(self.first)
+        notifications.claim()
+        status = notifications._record(self.claimed(notification_id), error=TelegramError("chat not found"))
+        self.assertEqual((status, self.claimed(notification_id).attempts), ('FAILED', 1))
+
+
+class LoadMessageDebounceTests(TestCase):
+    """A burst of saves becomes one edit per chat, and an edit with the last sent text makes no request."""
+
+    def setUp(self):
+        team = Team.objects.create(name='Debounce', telegram_token='1:TOKEN', telegram_channel_id='-100',
+                                   telegram_group_id='-200')
+        self.load = Load.objects.create(load_id='D1', team_id=team, load_pay=1000)
+        Load.objects.filter(pk=self.load.pk).update(message_id=11, group_message_id=22)
+        NotificationOutbox.objects.all().delete()
+
+    def save_pay(self, load_pay):
+        load = Load.objects.get(pk=self.load.pk)
+        load.load_pay = load_pay
+        load.save()
+
+    def send_due(self):
+        NotificationOutbox.objects.filter(status='PENDING').update(next_attempt_at=timezone.now())
+        # process() ulanishni yopadi: test tranzaksiyasi ochiq qolsin
+        with mock.patch('apps.load.telegram.telegram_request') as request, \
+                mock.patch.object(notifications, 'connection'):
+            statuses = [notifications.process(notification_id) for notification_id in notifications.claim()]
+        return statuses, [(method, data['chat_id']) for _, method, data in (call.args for call in request.mock_calls)]
+
+    def test_burst_of_saves_becomes_one_edit(self):
+        for load_pay in (1100, 1200, 1300):
+            self.save_pay(load_pay)
+        pending = NotificationOutbox.objects.get(status='PENDING')
+        self.assertEqual(pending.kind, 'LOAD_UPDATED')
+        self.assertGreater(pending.next_attempt_at, timezone.now())
+
+        statuses, requests = self.send_due()
+        self.assertEqual(statuses, ['SENT'])
+        self.assertEqual(requests, [('editMessageText', '-100'), ('editMessageText', '-200')])
+
+    def test_unchanged_text_is_not_sent(self):
+        self.save_pay(1100)
+        self.assertEqual(self.send_due()[0], ['SENT'])
+        notifications.enqueue_load_updates([self.load.pk])
+        self.assertEqual(self.send_due(), (['UNCHANGED'], []))
+        self.save_pay(1200)
+        self.assertEqual(self.send_due()[0], ['SENT'])
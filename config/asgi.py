@@ -5,6 +5,11 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+The load event stream (/api/load/stream/) is an async view and only streams
+under ASGI, e.g.:
+
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
 """
 
 import os
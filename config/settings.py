@@ -18,6 +18,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     # 'rest_framework_simplejwt',
     # 'apps.audit'
@@ -131,6 +132,17 @@ DATABASES = {
         'CONN_MAX_AGE': 0,
     }
 }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # payroll preview (apps/load/payroll.py): gunicorn workerlari va payroll run jarayonlari uchun umumiy
+    'payroll': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'payroll_cache',
+    },
+}
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -211,3 +223,7 @@ if DEBUG:
 else:
     # For production environment - replace with your actual domain
     DOMAIN_NAME = 'api1.biznes-armiya.uz'
+
+# Behind the reverse proxy: build absolute URLs (pagination links etc.) from the forwarded host/scheme
+USE_X_FORWARDED_HOST = True
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
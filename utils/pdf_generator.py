@@ -1,73 +1,32 @@
 import io
-from datetime import datetime
-from django.core.files.base import ContentFile
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, KeepTogether
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
 from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from reportlab.pdfgen import canvas
+from reportlab.platypus import KeepTogether, Paragraph, SimpleDocTemplate, Spacer, Table
+
+from utils.pdf_templates import (
+    BOTTOM_MARGIN, PAGE_SIZE, TOP_MARGIN, NumberedCanvas, driver_name, pdf_template,
+)
+
+
+def _build(story, template, running_title):
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=PAGE_SIZE, topMargin=TOP_MARGIN, bottomMargin=BOTTOM_MARGIN)
+    doc.build(story, onLaterPages=template.later_pages(running_title), canvasmaker=NumberedCanvas)
+    buffer.seek(0)
+    return buffer
 
 
 def generate_driver_pay_pdf(driver_pay_data, driver, company_info=None):
     """
     Driver uchun PDF hisobot yaratish
     """
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        alignment=TA_CENTER,
-        spaceAfter=20,
-        textColor=colors.black
-    )
-    
-    header_style = ParagraphStyle(
-        'HeaderStyle',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_LEFT,
-        spaceAfter=6
-    )
-
-    # Company header
-    if company_info:
-        company_header_data = [
-            [company_info.get('company_name', 'Company Name'), 'Driver: Orol Berdiyev'],
-            [f"Phone: {company_info.get('phone', 'N/A')}", f"Report Date: {driver_pay_data['driver']['report_date']}"],
-            [f"Fax: {company_info.get('fax', 'N/A')}", f"Search From: {driver_pay_data['driver']['search_from']}"],
-            ['', f"Search To: {driver_pay_data['driver']['search_to']}"],
-            ['', f"Status: {driver_pay_data['driver']['contact_number']}"]
-        ]
-    else:
-        company_header_data = [
-            ['Company Name', 'Driver: Orol Berdiyev'],
-            ['Phone: N/A', f"Report Date: {driver_pay_data['driver']['report_date']}"],
-            ['Fax: N/A', f"Search From: {driver_pay_data['driver']['search_from']}"],
-            ['', f"Search To: {driver_pay_data['driver']['search_to']}"],
-            ['', f"Status: {driver_pay_data['driver']['contact_number']}"]
-        ]
-
-    company_table = Table(company_header_data, colWidths=[3*inch, 3*inch])
-    company_table.setStyle(TableStyle([
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
-    story.append(company_table)
+    template = pdf_template(company_info)
+    driver_data = driver_pay_data['driver']
+    story = template.header_block(driver_data)
     story.append(Spacer(1, 20))
 
     # Title
-    title = Paragraph("Driver Pay Report", title_style)
-    story.append(title)
+    story.append(Paragraph("Driver Pay Report", template.title))
 
     # Loads table header
     load_headers = ['Load #', 'Pickup', 'Delivery', 'Rate', 'Notes', 'Total Pay']
@@ -87,19 +46,8 @@ def generate_driver_pay_pdf(driver_pay_data, driver, company_info=None):
     # Add total row
     load_data.append(['', '', '', '', 'Total:', driver_pay_data['total_pay']['Result']])
 
-    load_table = Table(load_data, colWidths=[0.8*inch, 1.8*inch, 1.8*inch, 1*inch, 1*inch, 0.8*inch])
-    load_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
+    load_table = Table(load_data, colWidths=[0.8*inch, 1.8*inch, 1.8*inch, 1*inch, 1*inch, 0.8*inch], repeatRows=1)
+    load_table.setStyle(template.loads)
 
     story.append(load_table)
     story.append(Spacer(1, 20))
@@ -117,99 +65,40 @@ def generate_driver_pay_pdf(driver_pay_data, driver, company_info=None):
     ]
 
     deduction_table = Table(deduction_data, colWidths=[4*inch, 1.5*inch])
-    deduction_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
+    deduction_table.setStyle(template.deductions)
+    # jadval sahifalar orasida bo'linmaydi
+    story.append(KeepTogether([deduction_table]))
 
-    story.append(deduction_table)
-    story.append(Spacer(1, 20))
+    running_title = (f"Driver Pay Report - {driver_name(driver_data)} - "
+                     f"{driver_data['search_from']} to {driver_data['search_to']}")
+    return _build(story, template, running_title)
 
-    # Page number
-    story.append(Paragraph("Page 1 of 1", ParagraphStyle('PageNumber', parent=styles['Normal'], alignment=TA_CENTER)))
 
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
-
-
-def generate_company_driver_pdf(driver_pay_data, driver, loads_data, company_info=None):
+def generate_company_driver_pdf(driver_pay_data, driver, loads_data, company_info=None, miles_rate=0.65):
     """
     Company Driver uchun CD fayl PDF hisobot yaratish
     """
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        alignment=TA_CENTER,
-        spaceAfter=20,
-        textColor=colors.black
-    )
-
-    # Company header
-    if company_info:
-        company_header_data = [
-            [company_info.get('company_name', 'Company Name'), 'Driver: Orol Berdiyev'],
-            [f"Phone: {company_info.get('phone', 'N/A')}", f"Report Date: {driver_pay_data['driver']['report_date']}"],
-            [f"Fax: {company_info.get('fax', 'N/A')}", f"Search From: {driver_pay_data['driver']['search_from']}"],
-            ['', f"Search To: {driver_pay_data['driver']['search_to']}"],
-            ['', f"Status: {driver_pay_data['driver']['contact_number']}"]
-        ]
-    else:
-        company_header_data = [
-            ['Shuntransport Express Inc.', 'Driver: Orol Berdiyev'],
-            ['Phone: (815) 636-3917', f"Report Date: {driver_pay_data['driver']['report_date']}"],
-            ['Fax: (815) 636-3560', f"Search From: {driver_pay_data['driver']['search_from']}"],
-            ['', f"Search To: {driver_pay_data['driver']['search_to']}"],
-            ['', f"Status: {driver_pay_data['driver']['contact_number']}"]
-        ]
-
-    company_table = Table(company_header_data, colWidths=[3*inch, 3*inch])
-    company_table.setStyle(TableStyle([
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
-    story.append(company_table)
+    template = pdf_template(company_info)
+    driver_data = driver_pay_data['driver']
+    story = template.header_block(driver_data)
     story.append(Spacer(1, 20))
 
     # Driver name
-    driver_name = f"{driver_pay_data['driver']['first_name']} {driver_pay_data['driver']['last_name']}"
-    story.append(Paragraph(f"In total, {driver_name} drove in the week from {driver_pay_data['driver']['search_from']} to {driver_pay_data['driver']['search_to']}:", styles['Normal']))
+    story.append(Paragraph(f"In total, {driver_name(driver_data)} drove in the week from {driver_data['search_from']} to {driver_data['search_to']}:", template.normal))
     story.append(Spacer(1, 10))
 
     # Calculate total miles and total pay
     total_miles = sum([load.get('loaded_miles', 0) for load in loads_data])
-    total_pay = total_miles * 0.65
+    total_pay = total_miles * miles_rate
 
     # Summary table
     summary_data = [
         ['Miles', 'Rate', 'To pay'],
-        [str(total_miles), '$0.65', f'${total_pay:.2f}']
+        [str(total_miles), f'${miles_rate}', f'${total_pay:.2f}']
     ]
 
     summary_table = Table(summary_data, colWidths=[1.5*inch, 1.5*inch, 1.5*inch])
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-    ]))
+    summary_table.setStyle(template.cd_summary)
 
     story.append(summary_table)
     story.append(Spacer(1, 20))
@@ -228,17 +117,8 @@ def generate_company_driver_pdf(driver_pay_data, driver, loads_data, company_inf
         ]
         load_data.append(row)
 
-    load_table = Table(load_data, colWidths=[1*inch, 3*inch, 1*inch, 1.5*inch])
-    load_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
+    load_table = Table(load_data, colWidths=[1*inch, 3*inch, 1*inch, 1.5*inch], repeatRows=1)
+    load_table.setStyle(template.cd_loads)
 
     story.append(load_table)
     story.append(Spacer(1, 20))
@@ -253,19 +133,9 @@ def generate_company_driver_pdf(driver_pay_data, driver, loads_data, company_inf
     ]
 
     final_summary_table = Table(final_summary_data, colWidths=[4*inch, 1.5*inch])
-    final_summary_table.setStyle(TableStyle([
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-
-    story.append(final_summary_table)
-    story.append(Spacer(1, 20))
+    final_summary_table.setStyle(template.cd_final)
+    story.append(KeepTogether([final_summary_table]))
 
-    # Page number
-    story.append(Paragraph("Page 2 of 2", ParagraphStyle('PageNumber', parent=styles['Normal'], alignment=TA_CENTER)))
-
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
+    running_title = (f"Company Driver Report - {driver_name(driver_data)} - "
+                     f"{driver_data['search_from']} to {driver_data['search_to']}")
+    return _build(story, template, running_title)
@@ -0,0 +1,198 @@
+import io
+import math
+
+from pypdf import PdfReader
+from pypdf.generic import (
+    ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject, TextStringObject,
+)
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+
+TOC_ROWS_PER_PAGE = 30
+
+
+class _CountingSink:
+    # sink seek/tell ni qo'llamasa ham xref offsetlari uchun yozilgan baytlar sanaladi
+    def __init__(self, sink):
+        self.sink = sink
+        self.offset = 0
+
+    def write(self, data):
+        self.sink.write(data)
+        self.offset += len(data)
+        return len(data)
+
+
+class PdfPacketWriter:
+    """
+    Concatenates PDFs into one, writing each part's pages to ``sink`` as soon
+    as the part is added. Only object offsets, page ids and the table of
+    contents entries stay in memory, so the packet size does not bound the
+    memory. ``close()`` adds the table of contents (front pages and PDF
+    outline) and the cross-reference table.
+
+        with open(path, 'wb') as sink:
+            packet = PdfPacketWriter(sink, title="Settlements", entry_label="Driver")
+            packet.add_part([driver_pdf], "John Doe")
+            packet.close()
+    """
+
+    def __init__(self, sink, title=None, entry_label='Section'):
+        self.sink = _CountingSink(sink)
+        self.title = title
+        self.entry_label = entry_label
+        self.offsets = [None]
+        self.page_ids = []
+        # (sarlavha, izoh, birinchi sahifa indeksi)
+        self.entries = []
+        self.pages_id = self._allocate()
+        self.sink.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def _allocate(self):
+        self.offsets.append(None)
+        return len(self.offsets) - 1
+
+    def _write_object(self, object_id, obj):
+        self.offsets[object_id] = self.sink.offset
+        self.sink.write(f"{object_id} 0 obj\n".encode())
+        obj.write_to_stream(self.sink)
+        self.sink.write(b"\nendobj\n")
+
+    def _copy_pages(self, source):
+        """Writes the pages of one PDF (path or binary stream); returns their new object ids."""
+        reader = PdfReader(source)
+        mapping = {}
+        pending = []
+        # eski Pages daraxti ko'chirilmaydi: unga havolalar paketning Pages iga ulanadi
+        root_pages = reader.trailer['/Root'].raw_get('/Pages')
+        if isinstance(root_pages, IndirectObject):
+            mapping[(root_pages.idnum, root_pages.generation)] = self.pages_id
+
+        def remap(obj):
+            # reader faqat shu part uchun: obyektlar joyida qayta raqamlanadi
+            if isinstance(obj, IndirectObject):
+                key = (obj.idnum, obj.generation)
+                if key not in mapping:
+                    mapping[key] = self._allocate()
+                    pending.append(obj)
+                return IndirectObject(mapping[key], 0, None)
+            if isinstance(obj, DictionaryObject):
+                for key, value in list(obj.items()):
+                    obj[key] = remap(value)
+            elif isinstance(obj, ArrayObject):
+                for index, value in enumerate(obj):
+                    obj[index] = remap(value)
+            return obj
+
+        page_ids = []
+        for page in reader.pages:
+            key = (page.indirect_reference.idnum, page.indirect_reference.generation)
+            if key not in mapping:
+                mapping[key] = self._allocate()
+            page_id = mapping[key]
+            page_ids.append(page_id)
+            # meros atributlari (Resources, MediaBox) pages da sahifaga ko'chirilgan
+            page = remap(page)
+            page[NameObject('/Parent')] = IndirectObject(self.pages_id, 0, None)
+            self._write_object(page_id, page)
+            while pending:
+                reference = pending.pop()
+                self._write_object(mapping[(reference.idnum, reference.generation)],
+                                   remap(reference.get_object()))
+        return page_ids
+
+    def add_part(self, sources, title, note=''):
+        """Appends the pages of ``sources`` (paths or binary streams) as one TOC entry."""
+        first_page = len(self.page_ids)
+        for source in sources:
+            self.page_ids.extend(self._copy_pages(source))
+        if len(self.page_ids) > first_page:
+            self.entries.append((title, note, first_page))
+
+    def _toc_pdf(self, toc_pages):
+        styles = getSampleStyleSheet()
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
+        story = [Paragraph(self.title or "Contents", styles['Heading1']), Spacer(1, 10)]
+        for start in range(0, len(self.entries), TOC_ROWS_PER_PAGE):
+            rows = [['#', self.entry_label, '', 'Page']]
+            for index, (title, note, first_page) in enumerate(self.entries[start:start + TOC_ROWS_PER_PAGE], start + 1):
+                rows.append([str(index), title, note, str(toc_pages + first_page + 1)])
+            table = Table(rows, colWidths=[0.5*inch, 3*inch, 2.5*inch, 0.8*inch], repeatRows=1)
+            table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+            ]))
+            story.append(table)
+        doc.build(story)
+        buffer.seek(0)
+        return buffer
+
+    def _write_toc(self):
+        # mundarija sahifalari soni sahifa raqamlariga ta'sir qiladi: soni barqaror bo'lguncha
+        toc_pages = max(1, math.ceil(len(self.entries) / TOC_ROWS_PER_PAGE))
+        while True:
+            buffer = self._toc_pdf(toc_pages)
+            rendered = len(PdfReader(buffer).pages)
+            if rendered == toc_pages:
+                break
+            toc_pages = rendered
+        buffer.seek(0)
+        return self._copy_pages(buffer)
+
+    def _write_outline(self, page_ids):
+        outline_id = self._allocate()
+        item_ids = [self._allocate() for _ in self.entries]
+        for index, (title, note, first_page) in enumerate(self.entries):
+            item = DictionaryObject({
+                NameObject('/Title'): TextStringObject(title),
+                NameObject('/Parent'): IndirectObject(outline_id, 0, None),
+                NameObject('/Dest'): ArrayObject([IndirectObject(page_ids[first_page], 0, None), NameObject('/Fit')]),
+            })
+            if index:
+                item[NameObject('/Prev')] = IndirectObject(item_ids[index - 1], 0, None)
+            if index + 1 < len(item_ids):
+                item[NameObject('/Next')] = IndirectObject(item_ids[index + 1], 0, None)
+            self._write_object(item_ids[index], item)
+        outline = DictionaryObject({NameObject('/Type'): NameObject('/Outlines'),
+                                    NameObject('/Count'): NumberObject(len(item_ids))})
+        if item_ids:
+            outline[NameObject('/First')] = IndirectObject(item_ids[0], 0, None)
+            outline[NameObject('/Last')] = IndirectObject(item_ids[-1], 0, None)
+        self._write_object(outline_id, outline)
+        return outline_id
+
+    def close(self, toc=True):
+        """Writes the TOC, page tree, catalog and xref; the sink itself is left open."""
+        page_ids = (self._write_toc() if toc and self.entries else []) + self.page_ids
+        outline_id = self._write_outline(self.page_ids) if self.entries else None
+
+        self._write_object(self.pages_id, DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Kids'): ArrayObject(IndirectObject(page_id, 0, None) for page_id in page_ids),
+            NameObject('/Count'): NumberObject(len(page_ids)),
+        }))
+        catalog_id = self._allocate()
+        catalog = DictionaryObject({
+            NameObject('/Type'): NameObject('/Catalog'),
+            NameObject('/Pages'): IndirectObject(self.pages_id, 0, None),
+        })
+        if outline_id:
+            catalog[NameObject('/Outlines')] = IndirectObject(outline_id, 0, None)
+            catalog[NameObject('/PageMode')] = NameObject('/UseOutlines')
+        self._write_object(catalog_id, catalog)
+
+        xref_offset = self.sink.offset
+        lines = [f"xref\n0 {len(self.offsets)}\n", "0000000000 65535 f \n"]
+        lines += [f"{offset:010d} 00000 n \n" for offset in self.offsets[1:]]
+        self.sink.write("".join(lines).encode())
+        self.sink.write(f"trailer\n<< /Size {len(self.offsets)} /Root {catalog_id} 0 R >>\n"
+                        f"startxref\n{xref_offset}\n%%EOF\n".encode())
+        return len(page_ids)
@@ -0,0 +1,188 @@
+"""
+Settlement PDF templates.
+
+pdf_template() returns the paragraph styles, table styles and company header
+block of a company, built once and kept by (TEMPLATE_VERSION, company name,
+phone, fax, logo): a company edit or a new logo gives a new key, so nothing
+has to be invalidated. Bump TEMPLATE_VERSION when the layout changes.
+
+Pages are numbered "Page N of M" in the footer by NumberedCanvas, and pages
+after the first repeat a one-line running header, so long load tables can
+split over as many pages as they need.
+"""
+import io
+import logging
+from functools import lru_cache
+from urllib.parse import unquote
+
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Image, Table, TableStyle
+
+logger = logging.getLogger(__name__)
+
+
+TEMPLATE_VERSION = 1
+TEMPLATE_CACHE_SIZE = 32
+
+PAGE_SIZE = letter
+TOP_MARGIN = BOTTOM_MARGIN = 0.5*inch
+LOGO_HEIGHT = 0.6*inch
+
+# oqimlar faqat zlib bilan: ASCII85 qatlami fayllarni ~25% kattalashtiradi va sof Python da kodlanadi
+rl_config.useA85 = 0
+
+# company_info bo'lmasa shapkada shu yoziladi
+DEFAULT_COMPANY = {'company_name': 'Company Name', 'phone': 'N/A', 'fax': 'N/A'}
+
+
+class NumberedCanvas(canvas.Canvas):
+    """Defers each page until save() to write "Page N of M" in the footer."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pages = []
+
+    def showPage(self):
+        self._pages.append(dict(self.__dict__))
+        self._startPage()
+
+    def save(self):
+        total = len(self._pages)
+        for page in self._pages:
+            self.__dict__.update(page)
+            self.setFont('Helvetica', 9)
+            self.drawCentredString(self._pagesize[0] / 2, BOTTOM_MARGIN / 2, f"Page {self._pageNumber} of {total}")
+            super().showPage()
+        super().save()
+
+
+def _table_style(*commands):
+    return TableStyle(list(commands))
+
+
+_GRID_HEADER = (
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+)
+
+
+class PdfTemplate:
+    """Everything of a settlement PDF that does not depend on the settlement."""
+
+    def __init__(self, company_name, phone, fax, logo=None):
+        styles = getSampleStyleSheet()
+        self.normal = styles['Normal']
+        self.title = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=18, alignment=TA_CENTER,
+                                    spaceAfter=20, textColor=colors.black)
+        self.company_lines = [company_name, f"Phone: {phone}", f"Fax: {fax}", '', '']
+        self.logo = logo
+
+        self.company_header = _table_style(
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        )
+        # load jadvali sahifalarga bo'linadi: sarlavha qatori har sahifada takrorlanadi (repeatRows=1)
+        self.loads = _table_style(
+            *_GRID_HEADER,
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
+            ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        )
+        self.deductions = _table_style(
+            *_GRID_HEADER,
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+        )
+        self.cd_summary = _table_style(
+            *_GRID_HEADER,
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTSIZE', (0, 0), (-1, -1), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        )
+        self.cd_loads = _table_style(
+            *_GRID_HEADER,
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        )
+        self.cd_final = _table_style(
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        )
+
+    def header_block(self, driver_data):
+        """The company / driver table at the top of the first page."""
+        driver_lines = [
+            f"Driver: {driver_name(driver_data)}",
+            f"Report Date: {driver_data['report_date']}",
+            f"Search From: {driver_data['search_from']}",
+            f"Search To: {driver_data['search_to']}",
+            f"Status: {driver_data['contact_number']}",
+        ]
+        table = Table([list(row) for row in zip(self.company_lines, driver_lines)], colWidths=[3*inch, 3*inch])
+        table.setStyle(self.company_header)
+        if self.logo is None:
+            return [table]
+        data, width, height = self.logo
+        return [Image(io.BytesIO(data), width=width, height=height, hAlign='LEFT'), table]
+
+    def later_pages(self, running_title):
+        """onLaterPages callback: the running header of pages after the first."""
+        def draw(page, doc):
+            page.saveState()
+            page.setFont('Helvetica', 9)
+            page.drawString(doc.leftMargin, PAGE_SIZE[1] - TOP_MARGIN / 2 - 4, running_title)
+            page.restoreState()
+        return draw
+
+
+def driver_name(driver_data):
+    return f"{driver_data.get('first_name') or ''} {driver_data.get('last_name') or ''}".strip() or 'N/A'
+
+
+def _logo(logo_url):
+    """(image bytes, width, height) of the company logo scaled to LOGO_HEIGHT, or None."""
+    # company_info() logoning URL ini beradi; faqat MEDIA dagi fayl o'qiladi, tarmoqqa chiqilmaydi
+    from django.conf import settings
+    from django.core.files.storage import default_storage
+
+    if not logo_url or not logo_url.startswith(settings.MEDIA_URL):
+        return None
+    try:
+        with default_storage.open(unquote(logo_url[len(settings.MEDIA_URL):]), 'rb') as logo:
+            data = logo.read()
+        width, height = ImageReader(io.BytesIO(data)).getSize()
+        return data, LOGO_HEIGHT * width / height, LOGO_HEIGHT
+    except Exception:
+        logger.warning("Settlement PDF: company logo %s could not be read", logo_url, exc_info=True)
+        return None
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _build(version, company_name, phone, fax, logo_url):
+    return PdfTemplate(company_name, phone, fax, _logo(logo_url))
+
+
+def pdf_template(company_info=None):
+    """The template of a company_info() dict (None: the placeholder company)."""
+    company = {**DEFAULT_COMPANY, **{key: value for key, value in (company_info or {}).items() if value}}
+    return _build(TEMPLATE_VERSION, company['company_name'], company['phone'], company['fax'],
+                  company.get('company_logo'))
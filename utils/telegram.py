@@ -0,0 +1,305 @@
+"""
+Shared Telegram Bot API client.
+
+telegram_client() is one process-wide TelegramClient: a keep-alive
+requests.Session (connection pool) per bot token, and token buckets per bot
+and per chat that keep us under Telegram's limits (about 30 messages a
+second per bot, 20 a minute per group). A 429 blocks the chat's bucket for
+Telegram's retry_after. When a bucket would make the caller wait longer than
+max_wait, call() raises TelegramThrottled instead of sleeping, so the caller
+can schedule the message for later. call(..., chat_limit=False) only takes
+from the bot bucket, for interactive messages that must not queue behind
+the load notifications of the same group.
+
+async_session() gives the same client over an httpx.AsyncClient, for
+callers that send many requests concurrently on one event loop; it shares
+the buckets and counters of the sync path.
+
+stats() returns request and error counters and send latency percentiles.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, RequestException, Timeout
+
+logger = logging.getLogger(__name__)
+# httpx har so'rovni INFO da to'liq URL (bot tokeni bilan) yozadi
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+
+TELEGRAM_API_URL = "https://api.telegram.org/bot{token}/{method}"
+REQUEST_TIMEOUT = 10
+POOL_MAXSIZE = 8
+ASYNC_MAX_CONNECTIONS = 20
+
+BOT_RATE = 25.0  # so'rov / sekund
+BOT_BURST = 25
+CHAT_RATE = 20 / 60  # guruhga daqiqasiga 20 ta xabar
+CHAT_BURST = 10
+MAX_WAIT = 1.0  # sekund: bundan uzoq kutish kerak bo'lsa TelegramThrottled
+LATENCY_SAMPLES = 1000
+
+
+class TelegramError(Exception):
+    """Telegram rad etdi (4xx): qayta urinish foyda bermaydi."""
+
+
+class TelegramRetry(Exception):
+    """Tarmoq xatosi, 429 yoki 5xx: keyinroq qayta urinish kerak."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TelegramThrottled(TelegramRetry):
+    """So'rov yuborilmadi: bot yoki chat limiti retry_after sekunddan keyin bo'shaydi."""
+
+
+# Telegram ID formatini tekshirish va to'g'rilash
+def process_telegram_id(telegram_id):
+    """
+    Telegram ID ni qaysi formatda ekanligini tekshirish va to'g'ri formatga o'zgartirish
+    - '@username' formatidan username qilib qaytaradi
+    - 'id:123456789' formatidan faqat raqamni qaytaradi
+    - '@username extra text' formatidan username qilib qaytaradi
+    - Boshqa holatda qiymat o'zgarmaydi
+    """
+    if not telegram_id:
+        return None
+
+    # '@username' formatini tekshirish
+    if telegram_id.startswith('@'):
+        # '@username' formatidagi bo'lsa, qo'shimcha so'zlarni olib tashlash
+        username = telegram_id.split()[0]  # Birinchi so'zni olish (@ bilan)
+        return username
+
+    # 'id:123456789' formatini tekshirish
+    if telegram_id.lower().startswith('id:'):
+        # Faqat ID raqamini qaytarish
+        id_parts = telegram_id.split(':')
+        if len(id_parts) > 1:
+            return id_parts[1].strip()
+
+    # Boshqa formatlar uchun o'zgartirish kerak emas
+    return telegram_id
+
+
+def _error_text(error, bot_token):
+    """The exception's type and message with the bot token (part of the request URL) masked."""
+    text = str(error)
+    for secret in (bot_token, bot_token.replace(':', '%3A')):
+        text = text.replace(secret, '<token>')
+    return f"{type(error).__name__}: {text}"
+
+
+class TokenBucket:
+    """``rate`` tokens a second up to ``capacity``; not thread-safe (TelegramClient locks)."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def wait(self, now):
+        """Seconds until a token is available (0: available now)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def block(self, now, seconds):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class TelegramClient:
+    def __init__(self, bot_rate=BOT_RATE, bot_burst=BOT_BURST, chat_rate=CHAT_RATE, chat_burst=CHAT_BURST,
+                 max_wait=MAX_WAIT):
+        self.bot_rate, self.bot_burst = bot_rate, bot_burst
+        self.chat_rate, self.chat_burst = chat_rate, chat_burst
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._bot_buckets = {}
+        self._chat_buckets = {}
+        self._requests = Counter()
+        self._errors = Counter()
+        self._throttled = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def _session(self, bot_token):
+        with self._lock:
+            session = self._sessions.get(bot_token)
+            if session is None:
+                session = requests.Session()
+                session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE))
+                session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE))
+                self._sessions[bot_token] = session
+            return session
+
+    def _buckets(self, bot_token, chat_id):
+        bot = self._bot_buckets.get(bot_token)
+        if bot is None:
+            bot = self._bot_buckets[bot_token] = TokenBucket(self.bot_rate, self.bot_burst)
+        buckets = [bot]
+        if chat_id is not None:
+            key = (bot_token, str(chat_id))
+            chat = self._chat_buckets.get(key)
+            if chat is None:
+                chat = self._chat_buckets[key] = TokenBucket(self.chat_rate, self.chat_burst)
+            buckets.append(chat)
+        return buckets
+
+    def _reserve(self, bot_token, chat_id, method):
+        """Takes the tokens and returns 0, or returns the seconds to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            buckets = self._buckets(bot_token, chat_id)
+            wait = max(bucket.wait(now) for bucket in buckets)
+            if wait <= 0:
+                for bucket in buckets:
+                    bucket.take()
+                return 0
+            if wait > self.max_wait:
+                self._throttled += 1
+                raise TelegramThrottled(f"{method}: rate limited for chat {chat_id}", retry_after=wait)
+            return wait
+
+    def _acquire(self, bot_token, chat_id, method):
+        while wait := self._reserve(bot_token, chat_id, method):
+            time.sleep(wait)
+
+    def _block(self, bot_token, chat_id, seconds):
+        with self._lock:
+            for bucket in self._buckets(bot_token, chat_id)[-1:]:
+                bucket.block(time.monotonic(), seconds)
+
+    def _record(self, method, started, error=None):
+        with self._lock:
+            self._requests[method] += 1
+            self._latencies.append(time.monotonic() - started)
+            if error:
+                self._errors[error] += 1
+
+    def call(self, bot_token, method, data, files=None, chat_limit=True):
+        """The decoded response of one Bot API call; raises TelegramRetry / TelegramThrottled / TelegramError."""
+        chat_id = data.get('chat_id')
+        self._acquire(bot_token, chat_id if chat_limit else None, method)
+        started = time.monotonic()
+        try:
+            response = self._session(bot_token).post(TELEGRAM_API_URL.format(token=bot_token, method=method),
+                                                     data=data, files=files, timeout=REQUEST_TIMEOUT)
+        except (ConnectionError, Timeout) as e:
+            self._record(method, started, 'network')
+            raise TelegramRetry(f"{method}: {_error_text(e, bot_token)}")
+        except RequestException as e:
+            self._record(method, started, 'request')
+            raise TelegramError(f"{method}: {_error_text(e, bot_token)}")
+        return self._result(bot_token, chat_id, method, started, response)
+
+    def _result(self, bot_token, chat_id, method, started, response):
+        # requests va httpx javoblari bir xil: status_code va json()
+        status_code = response.status_code
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+
+        if status_code == 429:
+            retry_after = (payload.get('parameters') or {}).get('retry_after') or 1
+            self._record(method, started, 'http_429')
+            # shu chatga retry_after o'tguncha so'rov yuborilmaydi
+            self._block(bot_token, chat_id, retry_after)
+            raise TelegramRetry(f"{method}: HTTP 429 {payload.get('description', '')}".strip(),
+                                retry_after=retry_after)
+        if status_code >= 500:
+            self._record(method, started, 'http_5xx')
+            raise TelegramRetry(f"{method}: HTTP {status_code} {payload.get('description', '')}".strip())
+        if not payload.get('ok'):
+            self._record(method, started, 'http_4xx')
+            raise TelegramError(f"{method}: {payload.get('description') or f'HTTP {status_code}'}")
+        self._record(method, started)
+        return payload
+
+    @asynccontextmanager
+    async def async_session(self):
+        """
+        An AsyncTelegramSession for the running event loop; its connection
+        pool is closed on exit:
+
+            async with telegram_client().async_session() as api:
+                await asyncio.gather(api.call(token, 'sendMessage', a), api.call(token, 'sendMessage', b))
+        """
+        limits = httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS, max_keepalive_connections=ASYNC_MAX_CONNECTIONS)
+        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT, limits=limits) as http:
+            yield AsyncTelegramSession(self, http)
+
+    def stats(self):
+        """Counters since the process started, and latency over the last LATENCY_SAMPLES requests."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            requests_by_method = dict(self._requests)
+            errors = dict(self._errors)
+            throttled = self._throttled
+
+        def percentile(fraction):
+            return round(latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000, 1)
+
+        return {
+            'requests': requests_by_method,
+            'errors': errors,
+            'throttled': throttled,
+            'latency_ms': {
+                'p50': percentile(0.5), 'p95': percentile(0.95), 'max': round(latencies[-1] * 1000, 1),
+            } if latencies else None,
+        }
+
+
+class AsyncTelegramSession:
+    """TelegramClient.call() as a coroutine; made by TelegramClient.async_session()."""
+
+    def __init__(self, client, http):
+        self.client = client
+        self.http = http
+
+    async def call(self, bot_token, method, data):
+        client = self.client
+        chat_id = data.get('chat_id')
+        while wait := client._reserve(bot_token, chat_id, method):
+            await asyncio.sleep(wait)
+        started = time.monotonic()
+        try:
+            response = await self.http.post(TELEGRAM_API_URL.format(token=bot_token, method=method), data=data)
+        except httpx.TransportError as e:
+            client._record(method, started, 'network')
+            raise TelegramRetry(f"{method}: {_error_text(e, bot_token)}")
+        except httpx.HTTPError as e:
+            client._record(method, started, 'request')
+            raise TelegramError(f"{method}: {_error_text(e, bot_token)}")
+        return client._result(bot_token, chat_id, method, started, response)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def telegram_client():
+    """The process-wide client (created on first use)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = TelegramClient()
+        return _client
@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from requests.exceptions import ConnectionError
+
+from utils.telegram import TelegramClient, TelegramError, TelegramRetry, TelegramThrottled, TokenBucket
+
+TOKEN = '123:SECRET'
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def test_burst_then_refill(self):
+        bucket = TokenBucket(rate=2, capacity=3)
+        now = bucket.updated
+        for _ in range(3):
+            self.assertEqual(bucket.wait(now), 0)
+            bucket.take()
+        self.assertAlmostEqual(bucket.wait(now), 0.5)
+        self.assertEqual(bucket.wait(now + 0.5), 0)
+        # to'la bo'lgach capacity dan oshmaydi
+        self.assertEqual(bucket.wait(now + 60), 0)
+        self.assertEqual(bucket.tokens, 3)
+
+    def test_block(self):
+        bucket = TokenBucket(rate=2, capacity=3)
+        now = bucket.updated
+        bucket.block(now, 10)
+        bucket.block(now, 4)  # qisqaroq blok uzunini qisqartirmaydi
+        self.assertAlmostEqual(bucket.wait(now + 1), 9)
+        self.assertEqual(bucket.wait(now + 10), 0)
+
+
+class TelegramClientTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = 1000.0
+        patcher = mock.patch('utils.telegram.time.monotonic', side_effect=lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TelegramClient(bot_rate=10, bot_burst=10, chat_rate=1, chat_burst=2, max_wait=1.0)
+
+    def reserve(self, chat_id=-100):
+        return self.client._reserve(TOKEN, chat_id, 'sendMessage')
+
+    def result(self, status_code, payload, chat_id=-100):
+        return self.client._result(TOKEN, chat_id, 'sendMessage', self.clock, FakeResponse(status_code, payload))
+
+    def test_chat_limit_waits_then_throttles(self):
+        self.assertEqual([self.reserve(), self.reserve()], [0, 0])
+        self.assertAlmostEqual(self.reserve(), 1.0)  # max_wait ichida: kutadi
+        self.client.max_wait = 0.5
+        with self.assertRaises(TelegramThrottled) as raised:
+            self.reserve()
+        self.assertAlmostEqual(raised.exception.retry_after, 1.0)
+        # boshqa chat o'z limitida
+        self.assertEqual(self.reserve(chat_id=-200), 0)
+        self.clock += 1
+        self.assertEqual(self.reserve(), 0)
+
+    def test_429_blocks_the_chat_for_retry_after(self):
+        with self.assertRaises(TelegramRetry) as raised:
+            self.result(429, {'ok': False, 'description': 'Too Many Requests', 'parameters': {'retry_after': 30}})
+        self.assertEqual(raised.exception.retry_after, 30)
+        self.assertNotIsInstance(raised.exception, TelegramThrottled)
+        with self.assertRaises(TelegramThrottled) as raised:
+            self.reserve()
+        self.assertAlmostEqual(raised.exception.retry_after, 30)
+        self.assertEqual(self.reserve(chat_id=-200), 0)
+        self.clock += 30
+        self.assertEqual(self.reserve(), 0)
+
+    def test_result_errors(self):
+        with self.assertRaises(TelegramRetry):
+            self.result(502, {})
+        with self.assertRaises(TelegramError) as raised:
+            self.result(400, {'ok': False, 'description': 'Bad Request: chat not found'})
+        self.assertNotIsInstance(raised.exception, TelegramRetry)
+        self.assertEqual(self.result(200, {'ok': True, 'result': {'message_id': 7}})['result']['message_id'], 7)
+
+    def test_stats(self):
+        self.assertIsNone(self.client.stats()['latency_ms'])
+        self.result(200, {'ok': True})
+        self.clock += 0.25
+        for status_code in (429, 502, 400):
+            with self.assertRaises((TelegramRetry, TelegramError)):
+                self.result(status_code, {'ok': False})
+        self.client.max_wait = 0
+        self.reserve(chat_id=None)
+        with self.assertRaises(TelegramThrottled):
+            self.reserve()
+        stats = self.client.stats()
+        self.assertEqual(stats['requests'], {'sendMessage': 4})
+        self.assertEqual(stats['errors'], {'http_429': 1, 'http_5xx': 1, 'http_4xx': 1})
+        self.assertEqual(stats['throttled'], 1)
+        self.assertEqual(stats['latency_ms'], {'p50': 0.0, 'p95': 0.0, 'max': 0.0})
+
+    def test_network_error_does_not_leak_the_token(self):
+        error = ConnectionError(f"Max retries exceeded with url: /bot{TOKEN}/sendMessage")
+        with mock.patch('requests.Session.post', side_effect=error), self.assertRaises(TelegramRetry) as raised:
+            self.client.call(TOKEN, 'sendMessage', {'chat_id': -100, 'text': 'x'})
+        self.assertNotIn('SECRET', str(raised.exception))
+        self.assertIn('ConnectionError', str(raised.exception))